@@ -0,0 +1,168 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.optimize import minimize
+
+import dos
+from dos import map_slabs, mesh_rows, slab_tasks
+from fermi import NUM_ELECTRONS
+from run_ledger import stage
+from wannier_tb import DEGEN_TOL, load_hr_dat, eigh_rows, hk
+
+# Global band gap and band extrema of the Wannier model over the whole 2D BZ.
+# The gap of 1T'-WTe2 sits off the high-symmetry lines, so the band path can miss it.
+#   1. screen: E_v = band nocc-1 and E_c = band nocc on an N1 x N2 mesh (slabs of rows
+#      through hk_rows + batched eigvalsh, as in dos.py); the local minima of E_c - E_v,
+#      maxima of E_v and minima of E_c on the periodic mesh are the start points
+#   2. polish: L-BFGS from every start point, run in a process pool, on the analytic
+#      gradient dE_n/dk_i = <n|dH/dk_i|n> (Hellmann-Feynman, averaged over a degenerate
+#      Kramers pair)
+# Reports the direct gap (min over k of E_c - E_v) and the indirect gap (min E_c - max
+# E_v) with their fractional k (k3 = 0).
+#
+# Usage:
+#   python band_gap.py                       # wte2_hr.dat, NUM_ELECTRONS occupied bands
+#   python band_gap.py model_hr.dat --nocc 22 --mesh 120 60
+
+# --- CONFIGURATION ---
+FNAME = 'wte2_hr.dat'
+MESH = (96, 48)
+ROWS_PER_SLAB = 8
+STARTS = 6    # local-optimisation starts per objective
+GTOL = 1e-9   # eV per unit of fractional k
+
+_DMODELS = None
+
+
+def _derivative_models(model):
+    """dH/dk_i for fractional k_i as model dicts: H(R) -> 2 pi i R_i H(R)."""
+    return [dict(model, ham=2j * np.pi * model['rvecs'][:, i, None, None] * model['ham']) for i in range(2)]
+
+
+def band_and_gradient(model, k, band, dmodels=None):
+    """E_band(k) and its gradient along (k1, k2). k is (k1, k2)."""
+    dmodels = dmodels or _derivative_models(model)
+    kpt = np.array([[k[0], k[1], 0.0]])
+    evals, U = np.linalg.eigh(hk(model, kpt)[0])
+    # degenerate partners (Kramers pair): the mean slope of the cluster is well defined
+    cluster = np.abs(evals - evals[band]) < DEGEN_TOL
+    V = U[:, cluster]
+    grad = [np.real(np.trace(V.conj().T @ hk(d, kpt)[0] @ V)) / cluster.sum() for d in dmodels]
+    return evals[band], np.array(grad)
+
+
+def _objective(k, model, dmodels, kind, nocc):
+    if kind == 'vbm':
+        e, g = band_and_gradient(model, k, nocc - 1, dmodels)
+        return -e, -g
+    ec, gc = band_and_gradient(model, k, nocc, dmodels)
+    if kind == 'cbm':
+        return ec, gc
+    ev, gv = band_and_gradient(model, k, nocc - 1, dmodels)
+    return ec - ev, gc - gv
+
+
+def _screen_slab(task):
+    """Worker: (row_start, row_stop, E_v, E_c) of one slab. task = (row_start, row_stop, mesh, nocc)."""
+    a, b, mesh, nocc = task
+    evals = eigh_rows(dos._MODEL, mesh, a, b)
+    return a, b, evals[:, nocc - 1], evals[:, nocc]
+
+
+def _polish(task):
+    """Worker: local optimisation from one start. task = (kind, k0, nocc)."""
+    global _DMODELS
+    kind, k0, nocc = task
+    if _DMODELS is None or _DMODELS[0]['rvecs'] is not dos._MODEL['rvecs']:
+        _DMODELS = _derivative_models(dos._MODEL)
+    res = minimize(_objective, k0, args=(dos._MODEL, _DMODELS, kind, nocc), jac=True, method='L-BFGS-B',
+                   options={'gtol': GTOL})
+    value = -res.fun if kind == 'vbm' else res.fun
+    return kind, float(value), np.mod(res.x, 1.0)
+
+
+def _local_extrema(values, count):
+    """Flat indices of the count lowest local minima of a periodic 2D array."""
+    is_min = np.ones(values.shape, dtype=bool)
+    for s1 in (-1, 0, 1):
+        for s2 in (-1, 0, 1):
+            if s1 or s2:
+                is_min &= values <= np.roll(values, (s1, s2), axis=(0, 1))
+    idx = np.flatnonzero(is_min)
+    return idx[np.argsort(values.ravel()[idx])[:count]]
+
+
+def screen_mesh(model, nocc, mesh=MESH, rows_per_slab=ROWS_PER_SLAB, processes=None):
+    """E_v and E_c, each (N1, N2), on the mesh."""
+    ev, ec = np.empty(mesh), np.empty(mesh)
+    tasks = [(a, b, mesh, nocc) for a, b in slab_tasks(mesh, rows_per_slab)]
+    for a, b, v, c in map_slabs(_screen_slab, tasks, model, processes=processes):
+        ev[a:b] = v.reshape(b - a, mesh[1])
+        ec[a:b] = c.reshape(b - a, mesh[1])
+    return ev, ec
+
+
+def find_gaps(model, nocc, mesh=MESH, starts=STARTS, processes=None):
+    """
+    Direct and indirect gap of the model with nocc occupied bands. Returns a dict:
+      'direct' (gap, k), 'vbm' (E, k), 'cbm' (E, k), 'indirect' (gap), each k fractional
+      (k1, k2), plus the mesh-only estimates under 'mesh_direct' / 'mesh_indirect'.
+    """
+    ev, ec = screen_mesh(model, nocc, mesh, processes=processes)
+    k_mesh = mesh_rows(mesh, 0, mesh[0])[:, :2]
+    tasks = []
+    for kind, values in (('direct', ec - ev), ('vbm', -ev), ('cbm', ec)):
+        tasks += [(kind, k_mesh[i], nocc) for i in _local_extrema(values, starts)]
+
+    best = {'direct': (float((ec - ev).min()), k_mesh[np.argmin(ec - ev)]),
+            'vbm': (float(ev.max()), k_mesh[np.argmax(ev)]),
+            'cbm': (float(ec.min()), k_mesh[np.argmin(ec)])}
+    out = {'mesh_direct': best['direct'][0], 'mesh_indirect': best['cbm'][0] - best['vbm'][0]}
+    for kind, value, k in map_slabs(_polish, tasks, model, processes=processes):
+        better = value > best[kind][0] if kind == 'vbm' else value < best[kind][0]
+        if better:
+            best[kind] = (value, k)
+    out.update(best)
+    out['indirect'] = best['cbm'][0] - best['vbm'][0]
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Direct / indirect band gap over the whole 2D Brillouin zone.")
+    parser.add_argument('hr', nargs='?', default=FNAME)
+    parser.add_argument('--nocc', type=int, default=NUM_ELECTRONS, help="occupied bands (default: NUM_ELECTRONS)")
+    parser.add_argument('--mesh', type=int, nargs=2, default=list(MESH))
+    parser.add_argument('--starts', type=int, default=STARTS, help="local optimisations per objective")
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.hr):
+        print(f"Error: {args.hr} not found.")
+        return 1
+    model = load_hr_dat(args.hr)
+    if not 0 < args.nocc < model['num_wann']:
+        print(f"Error: --nocc must be between 1 and {model['num_wann'] - 1}.")
+        return 1
+
+    t0 = time.perf_counter()
+    res = find_gaps(model, args.nocc, tuple(args.mesh), args.starts, args.processes)
+    elapsed = time.perf_counter() - t0
+    fmt_k = lambda k: f"({k[0]:.4f}, {k[1]:.4f})"
+    print(f"{args.hr}: {model['num_wann']} bands, {args.nocc} occupied, {args.mesh[0]}x{args.mesh[1]} screen "
+          f"+ {3 * args.starts} local searches in {elapsed:.1f} s")
+    print(f"  VBM           {res['vbm'][0]:10.5f} eV at k = {fmt_k(res['vbm'][1])}")
+    print(f"  CBM           {res['cbm'][0]:10.5f} eV at k = {fmt_k(res['cbm'][1])}")
+    print(f"  indirect gap  {res['indirect'] * 1000:10.2f} meV (mesh only: {res['mesh_indirect'] * 1000:.2f} meV)")
+    print(f"  direct gap    {res['direct'][0] * 1000:10.2f} meV at k = {fmt_k(res['direct'][1])} "
+          f"(mesh only: {res['mesh_direct'] * 1000:.2f} meV)")
+    if res['indirect'] < 0:
+        print("  (negative indirect gap: band overlap, semimetal at this filling)")
+    return 0
+
+
+if __name__ == "__main__":
+    with stage('band_gap.py'):
+        sys.exit(main())
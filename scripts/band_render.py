@@ -0,0 +1,76 @@
+import numpy as np
+from matplotlib.collections import LineCollection
+
+# Shared band-structure renderer.
+# Every band plot in this repo used to issue one ax.plot (or ax.scatter) per band,
+# which for 44 Wannier bands x 1000+ k-points means thousands of Artists and very
+# slow PDF output. Here the whole (nbands, nk) array becomes ONE LineCollection.
+
+
+def parse_band_dat(filename):
+    """
+    Reads a Wannier90 band.dat (gnuplot format) file in one pass.
+    Returns k (nk,) and bands (nbands, nk).
+    """
+    data = np.loadtxt(filename)  # Blank lines between bands are skipped by loadtxt
+    k_all = data[:, 0]
+    e_all = data[:, 1]
+
+    # Each band restarts the k-path, so the first drop in k marks the band length
+    drops = np.nonzero(np.diff(k_all) < 0)[0]
+    nk = drops[0] + 1 if len(drops) else len(k_all)
+    nbands = len(k_all) // nk
+
+    k = k_all[:nk]
+    bands = e_all[:nbands * nk].reshape(nbands, nk)
+    return k, bands
+
+
+def band_segments(k, bands):
+    """Stacks (nbands, nk) energies into LineCollection vertices (nbands, nk, 2)."""
+    bands = np.atleast_2d(bands)
+    verts = np.empty(bands.shape + (2,))
+    verts[..., 0] = np.broadcast_to(k, bands.shape)
+    verts[..., 1] = bands
+    return verts
+
+
+def draw_bands(ax, k, bands, color='black', values=None, cmap='coolwarm', norm=None,
+               linewidth=None, alpha=None, zorder=1, rasterized=True, label=None):
+    """
+    Draws all bands as a single LineCollection.
+
+    k      : (nk,) path coordinate shared by every band
+    bands  : (nbands, nk) energies
+    values : optional (nbands, nk) per-point weights (orbital character, edge
+             weight, ...). Each segment is coloured by the mean of its two end
+             points through `cmap`/`norm`.
+    rasterized : dense layers are rasterized inside vector outputs (PDF/SVG)
+             so file size and render time do not scale with the number of points.
+    """
+    verts = band_segments(k, bands)
+
+    if values is None:
+        # One polyline per band, single colour
+        lc = LineCollection(verts, colors=color, linewidths=linewidth, alpha=alpha,
+                            zorder=zorder, label=label)
+    else:
+        # Split every band into nk-1 two-point segments so each can carry its own colour
+        values = np.broadcast_to(values, verts.shape[:2])
+        segs = np.stack([verts[:, :-1], verts[:, 1:]], axis=2).reshape(-1, 2, 2)
+        seg_vals = 0.5 * (values[:, :-1] + values[:, 1:]).ravel()
+        lc = LineCollection(segs, array=seg_vals, cmap=cmap, norm=norm,
+                            linewidths=linewidth, alpha=alpha, zorder=zorder, label=label)
+
+    lc.set_rasterized(rasterized)
+    ax.add_collection(lc)
+    ax.autoscale_view()
+    return lc
+
+
+def draw_band_points(ax, k, bands, color='red', s=10, zorder=2, rasterized=True, label=None):
+    """Scatters an (nbands, nk) point set (e.g. DFT eigenvalues) as a single PathCollection."""
+    verts = band_segments(k, bands).reshape(-1, 2)
+    sc = ax.scatter(verts[:, 0], verts[:, 1], color=color, s=s, zorder=zorder, label=label)
+    sc.set_rasterized(rasterized)
+    return sc
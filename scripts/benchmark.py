@@ -0,0 +1,207 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+from synthetic_hr import synthetic_model, write_hr_dat
+from wannier_tb import load_hr_dat, hk, hk_mesh, eigh_k, ribbon_bands, parse_wout
+from band_render import parse_band_dat, draw_bands
+from dos import mesh_rows, slab_tasks
+
+# Benchmark suite for the post-processing hot paths.
+# Every case runs on synthetic inputs written to a scratch directory (hr.dat of
+# configurable num_wann / nrpts, band.dat, projwfc PDOS files), so the numbers do not
+# depend on having run pw.x or wannier90.x. Results go to JSON and are compared
+# against a stored baseline: a case is a regression if its median time exceeds the
+# baseline median by more than THRESHOLD.
+#
+# Usage:
+#   python benchmark.py                    # run, write benchmark_results.json, compare
+#   python benchmark.py --save-baseline    # run and store as the new baseline
+#   python benchmark.py --quick --only ribbon
+
+# --- CONFIGURATION ---
+RESULTS_FILE = 'benchmark_results.json'
+BASELINE_FILE = 'benchmark_baseline.json'
+THRESHOLD = 0.25 # Allowed fractional slowdown before a case is flagged
+REPEAT = 3
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+WOUT_FILE = os.path.join(SCRIPT_DIR, "../data/wte2.wout")
+
+# (num_wann, nrpts) of the synthetic models; 44 is the WTe2 model size
+HR_SIZES = [(44, 101), (88, 201), (176, 201)]
+RIBBON_SIZES = [(10, 20), (30, 10), (60, 4)] # (WIDTH, NK)
+MESH = (200, 100) # uniform mesh for H(k) built by direct sum vs hk_mesh
+QUICK_HR_SIZES = [(44, 101)]
+QUICK_RIBBON_SIZES = [(10, 10)]
+QUICK_MESH = (50, 50)
+
+
+def time_call(func, repeat=REPEAT):
+    """Best and median wall time of func() over `repeat` runs (after one warm-up)."""
+    func()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return {'best': min(times), 'median': float(np.median(times)), 'repeat': repeat}
+
+
+def write_band_dat(fname, nbands=44, nk=1300, seed=0):
+    """Synthetic gnuplot band.dat (blank line between bands)."""
+    rng = np.random.default_rng(seed)
+    k = np.linspace(0, 3.0, nk)
+    with open(fname, 'w') as f:
+        for b in range(nbands):
+            e = -10 + 20 * b / nbands + 0.3 * np.sin(k * (1 + rng.random()))
+            np.savetxt(f, np.column_stack([k, e]), fmt='%16.8E')
+            f.write('\n')
+
+
+def write_pdos_files(workdir, npts=4000):
+    """Synthetic projwfc.x PDOS files matching the plot_pdos.py glob patterns."""
+    e = np.linspace(-20, 10, npts)
+    for i, (sp, orb, ncol) in enumerate([('W', 'd', 5), ('W', 'd', 5), ('Te', 'p', 3), ('Te', 'p', 3)]):
+        fname = os.path.join(workdir, f"wte2.pdos.pdos_atm#{i+1}({sp})_wfc#{i+1}({orb}_j1.5)")
+        cols = np.abs(np.sin(e[:, None] * np.arange(1, ncol + 1)))
+        np.savetxt(fname, np.column_stack([e, cols.sum(axis=1), cols]), fmt='%10.3f',
+                   header=' E (eV)  ldos(E)  pdos(E)...')
+
+
+def build_cases(workdir, quick=False):
+    """Returns a list of (name, callable). Inputs are generated here, outside the timings."""
+    cases = []
+    hr_sizes = QUICK_HR_SIZES if quick else HR_SIZES
+    ribbon_sizes = QUICK_RIBBON_SIZES if quick else RIBBON_SIZES
+    kpts = np.random.default_rng(1).random((500 if quick else 2000, 3))
+    kpts[:, 2] = 0.0
+    mesh = QUICK_MESH if quick else MESH
+    rows = 8
+
+    for nw, nrpts in hr_sizes:
+        fname = os.path.join(workdir, f"synthetic_{nw}_{nrpts}_hr.dat")
+        model = synthetic_model(nw, nrpts)
+        write_hr_dat(fname, model)
+        tag = f"nw={nw},nR={nrpts}"
+        cases.append((f"parse_hr[{tag}]", lambda f=fname: load_hr_dat(f)))
+        cases.append((f"hk_build[{tag},nk={len(kpts)}]", lambda m=model: hk(m, kpts)))
+        cases.append((f"eigh_k[{tag},nk={len(kpts)}]", lambda m=model: eigh_k(m, kpts)))
+
+        def direct(m=model):
+            for start, stop in slab_tasks(mesh, rows):
+                hk(m, mesh_rows(mesh, start, stop))
+        cases.append((f"hk_mesh_direct[{tag},{mesh[0]}x{mesh[1]}]", direct))
+        cases.append((f"hk_mesh[{tag},{mesh[0]}x{mesh[1]}]", lambda m=model: sum(1 for _ in hk_mesh(m, mesh, rows))))
+
+    ribbon_model = synthetic_model(44, 101)
+    for width, nk in ribbon_sizes:
+        kx = np.linspace(0, 1, nk)
+        cases.append((f"ribbon[W={width},NK={nk}]", lambda w=width, k=kx: ribbon_bands(ribbon_model, w, k)))
+
+    band_file = os.path.join(workdir, 'synthetic_band.dat')
+    write_band_dat(band_file, nk=400 if quick else 1300)
+    cases.append(("parse_band_dat", lambda: parse_band_dat(band_file)))
+
+    if os.path.exists(WOUT_FILE):
+        cases.append(("parse_wout", lambda: parse_wout(WOUT_FILE)))
+
+    write_pdos_files(workdir)
+
+    def pdos():
+        from plot_pdos import load_pdos
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()): # load_pdos prints its glob
+                load_pdos('W', 'd')
+                load_pdos('Te', 'p')
+        finally:
+            os.chdir(cwd)
+    cases.append(("parse_pdos", pdos))
+
+    k_band, bands = parse_band_dat(band_file)
+
+    def render(fmt):
+        fig, ax = plt.subplots(figsize=(6, 8))
+        draw_bands(ax, k_band, bands, color='black', linewidth=0.8)
+        ax.set_ylim(-1, 1)
+        fig.savefig(io.BytesIO(), format=fmt, dpi=150)
+        plt.close(fig)
+    cases.append(("render_bands[png]", lambda: render('png')))
+    cases.append(("render_bands[pdf]", lambda: render('pdf')))
+    return cases
+
+
+def run_benchmarks(quick=False, only=None, repeat=REPEAT):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='wte2_bench_') as workdir:
+        for name, func in build_cases(workdir, quick):
+            if only and only not in name:
+                continue
+            results[name] = time_call(func, repeat)
+            print(f"  {name:<40s} median {results[name]['median']*1e3:10.2f} ms   best {results[name]['best']*1e3:10.2f} ms")
+    meta = {'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(),
+            'numpy': np.__version__, 'machine': platform.machine(), 'node': platform.node(),
+            'cpu_count': os.cpu_count(), 'quick': quick}
+    return {'meta': meta, 'results': results}
+
+
+def compare(current, baseline, threshold=THRESHOLD):
+    """Returns [(name, baseline_median, current_median, ratio)] for cases slower than the threshold."""
+    regressions = []
+    for name, res in current['results'].items():
+        ref = baseline['results'].get(name)
+        if ref is None:
+            continue
+        ratio = res['median'] / ref['median']
+        if ratio > 1.0 + threshold:
+            regressions.append((name, ref['median'], res['median'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the post-processing hot paths on synthetic inputs.")
+    parser.add_argument('--quick', action='store_true', help="small sizes only")
+    parser.add_argument('--only', default=None, help="run cases whose name contains this string")
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--output', default=RESULTS_FILE)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the baseline")
+    args = parser.parse_args()
+
+    print("Running benchmarks...")
+    current = run_benchmarks(args.quick, args.only, args.repeat)
+
+    out = args.baseline if args.save_baseline else args.output
+    with open(out, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"Results saved to {out}")
+    if args.save_baseline or not os.path.exists(args.baseline):
+        return 0
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.threshold)
+    if not regressions:
+        print(f"No regressions against {args.baseline} (threshold {args.threshold:.0%}).")
+        return 0
+    print(f"REGRESSIONS against {args.baseline} (threshold {args.threshold:.0%}):")
+    for name, ref, cur, ratio in regressions:
+        print(f"  {name:<40s} {ref*1e3:10.2f} ms -> {cur*1e3:10.2f} ms  (x{ratio:.2f})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
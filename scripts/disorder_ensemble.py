@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import eigsh
+
+import dos
+from dos import map_slabs
+from transport import principal_layers, transmission
+from wannier_tb import load_hr_dat, parse_win, ribbon_slices, wannier_orbitals
+
+# Disorder ensembles for the robustness of the edge states.
+# The clean ribbon (transport.principal_layers, LENGTH principal layers of WIDTH cells)
+# gets one random on-site potential per realisation, with one value per atomic site
+# shared by all of its orbitals:
+#   anderson    : uniform in [-W/2, W/2] on every site (time-reversal symmetric)
+#   nonmagnetic : +W on a fraction CONCENTRATION of the sites
+#   magnetic    : Ising moments +-W s_z on a fraction of the sites (breaks time reversal;
+#                 s_z along the spinor quantisation axis keeps the disorder diagonal)
+# and one of two observables:
+#   conductance : T(E) at the --energies through the disordered device (transport.py)
+#   edge_gap    : spectral gap around E0 of the disordered strip closed periodically
+#                 along a1 (sparse shift-invert eigsh at kx = 0 and 1/2)
+# Realisation i always draws from default_rng([SEED, i]), so a result does not depend on
+# the pool order. Every finished realisation is appended to <out>.jsonl (first line:
+# the configuration) and the running mean / variance (Welford) is rewritten to
+# <out>.summary.json; a restarted job skips the realisations already in the file.
+#
+# Usage:
+#   python disorder_ensemble.py --kind anderson --strength 0.5 -n 200
+#   python disorder_ensemble.py model_library/kane_mele_hr.dat --win model_library/kane_mele.win \
+#       --kind magnetic --strength 0.3 --concentration 0.1 --observable edge_gap
+
+# --- CONFIGURATION ---
+FNAME = 'wte2_hr.dat'
+WIN_FILE = 'wte2.win'
+WIDTH = 20
+LENGTH = 20
+ENERGIES = [0.0]       # eV, conductance energies
+CONCENTRATION = 0.05   # impurity fraction of the sites
+REALISATIONS = 200
+SEED = 1234
+EIGS = 8               # eigenvalues around E0 per k for the edge gap
+
+
+def site_labels(model, win, width, layer_slices):
+    """
+    Site index and spin sign (+1 / -1, 0 when spinless) of every basis state of a
+    principal layer (layer_slices x width cells x num_wann WFs). Without a .win every
+    WF is its own site.
+    """
+    nw = model['num_wann']
+    if win is not None:
+        orb = wannier_orbitals(win)
+        atom = orb['atom']
+        spin = (1 - 2 * orb['spin']) if win.get('spinors', False) else np.zeros(nw, dtype=int)
+    else:
+        atom, spin = np.arange(nw), np.zeros(nw, dtype=int)
+    natoms = atom.max() + 1
+    cell = np.arange(layer_slices * width)
+    sites = (cell[:, None] * natoms + atom[None, :]).ravel()
+    return sites, np.tile(spin, layer_slices * width), layer_slices * width * natoms
+
+
+def draw_disorder(rng, kind, strength, concentration, length, sites, spin, nsites):
+    """On-site energies (length, M) of one realisation."""
+    if kind == 'anderson':
+        return rng.uniform(-0.5 * strength, 0.5 * strength, (length, nsites))[:, sites]
+    hit = rng.random((length, nsites)) < concentration
+    if kind == 'nonmagnetic':
+        return (strength * hit)[:, sites]
+    if kind == 'magnetic':
+        if not spin.any():
+            raise ValueError("magnetic disorder needs spinor WFs (spinors = true in the .win)")
+        moment = strength * hit * rng.choice([-1.0, 1.0], (length, nsites))
+        return moment[:, sites] * spin
+    raise ValueError(f"Unknown disorder kind '{kind}'")
+
+
+def edge_gap(h00, h01, disorder, e0=0.0, kx_vals=(0.0, 0.5), k=EIGS):
+    """
+    Gap around e0 of the disordered strip closed periodically along a1 (length layers):
+    min over kx of (lowest eigenvalue above e0 - highest below e0), by shift-invert eigsh.
+    """
+    length = len(disorder)
+    onsite = sparse.kron(sparse.identity(length), sparse.csr_matrix(h00)) + sparse.diags(disorder.ravel())
+    gap = np.inf
+    for kx in kx_vals:
+        # layer n -> n + 1, and the last layer back to the first with the Bloch phase
+        shift = sparse.lil_matrix((length, length), dtype=complex)
+        for n in range(length):
+            shift[n, (n + 1) % length] += np.exp(2j * np.pi * kx) if n == length - 1 else 1.0
+        hop = sparse.kron(shift.tocsr(), sparse.csr_matrix(h01))
+        H = (onsite + hop + hop.conj().T).tocsc()
+        ev = eigsh(H, k=min(k, H.shape[0] - 2), sigma=e0, return_eigenvectors=False)
+        above, below = ev[ev > e0], ev[ev <= e0]
+        if len(above) and len(below):
+            gap = min(gap, above.min() - below.max())
+    return float(gap)
+
+
+def _realisation(task):
+    """Worker: one realisation. task = (index, config); the clean layers are in dos._MODEL."""
+    i, cfg = task
+    d = dos._MODEL
+    rng = np.random.default_rng([cfg['seed'], i])
+    disorder = draw_disorder(rng, cfg['kind'], cfg['strength'], cfg['concentration'], cfg['length'],
+                             d['sites'], d['spin'], d['nsites'])
+    if cfg['observable'] == 'conductance':
+        values = transmission(np.array(cfg['energies']), d['h00'], d['h01'], cfg['length'], disorder)
+    else:
+        values = [edge_gap(d['h00'], d['h01'], disorder, cfg['energies'][0])]
+    return {'realisation': i, 'values': [float(v) for v in values]}
+
+
+def _same_config(a, b):
+    # The ensemble size may grow between runs
+    return {k: v for k, v in a.items() if k != 'realisations'} == {k: v for k, v in b.items() if k != 'realisations'}
+
+
+def read_results(fname, config):
+    """
+    Realisations already in fname (must have been written with the same config). A line
+    cut short by a killed job is dropped.
+    """
+    if not os.path.exists(fname):
+        return []
+    lines = []
+    with open(fname, 'r') as f:
+        for l in f:
+            try:
+                lines.append(json.loads(l))
+            except json.JSONDecodeError:
+                continue
+    if not lines or not _same_config(lines[0].get('config', {}), config):
+        raise ValueError(f"{fname} was written with a different configuration; use another --out")
+    return lines[1:]
+
+
+def ensemble_stats(results):
+    """Welford mean / variance over the realisations, per value."""
+    n, mean, m2 = 0, None, None
+    for r in results:
+        x = np.array(r['values'])
+        n += 1
+        if mean is None:
+            mean, m2 = x.copy(), np.zeros_like(x)
+        else:
+            delta = x - mean
+            mean += delta / n
+            m2 += delta * (x - mean)
+    if n == 0:
+        return {'n': 0}
+    var = m2 / (n - 1) if n > 1 else np.zeros_like(mean)
+    return {'n': n, 'mean': mean.tolist(), 'variance': var.tolist(), 'stderr': np.sqrt(var / n).tolist()}
+
+
+def _write_summary(fname, config, stats):
+    tmp = fname + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'config': config, **stats, 'updated': time.strftime('%Y-%m-%d %H:%M:%S')}, f, indent=1)
+    os.replace(tmp, fname)
+
+
+def run_ensemble(model, win, config, out, processes=None):
+    """Runs the missing realisations of config, streaming them to out (.jsonl) and its summary."""
+    h00, h01 = principal_layers(ribbon_slices(model, config['width']))
+    layer_slices = len(h00) // (config['width'] * model['num_wann'])
+    sites, spin, nsites = site_labels(model, win, config['width'], layer_slices)
+    results = read_results(out, config)
+    done = {r['realisation'] for r in results}
+    todo = [(i, config) for i in range(config['realisations']) if i not in done]
+    if not results:
+        with open(out, 'w') as f:
+            f.write(json.dumps({'config': config}) + '\n')
+    else:
+        with open(out, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n': # partial line from a killed job
+                f.write(b'\n')
+    summary = os.path.splitext(out)[0] + '.summary.json'
+    print(f"{len(done)} realisations on disk, {len(todo)} to run -> {out}")
+
+    layers = {'h00': h00, 'h01': h01, 'sites': sites, 'spin': spin, 'nsites': nsites}
+    t0 = time.perf_counter()
+    with open(out, 'a') as f:
+        for count, res in enumerate(map_slabs(_realisation, todo, layers, processes=processes), 1):
+            f.write(json.dumps(res) + '\n')
+            f.flush()
+            results.append(res)
+            stats = ensemble_stats(results)
+            _write_summary(summary, config, stats)
+            if count % 10 == 0 or count == len(todo):
+                mean = ', '.join(f"{m:.4f}" for m in stats['mean'])
+                print(f"  {stats['n']:5d} done ({time.perf_counter() - t0:.1f} s): mean = [{mean}]")
+    return ensemble_stats(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Disorder ensembles of ribbon conductance or edge gap.")
+    parser.add_argument('hr', nargs='?', default=FNAME)
+    parser.add_argument('--win', default=WIN_FILE, help="sites and spins of the WFs (optional)")
+    parser.add_argument('--kind', choices=['anderson', 'nonmagnetic', 'magnetic'], default='anderson')
+    parser.add_argument('--strength', type=float, required=True, help="W (eV)")
+    parser.add_argument('--concentration', type=float, default=CONCENTRATION)
+    parser.add_argument('--observable', choices=['conductance', 'edge_gap'], default='conductance')
+    parser.add_argument('--energies', type=float, nargs='+', default=ENERGIES,
+                        help="conductance energies, or E0 of the edge gap (eV)")
+    parser.add_argument('--width', type=int, default=WIDTH)
+    parser.add_argument('--length', type=int, default=LENGTH)
+    parser.add_argument('-n', '--realisations', type=int, default=REALISATIONS)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--out', default=None, help="results file (default: derived from the settings)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.hr):
+        print(f"Error: {args.hr} not found.")
+        return 1
+    model = load_hr_dat(args.hr)
+    win = parse_win(args.win) if os.path.exists(args.win) else None
+    config = {'hr': os.path.abspath(args.hr), 'kind': args.kind, 'strength': args.strength,
+              'concentration': args.concentration, 'observable': args.observable, 'energies': args.energies,
+              'width': args.width, 'length': args.length, 'realisations': args.realisations, 'seed': args.seed}
+    out = args.out or (f"disorder_{args.kind}_W{args.strength:g}_{args.observable}"
+                       f"_{args.width}x{args.length}_seed{args.seed}.jsonl")
+    try:
+        stats = run_ensemble(model, win, config, out, args.processes)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    label = 'T(E)' if args.observable == 'conductance' else 'gap (eV)'
+    for j, e in enumerate(args.energies if args.observable == 'conductance' else args.energies[:1]):
+        print(f"E = {e:+.3f} eV: <{label}> = {stats['mean'][j]:.4f} +- {stats['stderr'][j]:.4f} "
+              f"(var {stats['variance'][j]:.4f}, {stats['n']} realisations)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import os
+from multiprocessing import Pool
+
+from wannier_tb import load_hr_dat, parse_win, eigh_rows
+from fatbands import projection_mask, fat_band_weights
+from run_ledger import stage
+
+# DOS / PDOS engine on dense 2D meshes from the Wannier model.
+# The N1 x N2 mesh is streamed in slabs of k1-rows; each worker builds H(k) for its slab
+# with the separable mesh transform (wannier_tb.hk_rows), diagonalises it and returns
+# only a per-energy accumulator, so memory is constant in mesh size.
+#
+# Methods:
+#   'histogram'   : state counts per energy bin
+#   'gaussian'    : histogram on the output grid convolved with a Gaussian (sigma in eV)
+#   'tetrahedron' : 2D linear-triangle method (each mesh square split into two triangles)
+
+# --- CONFIGURATION ---
+FNAME = 'wte2_hr.dat'
+WIN_FILE = 'wte2.win'
+OUTPUT_FILE = 'Fig_DOS_Wannier.png'
+MESH = (500, 250)
+
+_MODEL = None
+_MASK = None
+
+
+def _init_worker(model, mask):
+    global _MODEL, _MASK
+    _MODEL = model
+    _MASK = mask
+
+
+def mesh_rows(mesh, row_start, row_stop):
+    """Fractional k-points of rows [row_start, row_stop) of an N1 x N2 Gamma-centred mesh, row-major."""
+    n1, n2 = mesh
+    k1 = np.arange(row_start, row_stop) / n1
+    k2 = np.arange(n2) / n2
+    kpts = np.zeros((len(k1) * n2, 3))
+    kpts[:, 0] = np.repeat(k1, n2)
+    kpts[:, 1] = np.tile(k2, len(k1))
+    return kpts
+
+
+def slab_tasks(mesh, rows_per_chunk):
+    """(row_start, row_stop) pairs covering the k1 direction."""
+    return [(a, min(a + rows_per_chunk, mesh[0])) for a in range(0, mesh[0], rows_per_chunk)]
+
+
+def map_slabs(func, tasks, model, mask=None, processes=None):
+    """
+    Runs func(task) over the slab tasks, in a process pool when processes != 1,
+    and yields the results as they finish (order not guaranteed).
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes == 1 or len(tasks) == 1:
+        _init_worker(model, mask)
+        for t in tasks:
+            yield func(t)
+        return
+    with Pool(processes, initializer=_init_worker, initargs=(model, mask)) as pool:
+        for res in pool.imap_unordered(func, tasks):
+            yield res
+
+
+def _triangle_idos(e_sorted, edges):
+    """
+    Linear-triangle integrated DOS evaluated at the bin edges, returned sparsely.
+    e_sorted : (T, 3) corner energies, ascending per triangle.
+    Returns (edge_index, value) for edges inside each [e1, e3) range, and the first
+    edge index above e3 for every triangle (where the triangle's IDOS reaches 1).
+    """
+    e1, e2, e3 = e_sorted.T
+    lo = np.searchsorted(edges, e1, side='left')
+    hi = np.searchsorted(edges, e3, side='left')
+    counts = hi - lo
+
+    tri = np.repeat(np.arange(len(e1)), counts)
+    offs = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    idx = np.repeat(lo, counts) + offs
+    E = edges[idx]
+    a, b, c = e1[tri], e2[tri], e3[tri]
+
+    tiny = 1e-12
+    lower = (E - a)**2 / np.maximum((b - a) * (c - a), tiny)
+    upper = 1.0 - (c - E)**2 / np.maximum((c - a) * (c - b), tiny)
+    value = np.where(E < b, lower, upper)
+    return idx, tri, value, hi
+
+
+def _slab_accumulate(task):
+    """Worker: diagonalise one slab and bin it. task = (row_start, row_stop, mesh, edges, method, precision)."""
+    a, b, mesh, edges, method, precision = task
+    n1, n2 = mesh
+    nbins = len(edges) - 1
+    nproj = 0 if _MASK is None else _MASK.shape[1]
+    want_vecs = _MASK is not None
+
+    # One extra row closes the triangles of the last row (k1 = 1 is k1 = 0 by periodicity)
+    stop = b + 1 if method == 'tetrahedron' else b
+    res = eigh_rows(_MODEL, mesh, a, stop, vectors=want_vecs, precision=precision)
+    evals, evecs = res if want_vecs else (res, None)
+    nb = evals.shape[1]
+    weights = np.ones(evals.shape + (1,))
+    if want_vecs:
+        weights = np.concatenate([weights, fat_band_weights(evecs, _MASK)], axis=-1)
+
+    if method != 'tetrahedron':
+        # Histogram: every state carries weight 1/Nk (states per cell)
+        ibin = np.searchsorted(edges, evals.ravel(), side='right') - 1
+        keep = (ibin >= 0) & (ibin < nbins)
+        acc = np.zeros((nbins, 1 + nproj))
+        w = weights.reshape(-1, 1 + nproj)[keep]
+        for j in range(1 + nproj):
+            acc[:, j] = np.bincount(ibin[keep], weights=w[:, j], minlength=nbins)
+        return acc / (n1 * n2)
+
+    # --- Linear triangles ---
+    rows = b - a + 1
+    E = evals.reshape(rows, n2, nb)
+    W = weights.reshape(rows, n2, nb, 1 + nproj)
+    nxt = np.roll(np.arange(n2), -1)
+    # Square (i, j): corners c00, c10, c01, c11 -> triangles (c00, c10, c11) and (c00, c01, c11)
+    c00, c10 = E[:-1], E[1:]
+    c01, c11 = E[:-1][:, nxt], E[1:][:, nxt]
+    corners = np.concatenate([np.stack([c00, c10, c11], axis=-1),
+                              np.stack([c00, c01, c11], axis=-1)]).reshape(-1, 3)
+    w00, w10 = W[:-1], W[1:]
+    w01, w11 = W[:-1][:, nxt], W[1:][:, nxt]
+    tri_w = np.concatenate([(w00 + w10 + w11) / 3.0, (w00 + w01 + w11) / 3.0]).reshape(-1, 1 + nproj)
+
+    corners.sort(axis=1)
+    idx, tri, value, hi = _triangle_idos(corners, edges)
+
+    # IDOS at every edge: partial values inside each triangle's range + 1 above it
+    idos = np.zeros((len(edges), 1 + nproj))
+    full = np.zeros((len(edges) + 1, 1 + nproj))
+    for j in range(1 + nproj):
+        idos[:, j] = np.bincount(idx, weights=value * tri_w[tri, j], minlength=len(edges))
+        full[:, j] = np.bincount(hi, weights=tri_w[:, j], minlength=len(edges) + 1)
+    idos += np.cumsum(full, axis=0)[:len(edges)]
+
+    # Bin content = IDOS difference across the bin; triangle area = 1 / (2 N1 N2)
+    return np.diff(idos, axis=0) / (2 * n1 * n2)
+
+
+def compute_dos(model, energies, mesh=MESH, method='gaussian', sigma=0.02, mask=None,
+                rows_per_chunk=4, processes=None, precision='double'):
+    """
+    DOS (states / eV / cell) on a uniform energy grid.
+    mask : optional (num_wann, nproj) projection mask (see fatbands.projection_mask) for PDOS.
+    precision : 'single' builds and diagonalises H(k) in complex64 (see wannier_tb.PRECISIONS).
+    Returns dos (nE,) and pdos (nE, nproj) or None.
+    """
+    energies = np.asarray(energies, dtype=float)
+    de = energies[1] - energies[0]
+    edges = np.concatenate([energies - de / 2, [energies[-1] + de / 2]])
+
+    tasks = [(a, b, tuple(mesh), edges, method, precision) for a, b in slab_tasks(mesh, rows_per_chunk)]
+    acc = None
+    for part in map_slabs(_slab_accumulate, tasks, model, mask, processes):
+        acc = part if acc is None else acc + part
+
+    acc = acc / de
+    if method == 'gaussian':
+        half = int(np.ceil(5 * sigma / de))
+        x = np.arange(-half, half + 1) * de
+        kernel = np.exp(-0.5 * (x / sigma)**2)
+        kernel /= kernel.sum()
+        acc = np.stack([np.convolve(acc[:, j], kernel, mode='same') for j in range(acc.shape[1])], axis=1)
+
+    pdos = acc[:, 1:] if acc.shape[1] > 1 else None
+    return acc[:, 0], pdos
+
+
+def plot_dos():
+    for f in (FNAME, WIN_FILE):
+        if not os.path.exists(f):
+            print(f"Error: {f} not found.")
+            return
+
+    model = load_hr_dat(FNAME)
+    win = parse_win(WIN_FILE)
+    from fermi import get_fermi_level
+    ef = get_fermi_level(FNAME)
+    energies = np.linspace(ef - 2.0, ef + 2.0, 801)
+    print(f"DOS on {MESH[0]}x{MESH[1]} mesh, {model['num_wann']} orbitals...")
+    dos, pdos = compute_dos(model, energies, MESH, method='tetrahedron', mask=projection_mask(win))
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    ax.plot(energies - ef, dos, color='black', linewidth=1.5, label='Total')
+    for j, (name, color) in enumerate(zip(win['projections'], ['blue', 'green', 'orange', 'purple'])):
+        ax.plot(energies - ef, pdos[:, j], color=color, linewidth=2, label=name)
+        ax.fill_between(energies - ef, 0, pdos[:, j], color=color, alpha=0.1)
+
+    ax.axvline(0, color='red', linestyle='--', label='$E_F$')
+    ax.set_xlim(-2, 2)
+    ax.set_ylim(0, None)
+    ax.set_xlabel(r"Energy ($E - E_F$) [eV]")
+    ax.set_ylabel("Density of States [states/eV]")
+    ax.set_title(f"Wannier DOS ({MESH[0]}x{MESH[1]} mesh)")
+    ax.legend()
+
+    plt.tight_layout()
+    plt.savefig(OUTPUT_FILE, dpi=300)
+    print(f"DOS Plot Generated: {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    with stage('dos.py', label=f"{MESH[0]}x{MESH[1]}"):
+        plot_dos()
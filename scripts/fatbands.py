@@ -0,0 +1,94 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import os
+
+from wannier_tb import load_hr_dat, parse_win, band_path, eigh_k, wannier_orbitals
+from band_render import draw_bands
+from run_ledger import stage
+
+# Orbital-projected ("fat") bands straight from the Wannier model.
+# Replaces the projwfc.x route of plot_pdos.py for the W-d / Te-p inversion figure:
+# no extra DFT run, weights come from the same eigenvectors as the band path.
+
+# --- CONFIGURATION ---
+FNAME = 'wte2_hr.dat'
+WIN_FILE = 'wte2.win'
+OUTPUT_FILE = 'Fig_FatBands_Inversion.png'
+WEIGHTS_FILE = 'wte2_fatbands.npz'
+NUM_POINTS = 100     # bands_num_points of the first path segment (as in wte2.win)
+
+
+def projection_mask(win):
+    """
+    (num_wann, nproj) 0/1 mask: column j selects the Wannier functions generated by
+    line j of the `begin projections` block (e.g. W:d, Te:p).
+    """
+    orbs = wannier_orbitals(win)
+    nproj = len(win['projections'])
+    mask = np.zeros((len(orbs['group']), nproj), dtype=np.float32)
+    mask[np.arange(len(orbs['group'])), orbs['group']] = 1.0
+    return mask
+
+
+def fat_band_weights(evecs, mask):
+    """
+    Reduces eigenvectors U (nk, nw, nbands) to projection weights in one contraction:
+    w[k, n, j] = sum_i |U[k, i, n]|^2 mask[i, j]. Returns (nk, nbands, nproj) float32.
+    """
+    abs2 = (evecs.real**2 + evecs.imag**2).astype(np.float32)
+    return np.einsum('kin,ij->knj', abs2, mask, optimize=True)
+
+
+def compute_fat_bands(model, win, num_points=NUM_POINTS):
+    """Band path eigenvalues and projection weights. Returns x, evals (nk, nb), weights, ticks, labels."""
+    kpts, x, ticks, labels = band_path(win, num_points)
+    evals, evecs = eigh_k(model, kpts, vectors=True)
+    weights = fat_band_weights(evecs, projection_mask(win))
+    return x, evals, weights, ticks, labels
+
+
+def plot_fat_bands():
+    for f in (FNAME, WIN_FILE):
+        if not os.path.exists(f):
+            print(f"Error: {f} not found.")
+            return
+
+    model = load_hr_dat(FNAME)
+    win = parse_win(WIN_FILE)
+    print(f"Hamiltonian Loaded. Orbitals: {model['num_wann']}, projections: {win['projections']}")
+
+    from fermi import get_fermi_level
+    ef = get_fermi_level(FNAME)
+    print(f"Fermi level: {ef:.4f} eV")
+
+    x, evals, weights, ticks, labels = compute_fat_bands(model, win)
+    np.savez(WEIGHTS_FILE, x=x, evals=evals, weights=weights, projections=win['projections'])
+    print(f"Weights {weights.shape} ({weights.dtype}) saved to {WEIGHTS_FILE}")
+
+    # Colour = W-d fraction of each state (first projection line vs second)
+    frac = weights[..., 0] / np.maximum(weights.sum(axis=-1), 1e-12)
+
+    fig, ax = plt.subplots(figsize=(7, 6))
+    lc = draw_bands(ax, x, evals.T - ef, values=frac.T, cmap='coolwarm_r', norm=plt.Normalize(0, 1),
+                    linewidth=2.0)
+    cbar = fig.colorbar(lc, ax=ax)
+    cbar.set_label(f"{win['projections'][0]} weight  (1 - {win['projections'][1]})")
+
+    ax.axhline(0, color='black', linestyle='--', linewidth=1)
+    for t in ticks:
+        ax.axvline(t, color='gray', linewidth=0.8, alpha=0.5)
+    ax.set_xticks(ticks)
+    ax.set_xticklabels([r'$\Gamma$' if l.upper() == 'G' else l for l in labels])
+    ax.set_xlim(x[0], x[-1])
+    ax.set_ylim(-2, 2) # Zoom on inversion
+    ax.set_ylabel(r"Energy ($E - E_F$) [eV]")
+    ax.set_title("Orbital Inversion (Fat Bands)")
+
+    plt.tight_layout()
+    plt.savefig(OUTPUT_FILE, dpi=300)
+    print(f"Fat band plot generated: {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    with stage('fatbands.py'):
+        plot_fat_bands()
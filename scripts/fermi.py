@@ -0,0 +1,160 @@
+import numpy as np
+import hashlib
+import json
+import os
+import re
+from scipy.special import erf
+
+from wannier_tb import load_hr_dat
+from dos import compute_dos
+from run_ledger import stage
+
+# Fermi level from the Wannier model instead of a hardcoded ef = -2.8364.
+# One streamed pass over a dense k-mesh bins every eigenvalue into a fine histogram
+# (the dos.py slab pipeline); E_F is then found by bisection on the smeared electron
+# count over that histogram, with the smearing of wte2.scf.in (mv, degauss = 0.001 Ry).
+# The result is cached as <hr.dat>.fermi.json next to the model.
+
+# --- CONFIGURATION ---
+FNAME = 'wte2_hr.dat'
+SCF_FILE = 'wte2.scf.in'
+MESH = (1000, 500)
+# Electrons in the 44-orbital W-d / Te-p manifold: Te 5p^6 x 4 + W 5d^2 x 2 (W4+ / Te2-)
+NUM_ELECTRONS = 28
+BIN_WIDTH = 2e-4 # eV, histogram resolution (<< degauss = 13.6 meV)
+
+RY_TO_EV = 13.605693
+
+
+def occupation(x, smearing='mv'):
+    """Occupation of a state at x = (E_F - E) / degauss (QE wgauss conventions)."""
+    smearing = smearing.lower()
+    if smearing in ('mv', 'm-v', 'cold', 'marzari-vanderbilt'):
+        xp = x - 1.0 / np.sqrt(2.0)
+        return 0.5 * erf(xp) + np.exp(-np.minimum(xp**2, 200.0)) / np.sqrt(2.0 * np.pi) + 0.5
+    if smearing in ('gaussian', 'gauss'):
+        return 0.5 * (1.0 + erf(x))
+    if smearing in ('fd', 'f-d', 'fermi-dirac'):
+        return 0.5 * (1.0 + np.tanh(0.5 * x))
+    raise ValueError(f"Unsupported smearing '{smearing}'")
+
+
+def read_smearing(scf_file):
+    """Returns (smearing, degauss in eV) from a pw.x input, defaulting to mv / 0.001 Ry."""
+    smearing, degauss = 'mv', 0.001
+    if os.path.exists(scf_file):
+        with open(scf_file, 'r') as f:
+            text = f.read()
+        m = re.search(r"smearing\s*=\s*'([^']+)'", text)
+        if m: smearing = m.group(1)
+        m = re.search(r"degauss\s*=\s*([\d\.eEdD+-]+)", text)
+        if m: degauss = float(m.group(1).replace('d', 'e').replace('D', 'e'))
+    return smearing, degauss * RY_TO_EV
+
+
+def spectrum_bound(model):
+    """Upper bound on |E| over the whole BZ: sum_R of the row-sum norm of H(R)."""
+    return np.abs(model['ham']).sum(axis=2).max(axis=1).sum()
+
+
+def eigenvalue_histogram(model, mesh=MESH, bin_width=BIN_WIDTH, processes=None):
+    """Streams the mesh once; returns bin centres and states per cell in each bin."""
+    bound = spectrum_bound(model)
+    nbins = int(np.ceil(2 * bound / bin_width)) + 1
+    centres = -bound + bin_width * np.arange(nbins)
+    dos, _ = compute_dos(model, centres, mesh, method='histogram', processes=processes)
+    return centres, dos * bin_width
+
+
+def solve_fermi_level(centres, counts, n_electrons, smearing='mv', degauss=0.001 * RY_TO_EV, tol=1e-6):
+    """Bisection on N(E_F) = sum_bins counts * f((E_F - E) / degauss) = n_electrons."""
+    lo = centres[0] - 10 * degauss
+    hi = centres[-1] + 10 * degauss
+    if not (counts.sum() > n_electrons):
+        raise ValueError(f"Model holds {counts.sum():.2f} states, cannot place {n_electrons} electrons")
+
+    # Only bins within ~10 degauss matter away from the tails; restricting keeps each step cheap
+    cum = np.concatenate([[0.0], np.cumsum(counts)])
+    while hi - lo > tol:
+        mid = 0.5 * (lo + hi)
+        i0 = np.searchsorted(centres, mid - 10 * degauss)
+        i1 = np.searchsorted(centres, mid + 10 * degauss)
+        n = cum[i0] + np.sum(counts[i0:i1] * occupation((mid - centres[i0:i1]) / degauss, smearing))
+        if n < n_electrons:
+            lo = mid
+        else:
+            hi = mid
+    return 0.5 * (lo + hi)
+
+
+def _file_hash(fname):
+    h = hashlib.sha1()
+    with open(fname, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def fermi_level(hr_file=FNAME, n_electrons=NUM_ELECTRONS, mesh=MESH, scf_file=SCF_FILE,
+                processes=None, use_cache=True):
+    """
+    E_F (eV) of the Wannier model, cached in <hr_file>.fermi.json. The cache is reused
+    only if the model file, mesh, electron count and smearing all match.
+    """
+    smearing, degauss = read_smearing(scf_file)
+    key = {'hr_sha1': _file_hash(hr_file), 'mesh': list(mesh), 'n_electrons': n_electrons,
+           'smearing': smearing, 'degauss_ev': degauss}
+    cache_file = hr_file + '.fermi.json'
+
+    if use_cache and os.path.exists(cache_file):
+        with open(cache_file, 'r') as f:
+            cached = json.load(f)
+        if all(cached.get(k) == v for k, v in key.items()):
+            return cached['fermi_energy']
+
+    model = load_hr_dat(hr_file)
+    centres, counts = eigenvalue_histogram(model, mesh, processes=processes)
+    ef = solve_fermi_level(centres, counts, n_electrons, smearing, degauss)
+
+    with open(cache_file, 'w') as f:
+        json.dump(dict(key, fermi_energy=ef), f, indent=2)
+    return ef
+
+
+def read_pw_fermi(outfile):
+    """Last 'the Fermi energy is X ev' line of a pw.x output, or None."""
+    if not os.path.exists(outfile):
+        return None
+    ef = None
+    with open(outfile, 'r') as f:
+        for line in f:
+            m = re.search(r'the Fermi energy is\s+([-\d\.]+)', line)
+            if m: ef = float(m.group(1))
+    return ef
+
+
+def get_fermi_level(hr_file=FNAME, pw_outputs=('wte2.nscf.out', 'wte2.scf.out'), default=None):
+    """
+    E_F for the plotting scripts: Wannier model if hr.dat is present, else the pw.x
+    output, else `default` (raises FileNotFoundError when no default is given).
+    """
+    if os.path.exists(hr_file):
+        return fermi_level(hr_file)
+    for out in pw_outputs:
+        ef = read_pw_fermi(out)
+        if ef is not None:
+            return ef
+    if default is None:
+        raise FileNotFoundError(f"No Fermi level source: {hr_file} or {', '.join(pw_outputs)}")
+    return default
+
+
+if __name__ == "__main__":
+    if not os.path.exists(FNAME):
+        print(f"Error: {FNAME} not found.")
+    else:
+        smearing, degauss = read_smearing(SCF_FILE)
+        print(f"Solving E_F on {MESH[0]}x{MESH[1]} mesh ({smearing}, degauss = {degauss*1000:.1f} meV)...")
+        with stage('fermi.py', label=f"{MESH[0]}x{MESH[1]}"):
+            ef = fermi_level(FNAME)
+        print(f"Fermi level: {ef:.4f} eV (cached in {FNAME}.fermi.json)")
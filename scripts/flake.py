@@ -0,0 +1,183 @@
+import argparse
+import os
+import sys
+import time
+
+import matplotlib.pyplot as plt
+import numpy as np
+from scipy.sparse.linalg import eigsh
+
+from fermi import fermi_level
+from wannier_tb import load_hr_dat, parse_win, supercell_csr, wannier_orbitals
+
+# Finite flakes of the Wannier model: the hr.dat hoppings tiled over an N1 x N2 patch of
+# cells with open boundaries in both directions (wannier_tb.supercell_csr, assembled
+# straight into CSR by index arithmetic over all cells at once, one pass per R), so a
+# 50 x 50 flake of 1T'-WTe2 (~110k WFs) fits in memory. The patch can be cut down by a
+#   shape       : 'rectangle' (the full patch) or 'disc' (cells within a Cartesian circle,
+#                 .win unit cell, of diameter the shorter side of the patch)
+#   termination : atoms (indices in the .win atoms block) stripped from the outermost
+#                 cell row of an edge, e.g. a Te-terminated instead of W-terminated edge
+#   mask        : any (N1, N2) or (N1, N2, nw) boolean .npy (vacancies, holes, ...)
+# The NSTATES eigenstates closest to E_F come from shift-invert Lanczos (eigsh with
+# sigma = E_F, one sparse LU of H - E_F), never from the full spectrum; their density
+# |psi|^2 is summed per atomic site and plotted at the Cartesian site positions. In the
+# topological phase the in-gap states sit on the boundary of the flake.
+#
+# Usage:
+#   python flake.py                                    # wte2_hr.dat + wte2.win, 50 x 50
+#   python flake.py model_library/kane_mele_hr.dat --win model_library/kane_mele.win \
+#       --n1 40 --n2 40 --shape disc --efermi 0.0
+#   python flake.py --terminate top:0,1 --terminate bottom:0,1
+
+# --- CONFIGURATION ---
+FNAME = 'wte2_hr.dat'
+WIN_FILE = 'wte2.win'
+N1, N2 = 50, 50     # cells
+NSTATES = 8         # eigenstates closest to E_F
+ENERGY_CUT = 1e-3   # eV, hoppings dropped before assembling the sparse H
+OUTPUT_FILE = 'Fig_Flake_States.png'
+EDGES = ('left', 'right', 'bottom', 'top') # c1 = 0, c1 = N1 - 1, c2 = 0, c2 = N2 - 1
+
+
+def site_positions(win, nw, n1, n2):
+    """
+    Cartesian positions (Angstrom) and site index of every WF of the patch, basis order
+    of supercell_csr. Without a .win the sites are the cells (unit lattice vectors).
+    """
+    c1, c2 = (c.ravel() for c in np.meshgrid(np.arange(n1), np.arange(n2), indexing='ij'))
+    cells = np.column_stack([c1, c2, np.zeros_like(c1)])
+    if win is None:
+        atom, frac, cell = np.zeros(nw, dtype=int), np.zeros((1, 3)), np.eye(3)
+    else:
+        atom, frac, cell = wannier_orbitals(win)['atom'], np.asarray(win['atoms'][1]), np.asarray(win['unit_cell'])
+    natoms = atom.max() + 1
+    pos = ((cells[:, None, :] + frac[atom][None, :, :]) @ cell).reshape(-1, 3)
+    sites = (np.arange(n1 * n2)[:, None] * natoms + atom[None, :]).ravel()
+    return pos, sites
+
+
+def flake_mask(win, nw, n1, n2, shape='rectangle', terminations=None, mask=None):
+    """
+    Boolean (n1, n2, nw) mask of the WFs kept in the flake. terminations maps an edge
+    name (EDGES) to the atom indices removed from its outermost row of cells.
+    """
+    keep = np.ones((n1, n2, nw), dtype=bool)
+    if shape == 'disc':
+        cell = np.eye(3) if win is None else np.asarray(win['unit_cell'])
+        c1, c2 = np.meshgrid(np.arange(n1), np.arange(n2), indexing='ij')
+        d = np.stack([c1 - (n1 - 1) / 2, c2 - (n2 - 1) / 2], axis=-1) @ cell[:2, :2]
+        radius = 0.5 * min(n1 * np.linalg.norm(cell[0, :2]), n2 * np.linalg.norm(cell[1, :2]))
+        keep &= (np.linalg.norm(d, axis=-1) <= radius)[:, :, None]
+    elif shape != 'rectangle':
+        raise ValueError(f"Unknown flake shape '{shape}'")
+
+    if terminations:
+        if win is None:
+            raise ValueError("edge terminations need the atoms of the .win")
+        atom = wannier_orbitals(win)['atom']
+        rows = {'left': (0, slice(None)), 'right': (n1 - 1, slice(None)),
+                'bottom': (slice(None), 0), 'top': (slice(None), n2 - 1)}
+        for edge, atoms in terminations.items():
+            keep[rows[edge] + (np.isin(atom, atoms),)] = False
+
+    if mask is not None:
+        keep &= np.broadcast_to(np.asarray(mask, dtype=bool).reshape(n1, n2, -1), keep.shape)
+    return keep
+
+
+def states_near(H, e0, nstates=NSTATES):
+    """The nstates eigenpairs of the sparse H closest to e0 (shift-invert), sorted by energy."""
+    evals, evecs = eigsh(H.tocsc(), k=nstates, sigma=e0, which='LM')
+    order = np.argsort(evals)
+    return evals[order], evecs[:, order]
+
+
+def site_density(evecs, sites):
+    """|psi|^2 summed over the WFs of each site: (nsites, nstates), sites relabelled 0.. in order."""
+    labels, inv = np.unique(sites, return_inverse=True)
+    rho = np.zeros((len(labels), evecs.shape[1]))
+    np.add.at(rho, inv.ravel(), np.abs(evecs) ** 2)
+    return labels, rho
+
+
+def parse_terminations(items):
+    """['top:0,1', 'left:2'] -> {'top': [0, 1], 'left': [2]}."""
+    out = {}
+    for item in items or []:
+        edge, _, atoms = item.partition(':')
+        if edge not in EDGES or not atoms:
+            raise ValueError(f"bad termination '{item}' (expected EDGE:atom[,atom...], EDGE in {EDGES})")
+        out.setdefault(edge, []).extend(int(a) for a in atoms.split(','))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="States near E_F of an open-boundary flake of the Wannier model.")
+    parser.add_argument('hr', nargs='?', default=FNAME)
+    parser.add_argument('--win', default=WIN_FILE, help="unit cell and sites of the WFs (optional)")
+    parser.add_argument('--n1', type=int, default=N1, help="cells along a1")
+    parser.add_argument('--n2', type=int, default=N2, help="cells along a2")
+    parser.add_argument('--shape', choices=['rectangle', 'disc'], default='rectangle')
+    parser.add_argument('--terminate', action='append', metavar='EDGE:ATOMS',
+                        help="strip these .win atoms from the outer cells of an edge (repeatable)")
+    parser.add_argument('--mask', default=None, help="boolean .npy, (N1, N2) or (N1, N2, nw)")
+    parser.add_argument('--efermi', type=float, default=None, help="eV (default: fermi.fermi_level of the model)")
+    parser.add_argument('--nstates', type=int, default=NSTATES)
+    parser.add_argument('--energy-cut', type=float, default=ENERGY_CUT, help="hopping pruning (eV)")
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    for fname in [args.hr] + ([args.mask] if args.mask else []):
+        if not os.path.exists(fname):
+            print(f"Error: {fname} not found.")
+            return 1
+    model = load_hr_dat(args.hr, energy_cut=args.energy_cut)
+    nw = model['num_wann']
+    win = parse_win(args.win) if os.path.exists(args.win) else None
+    if args.efermi is None:
+        args.efermi = fermi_level(args.hr)
+    try:
+        keep = flake_mask(win, nw, args.n1, args.n2, args.shape, parse_terminations(args.terminate),
+                          np.load(args.mask) if args.mask else None)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    t0 = time.perf_counter()
+    H = supercell_csr(model, args.n1, args.n2, keep=keep)
+    print(f"{args.hr}: {args.shape} flake {args.n1} x {args.n2} cells, {H.shape[0]} WFs, {H.nnz} non-zeros "
+          f"({H.data.nbytes / 1e6:.1f} MB), built in {time.perf_counter() - t0:.1f} s")
+    t0 = time.perf_counter()
+    evals, evecs = states_near(H, args.efermi, args.nstates)
+    print(f"  {args.nstates} states closest to E_F = {args.efermi:.4f} eV in {time.perf_counter() - t0:.1f} s:")
+    for e in evals:
+        print(f"    {e - args.efermi:+10.5f} eV")
+
+    pos, sites = site_positions(win, nw, args.n1, args.n2)
+    labels, rho = site_density(evecs, sites[keep.ravel()])
+    # one position per kept site (its first WF)
+    first = np.unique(sites[keep.ravel()], return_index=True)[1]
+    xy = pos[keep.ravel()][first, :2]
+    out = os.path.splitext(args.output)[0] + '.npz'
+    np.savez(out, energies=evals, efermi=args.efermi, positions=xy, density=rho)
+
+    closest = np.argmin(np.abs(evals - args.efermi))
+    fig, axes = plt.subplots(1, 2, figsize=(11, 5))
+    for ax, (title, w) in zip(axes, ((f"closest state, E - E_F = {evals[closest] - args.efermi:+.4f} eV",
+                                      rho[:, closest]),
+                                     (f"sum of the {args.nstates} states", rho.sum(axis=1)))):
+        sc = ax.scatter(xy[:, 0], xy[:, 1], c=w, s=4, cmap='inferno')
+        ax.set_aspect('equal')
+        ax.set_title(title, fontsize=10)
+        ax.set_xlabel(r"$x$ ($\AA$)")
+        ax.set_ylabel(r"$y$ ($\AA$)")
+        fig.colorbar(sc, ax=ax, label=r"$|\psi|^2$")
+    fig.tight_layout()
+    fig.savefig(args.output, dpi=200)
+    print(f"Saved {out} and {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
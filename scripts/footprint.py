@@ -0,0 +1,201 @@
+import argparse
+import os
+import re
+import sys
+
+import numpy as np
+
+from wannier_tb import parse_win
+from run_ledger import read_ledger, run_stage
+
+# Pre-launch footprint predictor for pw2wannier90 / wannier90.x / postw90.x.
+# Sizes follow from wte2.win (mp_grid, num_bands, num_wann; spinor bands are already
+# counted in num_bands) and wte2.nscf.in (nbnd, number of k-points):
+#   .mmn : Nk * nnb blocks of num_bands^2 lines '(2f18.12)'
+#   .amn : Nk * num_bands * num_wann lines '(3i5,2f18.12)'
+#   .eig : Nk * num_bands lines '(2i5,f18.12)'
+# Peak memory uses the array inventory behind the "MEMORY ESTIMATE" block of .wout
+# (M_orig, A, U_opt, M, U: 54.1 Mb predicted vs 54.11 Mb reported for 12x6x1 / 70 / 44),
+# and for postw90 the real-space operators held by every MPI rank. Both are scaled by a
+# calibration factor: the median measured/predicted peak of the ledger runs launched via
+# `footprint.py -- <cmd>`.
+#
+# Usage:
+#   python footprint.py --ram 16                           # report + largest mesh that fits
+#   python footprint.py --ram 16 --np 4 -- mpirun -np 4 wannier90.x wte2   # check, then run
+
+# --- CONFIGURATION ---
+WIN_FILE = 'wte2.win'
+NSCF_FILE = 'wte2.nscf.in'
+NNB_DEFAULT = 6      # b-vectors: +/- one shell per axis for the orthorhombic WTe2 cell (see .wout)
+WARN_FRACTION = 0.8  # warn above this fraction of the RAM budget, refuse above 1
+BASE_GB = 0.05       # executable + MPI runtime per rank, before any array
+
+COMPLEX = 16
+REAL = 8
+BYTES_MMN_LINE = 37
+BYTES_MMN_HEADER = 26
+BYTES_AMN_LINE = 52
+BYTES_EIG_LINE = 29
+# Real-space (nw x nw x nrpts) complex operators held by postw90 per task
+POSTW90_OPERATORS = {'dos': 1, 'berry': 1 + 3, 'kubo': 1 + 3, 'shc': 1 + 3 + 3 + 9 + 9 + 9}
+
+
+def read_nscf(fname):
+    """(nbnd, number of k-points) from a pw.x nscf input; None where absent."""
+    nbnd = nk = None
+    if os.path.exists(fname):
+        with open(fname, 'r') as f:
+            text = f.read()
+        m = re.search(r'nbnd\s*=\s*(\d+)', text)
+        if m: nbnd = int(m.group(1))
+        m = re.search(r'K_POINTS[^\n]*\n\s*(\d+)', text)
+        if m: nk = int(m.group(1))
+    return nbnd, nk
+
+
+def nnb_from_wout(fname):
+    """Number of b-vectors from the shell table of an existing .wout, or None."""
+    if not os.path.exists(fname):
+        return None
+    with open(fname, 'r') as f:
+        text = f.read()
+    m = re.search(r'Shell\s+# Nearest-Neighbours.*?\n(.*?)\+-', text, re.S)
+    if not m:
+        return None
+    counts = re.findall(r'\|\s+\d+\s+(\d+)\s+\|', m.group(1))
+    return sum(int(c) for c in counts) or None
+
+
+def predict(mp_grid, num_bands, num_wann, nnb=NNB_DEFAULT, nprocs=1, task='shc', factor=1.0,
+            postw90_factor=1.0):
+    """
+    Footprint of one Wannier90 run. Returns a dict of file sizes and peak memory (GB,
+    1 GB = 2^30 bytes). Peak memory is per node: nprocs ranks each holding the arrays
+    wannier90 / postw90 keep replicated, times the calibration factor of each code.
+    """
+    nk = int(np.prod(mp_grid))
+    nb, nw = num_bands, num_wann
+    gb = 2.0**30
+
+    files = {'mmn': nk * nnb * (BYTES_MMN_HEADER + nb * nb * BYTES_MMN_LINE),
+             'amn': nk * nb * nw * BYTES_AMN_LINE,
+             'eig': nk * nb * BYTES_EIG_LINE}
+
+    disentangle = COMPLEX * nk * (nb * nb * nnb + 2 * nb * nw + nw * nw * nnb + nw * nw) + REAL * nk * nb
+    wannierise = COMPLEX * nk * (nb * nb * nnb + nb * nw + nw * nw) + REAL * nk * nb
+    # Wigner-Seitz points: one per k-point plus the degenerate boundary images
+    nrpts = nk + 2 * sum(n for n in mp_grid if n > 1)
+    postw90 = COMPLEX * POSTW90_OPERATORS[task] * nw * nw * nrpts
+
+    out = {'nk': nk, 'nnb': nnb, 'nrpts': nrpts, 'factor': factor, 'postw90_factor': postw90_factor,
+           'nprocs': nprocs,
+           'mmn_gb': files['mmn'] / gb, 'amn_gb': files['amn'] / gb, 'eig_gb': files['eig'] / gb,
+           'disentangle_gb': disentangle / gb, 'wannierise_gb': wannierise / gb, 'postw90_gb': postw90 / gb}
+    out['disk_gb'] = out['mmn_gb'] + out['amn_gb'] + out['eig_gb']
+    out['wannier90_peak_gb'] = factor * nprocs * (BASE_GB + max(out['disentangle_gb'], out['wannierise_gb']))
+    out['postw90_peak_gb'] = postw90_factor * nprocs * (BASE_GB + out['postw90_gb'])
+    return out
+
+
+def calibration_factor(records, stage='wannier90.x'):
+    """Median measured / predicted peak over ledger runs that stored a prediction (1.0 if none)."""
+    ratios = [r['peak_rss_gb'] / r['meta']['predicted_gb'] for r in records
+              if r['stage'] == stage and r['returncode'] == 0 and r['meta'].get('predicted_gb')]
+    return float(np.median(ratios)) if ratios else 1.0
+
+
+def check(peak_gb, ram_gb):
+    """'ok', 'warn' (above WARN_FRACTION of the budget) or 'refuse' (does not fit)."""
+    if peak_gb > ram_gb:
+        return 'refuse'
+    return 'warn' if peak_gb > WARN_FRACTION * ram_gb else 'ok'
+
+
+def largest_mesh(mp_grid, ram_gb, key='wannier90_peak_gb', n_max=1000, **kw):
+    """
+    Largest mesh with the aspect ratio of mp_grid (periodic directions scaled together)
+    whose predicted peak stays within ram_gb. Returns the grid, or None if even the
+    smallest one does not fit.
+    """
+    base = np.array(mp_grid)
+    ref = base[base > 1].min() if (base > 1).any() else 1
+    best = None
+    for n in range(1, n_max + 1):
+        grid = [max(1, int(round(g * n / ref))) if g > 1 else 1 for g in base]
+        if predict(grid, **kw)[key] > ram_gb:
+            break
+        best = grid
+    return best
+
+
+def print_report(pred, ram_gb=None):
+    print(f"Mesh: {pred['nk']} k-points, nnb = {pred['nnb']}, nrpts ~ {pred['nrpts']}, "
+          f"{pred['nprocs']} rank(s), calibration x{pred['factor']:.2f} / x{pred['postw90_factor']:.2f}")
+    print(f"  .mmn {pred['mmn_gb']:10.3f} GB   .amn {pred['amn_gb']:8.3f} GB   .eig {pred['eig_gb']:8.4f} GB")
+    print(f"  wannier90.x: disentangle {pred['disentangle_gb'] * 1024:9.1f} Mb, "
+          f"wannierise {pred['wannierise_gb'] * 1024:9.1f} Mb per rank -> peak {pred['wannier90_peak_gb']:.2f} GB")
+    print(f"  postw90.x:   operators {pred['postw90_gb'] * 1024:9.1f} Mb per rank -> peak {pred['postw90_peak_gb']:.2f} GB")
+    if ram_gb is not None:
+        for name in ('wannier90', 'postw90'):
+            print(f"  {name:<11s} vs {ram_gb:g} GB: {check(pred[name + '_peak_gb'], ram_gb).upper()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Predict the disk and memory footprint of a Wannier90 run.")
+    parser.add_argument('--win', default=WIN_FILE)
+    parser.add_argument('--nscf', default=NSCF_FILE)
+    parser.add_argument('--wout', default=None, help="existing .wout to read nnb from")
+    parser.add_argument('--mp-grid', type=int, nargs=3, default=None, help="override mp_grid")
+    parser.add_argument('--np', type=int, default=1, help="MPI ranks per node")
+    parser.add_argument('--task', default='shc', choices=list(POSTW90_OPERATORS))
+    parser.add_argument('--ram', type=float, default=None, help="RAM budget per node (GB)")
+    parser.add_argument('cmd', nargs=argparse.REMAINDER, help="-- command to check and run through the ledger")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.win):
+        print(f"Error: {args.win} not found.")
+        return 1
+    win = parse_win(args.win)
+    nbnd, nk_nscf = read_nscf(args.nscf)
+    mp_grid = args.mp_grid or win['mp_grid']
+    num_bands = win.get('num_bands', nbnd)
+    if nbnd is not None and nbnd != num_bands:
+        print(f"Warning: num_bands = {num_bands} in {args.win} but nbnd = {nbnd} in {args.nscf}")
+    if nk_nscf is not None and args.mp_grid is None and nk_nscf != int(np.prod(mp_grid)):
+        print(f"Warning: {args.nscf} has {nk_nscf} k-points, mp_grid {mp_grid} needs {int(np.prod(mp_grid))}")
+
+    wout = args.wout or os.path.splitext(args.win)[0] + '.wout'
+    nnb = nnb_from_wout(wout) or NNB_DEFAULT
+    records = read_ledger()
+    kw = {'num_bands': num_bands, 'num_wann': win['num_wann'], 'nnb': nnb, 'nprocs': args.np,
+          'task': args.task, 'factor': calibration_factor(records, 'wannier90.x'),
+          'postw90_factor': calibration_factor(records, 'postw90.x')}
+    pred = predict(mp_grid, **kw)
+    print_report(pred, args.ram)
+
+    if args.ram is not None:
+        for key in ('wannier90_peak_gb', 'postw90_peak_gb'):
+            grid = largest_mesh(mp_grid, args.ram, key=key, **kw)
+            print(f"  Largest mesh within {args.ram:g} GB ({key.split('_')[0]}): "
+                  f"{' x '.join(map(str, grid)) if grid else 'none'}")
+
+    cmd = args.cmd[1:] if args.cmd[:1] == ['--'] else args.cmd
+    if not cmd:
+        return 0
+    stage = 'postw90.x' if any('postw90' in c for c in cmd) else 'wannier90.x'
+    key = 'postw90_peak_gb' if stage == 'postw90.x' else 'wannier90_peak_gb'
+    factor = kw['postw90_factor'] if stage == 'postw90.x' else kw['factor']
+    if args.ram is not None and check(pred[key], args.ram) == 'refuse':
+        print(f"Refusing to launch: predicted {pred[key]:.2f} GB > {args.ram:g} GB.")
+        return 2
+    # The uncalibrated prediction is stored so later runs can refine the factor
+    meta = {'predicted_gb': pred[key] / factor, 'mp_grid': list(mp_grid), 'num_bands': num_bands,
+            'num_wann': win['num_wann'], 'nprocs': args.np}
+    rec = run_stage(cmd, stage=stage, meta=meta)
+    print(f"{stage}: measured peak {rec['peak_rss_gb']:.2f} GB (predicted {pred[key]:.2f} GB)")
+    return rec['returncode']
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+import argparse
+import os
+import sys
+import time
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+import dos
+from dos import map_slabs
+from wannier_tb import load_hr_dat, supercell_csr
+
+# Kernel polynomial method (KPM) DOS and LDOS of large ribbons and flakes, from sparse
+# Hamiltonians assembled out of the hr.dat model (wannier_tb.supercell_csr), so nothing
+# is ever diagonalised. H is rescaled into [-1, 1] with Gershgorin bounds,
+# H~ = (H - b) / a, and the Chebyshev moments
+#   mu_n = Tr T_n(H~) / N ~ (1 / R N) sum_r <r|T_n(H~)|r>
+# are estimated with R random-phase vectors (stochastic trace). Each vector only needs
+# the recursion a_(n+1) = 2 H~ a_n - a_(n-1), one sparse product per moment; for the
+# DOS alone the doubling relations mu_2n = 2 <a_n|a_n> - mu_0 and
+# mu_(2n+1) = 2 <a_(n+1)|a_n> - mu_1 halve the products. The LDOS at a few energies is
+# accumulated on the fly, rho_i(E) += g_n c_n(E) Re(r_i* a_n,i), instead of storing the
+# N x M local moments, so memory stays O(N) per vector. The reconstruction uses the
+# Jackson kernel g_n (resolution ~ pi a / M):
+#   rho(E) = [g_0 mu_0 + 2 sum_n g_n mu_n T_n(x)] / (pi a sqrt(1 - x^2)),  x = (E - b) / a
+# Blocks of vectors run in the dos.py process pool; block i always draws from
+# default_rng([SEED, i]), so the result does not depend on the number of processes.
+#
+# Usage:
+#   python kpm.py                                   # wte2_hr.dat, 200 x 20 ribbon
+#   python kpm.py model_library/kane_mele_hr.dat --geometry flake --n1 60 --n2 60 \
+#       --moments 1024 --ldos-energies 0.0 0.5
+
+# --- CONFIGURATION ---
+FNAME = 'wte2_hr.dat'
+GEOMETRY = 'ribbon'     # 'ribbon' (periodic along a1, open along a2) or 'flake' (both open)
+N1, N2 = 200, 20        # cells
+MOMENTS = 512
+VECTORS = 32
+BLOCK = 4               # random vectors per pool task (one sparse matrix-block product)
+ENERGIES = (-1.0, 1.0, 801) # eV: emin, emax, count
+ENERGY_CUT = 1e-3       # eV, hoppings dropped before assembling the sparse H
+BOUND_PAD = 0.01        # relative padding of the Gershgorin bounds
+SEED = 1234
+OUTPUT_FILE = 'Fig_KPM_DOS.png'
+
+
+def spectral_bounds(H, pad=BOUND_PAD):
+    """(a, b) with the spectrum of the Hermitian sparse H inside [b - a, b + a] (Gershgorin)."""
+    H = H.tocsr()
+    diag = np.real(H.diagonal())
+    radius = np.asarray(abs(H).sum(axis=1)).ravel() - np.abs(diag)
+    emin, emax = (diag - radius).min(), (diag + radius).max()
+    return 0.5 * (emax - emin) * (1 + pad), 0.5 * (emax + emin)
+
+
+def jackson_kernel(n):
+    """Jackson damping factors g_0 .. g_(n-1)."""
+    m = np.arange(n)
+    q = np.pi / (n + 1)
+    return ((n - m + 1) * np.cos(q * m) + np.sin(q * m) / np.tan(q)) / (n + 1)
+
+
+def chebyshev_weights(x, nmoments):
+    """c_n(x) = (2 - delta_n0) g_n T_n(x), (nmoments, len(x)): the kernel-damped series terms."""
+    c = jackson_kernel(nmoments)[:, None] * np.cos(np.arange(nmoments)[:, None] * np.arccos(x)[None, :])
+    c[1:] *= 2
+    return c
+
+
+def _moment_block(task):
+    """
+    Worker: moment sums of one block of random vectors. task = (block, nvec, nmoments,
+    seed, x_ldos); H, a, b are in dos._MODEL. Returns (mu_sum (nmoments,), ldos (N, nE)
+    or None), both summed over the vectors of the block.
+    """
+    block, nvec, nmoments, seed, x_ldos = task
+    H, a, b = dos._MODEL['H'], dos._MODEL['a'], dos._MODEL['b']
+    N = H.shape[0]
+    rng = np.random.default_rng([seed, block])
+    r = np.exp(2j * np.pi * rng.random((N, nvec)))
+    apply = lambda v: (H @ v - b * v) / a
+
+    mu = np.zeros(nmoments)
+    prev, cur = r, apply(r)
+    if x_ldos is None:
+        # doubling: nmoments / 2 products
+        mu0, mu1 = np.vdot(r, r).real, np.vdot(r, cur).real
+        mu[0], mu[1] = mu0, mu1
+        for n in range(1, (nmoments + 1) // 2):
+            if 2 * n < nmoments:
+                mu[2 * n] = 2 * np.vdot(cur, cur).real - mu0
+            nxt = 2 * apply(cur) - prev
+            if 2 * n + 1 < nmoments:
+                mu[2 * n + 1] = 2 * np.vdot(nxt, cur).real - mu1
+            prev, cur = cur, nxt
+        return mu, None
+
+    coef = chebyshev_weights(x_ldos, nmoments)
+    ldos = np.zeros((N, len(x_ldos)))
+    for n in range(nmoments):
+        if n > 0:
+            if n > 1:
+                prev, cur = cur, 2 * apply(cur) - prev
+            local = np.real(np.conj(r) * cur).sum(axis=1)
+        else:
+            local = np.real(np.conj(r) * r).sum(axis=1)
+        ldos += np.outer(local, coef[n])
+        mu[n] = local.sum()
+    return mu, ldos
+
+
+def kpm(H, energies, nmoments=MOMENTS, nvectors=VECTORS, ldos_energies=None, block=BLOCK, seed=SEED,
+        processes=None):
+    """
+    KPM DOS of the sparse Hermitian H (N x N) on `energies` (eV), in states / eV for the
+    whole system (integrates to N). With ldos_energies also the LDOS (N, nE) per basis
+    state at those energies (states / eV). Returns (dos, ldos or None, moments).
+    """
+    a, b = spectral_bounds(H)
+    N = H.shape[0]
+    x_ldos = None
+    if ldos_energies is not None:
+        x_ldos = (np.asarray(ldos_energies, dtype=float) - b) / a
+        if np.abs(x_ldos).max() >= 1:
+            raise ValueError(f"LDOS energies must lie inside the spectral bounds [{b - a:.3f}, {b + a:.3f}] eV")
+    sizes = [min(block, nvectors - s) for s in range(0, nvectors, block)]
+    tasks = [(i, n, nmoments, seed, x_ldos) for i, n in enumerate(sizes)]
+
+    mu = np.zeros(nmoments)
+    ldos = None
+    for mu_part, ldos_part in map_slabs(_moment_block, tasks, {'H': H.tocsr(), 'a': a, 'b': b},
+                                        processes=processes):
+        mu += mu_part
+        if ldos_part is not None:
+            ldos = ldos_part if ldos is None else ldos + ldos_part
+    mu /= nvectors * N
+
+    x = (np.asarray(energies, dtype=float) - b) / a
+    inside = np.abs(x) < 1
+    rho = np.zeros(len(x))
+    xi = x[inside]
+    rho[inside] = N * (chebyshev_weights(xi, nmoments).T @ mu) / (np.pi * a * np.sqrt(1 - xi ** 2))
+    if ldos is not None:
+        ldos /= nvectors * np.pi * a * np.sqrt(1 - x_ldos ** 2)[None, :]
+    return rho, ldos, mu
+
+
+def build_hamiltonian(model, geometry, n1, n2):
+    """Sparse H of the ribbon (periodic along a1, k = 0) or the open flake."""
+    if geometry == 'ribbon':
+        return supercell_csr(model, n1, n2, periodic=(True, False))
+    if geometry == 'flake':
+        return supercell_csr(model, n1, n2)
+    raise ValueError(f"Unknown geometry '{geometry}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KPM density of states and LDOS of large ribbons / flakes.")
+    parser.add_argument('hr', nargs='?', default=FNAME)
+    parser.add_argument('--geometry', choices=['ribbon', 'flake'], default=GEOMETRY)
+    parser.add_argument('--n1', type=int, default=N1, help="cells along a1")
+    parser.add_argument('--n2', type=int, default=N2, help="cells along a2")
+    parser.add_argument('--moments', type=int, default=MOMENTS)
+    parser.add_argument('--vectors', type=int, default=VECTORS, help="random vectors of the trace estimate")
+    parser.add_argument('--block', type=int, default=BLOCK, help="vectors per pool task")
+    parser.add_argument('--energy-cut', type=float, default=ENERGY_CUT, help="hopping pruning (eV)")
+    parser.add_argument('--emin', type=float, default=ENERGIES[0])
+    parser.add_argument('--emax', type=float, default=ENERGIES[1])
+    parser.add_argument('--ne', type=int, default=ENERGIES[2])
+    parser.add_argument('--shift', type=float, default=0.0, help="energy offset (e.g. E_F), eV")
+    parser.add_argument('--ldos-energies', type=float, nargs='*', default=None, help="LDOS maps at these E - shift")
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.hr):
+        print(f"Error: {args.hr} not found.")
+        return 1
+    model = load_hr_dat(args.hr, energy_cut=args.energy_cut)
+    nw = model['num_wann']
+    t0 = time.perf_counter()
+    H = build_hamiltonian(model, args.geometry, args.n1, args.n2)
+    print(f"{args.hr}: {args.geometry} {args.n1} x {args.n2} cells, N = {H.shape[0]}, "
+          f"{H.nnz} non-zeros ({H.data.nbytes / 1e6:.1f} MB), built in {time.perf_counter() - t0:.1f} s")
+
+    energies = np.linspace(args.emin, args.emax, args.ne)
+    ldos_e = None if not args.ldos_energies else np.array(args.ldos_energies)
+    t0 = time.perf_counter()
+    try:
+        rho, ldos, _ = kpm(H, energies + args.shift, args.moments, args.vectors,
+                           None if ldos_e is None else ldos_e + args.shift, args.block, args.seed, args.processes)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"  {args.moments} moments x {args.vectors} vectors in {time.perf_counter() - t0:.1f} s")
+
+    # per cell, so ribbons / flakes of different size compare directly
+    rho_cell = rho / (args.n1 * args.n2)
+    out = os.path.splitext(args.output)[0] + '.dat'
+    np.savetxt(out, np.column_stack([energies, rho_cell]), fmt='%14.6f', header='E-shift(eV) DOS(states/eV/cell)')
+    fig, ax = plt.subplots(figsize=(6, 4))
+    ax.plot(energies, rho_cell, color='#D50032')
+    ax.set_xlabel(r"$E$ (eV)")
+    ax.set_ylabel("DOS (states/eV/cell)")
+    ax.set_xlim(energies[0], energies[-1])
+    ax.set_ylim(bottom=0)
+    ax.set_title(f"KPM, {args.geometry} {args.n1}x{args.n2}, M = {args.moments}")
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(args.output, dpi=300)
+    print(f"Saved {out} and {args.output}")
+
+    if ldos is not None:
+        # summed over the WFs of each cell; rows along a2 (the open edges of a ribbon)
+        maps = ldos.reshape(args.n1, args.n2, nw, -1).sum(axis=2)
+        fig, axes = plt.subplots(1, len(ldos_e), figsize=(4 * len(ldos_e), 4), squeeze=False)
+        for j, (ax, e) in enumerate(zip(axes[0], ldos_e)):
+            im = ax.imshow(maps[:, :, j].T, origin='lower', aspect='auto', cmap='viridis')
+            ax.set_title(f"LDOS at E = {e:+.3f} eV")
+            ax.set_xlabel("cell along $a_1$")
+            ax.set_ylabel("cell along $a_2$")
+            fig.colorbar(im, ax=ax, label="states/eV/cell")
+        fig.tight_layout()
+        ldos_out = os.path.splitext(args.output)[0] + '_LDOS.png'
+        fig.savefig(ldos_out, dpi=200)
+        np.save(os.path.splitext(args.output)[0] + '_LDOS.npy', maps)
+        print(f"Saved {ldos_out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
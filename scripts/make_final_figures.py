@@ -1,6 +1,12 @@
 import matplotlib.pyplot as plt
 import numpy as np
 
+from band_render import parse_band_dat, draw_bands
+from fermi import get_fermi_level
+from results_store import is_current, read_array, read_bands
+
+STORE = 'wte2_results' # results_store.py import: read slices instead of parsing the .dat files
+
 # --- GLOBAL SETTINGS FOR PUBLICATION ---
 plt.rcParams.update({
     'font.size': 14,
@@ -13,30 +19,29 @@ plt.rcParams.update({
 })
 
 # --- DATA LOADERS ---
-def get_bands():
-    return np.loadtxt('wte2_band.dat')
+def get_bands(emin=None, emax=None):
+    # Shift to E_F (Wannier model or pw.x output; band.dat assumed pre-shifted if neither exists)
+    ef = get_fermi_level(default=0.0)
+    if is_current(STORE, 'path/energies'):
+        # Only the bands reaching into [emin, emax] around E_F are read
+        k, bands, _ = read_bands(STORE, emin, emax, shift=ef)
+        return k, bands
+    k, bands = parse_band_dat('wte2_band.dat')
+    return k, bands - ef
 
 def get_shc():
+    if is_current(STORE, 'shc/data'):
+        return read_array(STORE, 'shc/data')
     return np.loadtxt('wte2-kubo_S_xy.dat')
 
 # --- FIGURE 1: BAND STRUCTURE (The Mechanism) ---
 def plot_bands_final():
-    data = get_bands()
-    k = data[:, 0]
-    e = data[:, 1]
-    
-    # Identify unique bands (split by blank lines logic from earlier or reshaping)
-    # Fast reshaping trick if grid is regular (100 pts per segment * 4 segments = 400 pts)
-    # We will just stick to the robust scatter/plot loop for safety in this script
+    k, bands = get_bands(-1.0, 1.0)
     
     fig, ax = plt.subplots(figsize=(6, 8))
     
-    # Plotting Logic: Connect points if they are sequential? 
-    # Since 'wte2_band.dat' is ordered by band index usually, we can reshape.
-    # Let's try plotting as distinct lines for smoothness.
-    
-    # Use simple black lines
-    ax.scatter(k, e, s=0.5, c='black', alpha=0.8) # Scatter is safer if reshaping fails
+    # All bands as one rasterized LineCollection: keeps the PDF small
+    draw_bands(ax, k, bands, color='black', linewidth=0.8, alpha=0.8)
     
     # The "Reviewer Safe" Formatting
     ax.set_ylim(-1.0, 1.0)
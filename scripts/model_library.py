@@ -0,0 +1,316 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from synthetic_hr import write_hr_dat
+from scipy.optimize import minimize_scalar
+
+from wannier_tb import band_path, eigh_k, eigh_rows, ribbon_bands
+
+# Reference lattice models written as Wannier90 outputs (hr.dat, .win, band.dat,
+# band.labelinfo.dat) together with their known topological data, so the ribbon, Z2
+# and SHC scripts can be checked and profiled without a pw.x + wannier90.x run.
+#
+# All models conserve s_z and are time-reversal symmetric: the spin-down block is the
+# complex conjugate of the spin-up block, and the orbital ordering follows Wannier90
+# (projection line -> atom -> orbital -> spin innermost), so parse_win /
+# wannier_orbitals resolve the generated .win correctly.
+#
+# Known data stored in <name>_reference.json:
+#   'z2'             : Z2 index of the half-filled model
+#   'spin_chern'     : |C_s|; the s_z spin Hall conductivity is C_s * e/2pi inside the gap
+#   'edge_crossings' : (kx, E) of the helical edge-state crossings of a ribbon periodic
+#                      along a1 and open along a2 (wannier_tb.ribbon_bands)
+#   'gap'            : (VBM, CBM) at half filling, from a GAP_MESH scan
+#   'shc_plateau'    : energy window and plateau value of sigma_xy^z in units of e/2pi
+#
+# Usage:
+#   python model_library.py                        # all models into OUTPUT_DIR
+#   python model_library.py --copies 11 --coupling 0.02
+
+# --- CONFIGURATION ---
+OUTPUT_DIR = 'model_library'
+NUM_POINTS = 100     # bands_num_points of the first path segment
+GAP_MESH = (150, 150)
+ROWS_PER_SLAB = 16   # k1 rows per H(k) slab on GAP_MESH
+VACUUM = 20.0        # Angstrom, out-of-plane lattice vector
+RIBBON_WIDTH = 40    # cells, for crossings that are located numerically
+
+
+def _add_hopping(hops, R, block):
+    """Adds block at R and its Hermitian partner at -R (block is used as-is for R = 0)."""
+    R = tuple(R)
+    minus = tuple(-r for r in R)
+    hops[R] = hops.get(R, 0) + block
+    if R != minus:
+        hops[minus] = hops.get(minus, 0) + block.conj().T
+
+
+def _spinful_model(hops):
+    """
+    Model dict from spin-up hopping blocks {R: (norb, norb)}. The spin-down block is
+    the time-reversal partner H_dn(R) = conj(H_up(R)); spin is the innermost index.
+    """
+    rvecs = sorted(hops)
+    norb = hops[rvecs[0]].shape[0]
+    ham = np.zeros((len(rvecs), 2 * norb, 2 * norb), dtype=complex)
+    for i, R in enumerate(rvecs):
+        ham[i, 0::2, 0::2] = hops[R]
+        ham[i, 1::2, 1::2] = np.conj(hops[R])
+    return {'num_wann': 2 * norb, 'rvecs': np.array(rvecs, dtype=int),
+            'deg': np.ones(len(rvecs)), 'ham': ham}
+
+
+def _z2_from_parities(deltas):
+    """Fu-Kane index from the four TRIM parity products (+1 / -1)."""
+    return int(np.prod(deltas) < 0)
+
+
+def kane_mele(t=1.0, lam_so=0.06, lam_v=0.0, a=2.46):
+    """
+    Kane-Mele model on the honeycomb lattice, one pz orbital per site (num_wann = 4).
+    Topological for |lam_v| < 3 sqrt(3) lam_so; zigzag edge states cross at kx = 1/2.
+    """
+    s = np.diag([1.0, -1.0]) # A / B sublattice
+    nn = np.array([[0.0, t], [0.0, 0.0]]) # A -> B
+
+    hops = {}
+    _add_hopping(hops, (0, 0, 0), lam_v * s + nn + nn.T)
+    for R in [(-1, 0, 0), (0, -1, 0)]:
+        _add_hopping(hops, R, nn.astype(complex))
+    # Second neighbours: i lam_so nu_ij, nu = +1 along the anticlockwise set seen from A
+    for R in [(1, 0, 0), (-1, 1, 0), (0, -1, 0)]:
+        _add_hopping(hops, R, 1j * lam_so * s)
+    model = _spinful_model(hops)
+
+    cell = np.array([[a, 0, 0], [a / 2, a * np.sqrt(3) / 2, 0], [0, 0, VACUUM]])
+    win = {'unit_cell': cell,
+           'atoms': (['C', 'C'], np.array([[1 / 3, 1 / 3, 0.5], [2 / 3, 2 / 3, 0.5]])),
+           'projections': ['C:pz'], 'spinors': True,
+           'kpoint_path': [('G', np.zeros(3), 'K', np.array([1 / 3, 2 / 3, 0])),
+                           ('K', np.array([1 / 3, 2 / 3, 0]), 'M', np.array([0.5, 0.5, 0])),
+                           ('M', np.array([0.5, 0.5, 0]), 'G', np.zeros(3))]}
+
+    z2 = int(abs(lam_v) < 3 * np.sqrt(3) * lam_so)
+    meta = {'name': 'kane_mele', 'params': {'t': t, 'lam_so': lam_so, 'lam_v': lam_v, 'a': a},
+            'z2': z2, 'spin_chern': z2,
+            # Each zigzag edge is a single sublattice, so the crossing sits at E = 0 only without lam_v
+            'edge_crossings': [(0.5, 0.0)] if z2 and lam_v == 0 else []}
+    return model, win, meta
+
+
+def bhz(A=1.0, B=1.0, M=1.0, C=0.0, a=3.0):
+    """
+    Bernevig-Hughes-Zhang model on the square lattice, s and pz orbitals on one site
+    (num_wann = 4): h(k) = C + A (sin kx sx + sin ky sy) + (M - 2B (2 - cos kx - cos ky)) sz.
+    """
+    sx = np.array([[0, 1], [1, 0]], dtype=complex)
+    sy = np.array([[0, -1j], [1j, 0]])
+    sz = np.diag([1.0, -1.0]).astype(complex)
+
+    hops = {}
+    _add_hopping(hops, (0, 0, 0), C * np.eye(2) + (M - 4 * B) * sz)
+    _add_hopping(hops, (1, 0, 0), -0.5j * A * sx + B * sz)
+    _add_hopping(hops, (0, 1, 0), -0.5j * A * sy + B * sz)
+    model = _spinful_model(hops)
+
+    win = {'unit_cell': np.diag([a, a, VACUUM]),
+           'atoms': (['X'], np.array([[0.0, 0.0, 0.5]])),
+           'projections': ['X:s;pz'], 'spinors': True,
+           'kpoint_path': _rectangular_path()}
+
+    # The occupied state at a TRIM is pz (odd) where the mass M(k) > 0, s (even) otherwise
+    trim = {(0, 0): M, (1, 0): M - 4 * B, (0, 1): M - 4 * B, (1, 1): M - 8 * B}
+    delta = {k: -np.sign(m) for k, m in trim.items()}
+    z2 = _z2_from_parities(list(delta.values()))
+    # Edge states of the ribbon cross at the kx whose two TRIMs have opposite parities
+    crossings = [(0.5 * k1, C) for k1 in (0, 1) if delta[(k1, 0)] * delta[(k1, 1)] < 0]
+    meta = {'name': 'bhz', 'params': {'A': A, 'B': B, 'M': M, 'C': C, 'a': a},
+            'z2': z2, 'spin_chern': z2, 'edge_crossings': crossings if z2 else []}
+    return model, win, meta
+
+
+def t1prime(ed=1.0, tx=0.5, ty=0.25, v=0.3, a=3.49, b=6.33):
+    """
+    1T'-like four-band model: a metal d orbital at (0, 0) and a chalcogen p orbital at
+    (1/2, 1/2) in a rectangular cell, with an anisotropic d-p band inversion at Gamma
+    gapped by an odd, spin-dependent d-p hybridisation (num_wann = 4).
+    eps_d = ed - 2 tx cos kx - 2 ty cos ky, eps_p = -eps_d; inverted when ed < 2 (tx + ty).
+    """
+    sz = np.diag([1.0, -1.0])
+    hops = {}
+    _add_hopping(hops, (0, 0, 0), ed * sz.astype(complex))
+    _add_hopping(hops, (1, 0, 0), -tx * sz.astype(complex))
+    _add_hopping(hops, (0, 1, 0), -ty * sz.astype(complex))
+    # d at the origin -> p at R + (1/2, 1/2); the sign pattern of the bond makes it odd in k
+    for R in [(0, 0, 0), (-1, 0, 0), (0, -1, 0), (-1, -1, 0)]:
+        bond = np.array(R[:2]) + 0.5
+        block = np.zeros((2, 2), dtype=complex)
+        block[0, 1] = v * (np.sign(bond[0]) - 1j * np.sign(bond[1]))
+        _add_hopping(hops, R, block if any(R) else block + block.conj().T)
+    model = _spinful_model(hops)
+
+    win = {'unit_cell': np.diag([a, b, VACUUM]),
+           'atoms': (['W', 'Te'], np.array([[0.0, 0.0, 0.5], [0.5, 0.5, 0.5]])),
+           'projections': ['W:dxz', 'Te:py'], 'spinors': True,
+           'kpoint_path': _rectangular_path()}
+
+    # p sits at (1/2, 1/2): its parity at X and Y equals that of d, so only the inversions
+    # at Gamma (eps_d < 0 there) and M count (z2_parity.py, spin Chern number)
+    z2 = int(abs(ed) < 2 * (tx + ty))
+    meta = {'name': 't1prime', 'params': {'ed': ed, 'tx': tx, 'ty': ty, 'v': v, 'a': a, 'b': b},
+            'z2': z2, 'spin_chern': z2,
+            # The mixed d/p edge gaps Gamma-bar: the helical pair crosses at +/- k0, off the TRIM
+            'edge_crossings': ribbon_crossings(model) if z2 else []}
+    return model, win, meta
+
+
+def ribbon_crossings(model, width=RIBBON_WIDTH, nk=201, tol=1e-4):
+    """
+    Locates the mid-gap crossings of the half-filled ribbon (periodic along a1, open along a2):
+    local minima of the gap at half filling on an nk grid, refined with a bounded minimisation.
+    Returns [(kx, E)] with E the mid-gap energy at the crossing.
+    """
+    nocc = width * model['num_wann'] // 2
+    kx = np.linspace(0, 1, nk)
+
+    def gap(k):
+        e = ribbon_bands(model, width, np.atleast_1d(k))[:, nocc - 1:nocc + 1]
+        return e[:, 1] - e[:, 0], e.mean(axis=1)
+
+    g, _ = gap(kx)
+    crossings = []
+    for i in range(nk - 1): # kx = 1 is kx = 0
+        if g[i] <= g[i - 1] and g[i] <= g[i + 1]:
+            dk = 1.0 / (nk - 1)
+            res = minimize_scalar(lambda k: gap(k)[0][0], bounds=(kx[i] - dk, kx[i] + dk),
+                                  method='bounded', options={'xatol': 1e-8})
+            if res.fun < tol:
+                crossings.append((float(res.x % 1.0), float(gap(res.x)[1][0])))
+    return crossings
+
+
+def _rectangular_path():
+    G, X, M, Y = np.zeros(3), np.array([0.5, 0, 0]), np.array([0.5, 0.5, 0]), np.array([0, 0.5, 0])
+    return [('G', G, 'X', X), ('X', X, 'M', M), ('M', M, 'G', G), ('G', G, 'Y', Y)]
+
+
+MODELS = {'kane_mele': kane_mele, 'bhz': bhz, 't1prime': t1prime}
+
+
+def stack_copies(model, win, meta, copies, coupling=0.0):
+    """
+    Stacks `copies` replicas of a model (num_wann -> copies * num_wann). Neighbouring
+    replicas are coupled by a spin-independent on-site term `coupling`, which keeps
+    time reversal, inversion and s_z: Z2 becomes copies * z2 mod 2, C_s adds up, and
+    the gap shrinks by at most 2 |coupling|.
+    """
+    nw = model['num_wann']
+    ham = np.einsum('ab,rij->raibj', np.eye(copies), model['ham']).reshape(-1, copies * nw, copies * nw)
+    r0 = np.flatnonzero(~model['rvecs'].any(axis=1))[0]
+    ham[r0] += coupling * np.kron(np.eye(copies, k=1) + np.eye(copies, k=-1), np.eye(nw))
+    stacked = {'num_wann': copies * nw, 'rvecs': model['rvecs'].copy(),
+               'deg': model['deg'].copy(), 'ham': ham}
+
+    species, frac = win['atoms']
+    new_win = dict(win)
+    new_win['atoms'] = ([f"{s}{c + 1}" for c in range(copies) for s in species], np.tile(frac, (copies, 1)))
+    new_win['projections'] = [f"{p.split(':')[0].strip()}{c + 1}:{p.split(':', 1)[1].strip()}"
+                              for c in range(copies) for p in win['projections']]
+
+    new_meta = dict(meta)
+    new_meta['name'] = f"{meta['name']}_x{copies}"
+    new_meta['copies'] = copies
+    new_meta['coupling'] = coupling
+    new_meta['z2'] = (copies * meta['z2']) % 2
+    new_meta['spin_chern'] = copies * meta['spin_chern']
+    if coupling != 0.0:
+        # The replica crossings move with the coupling; only Z2 and C_s stay pinned
+        new_meta['edge_crossings'] = []
+    return stacked, new_win, new_meta
+
+
+def half_filling_gap(model, mesh=GAP_MESH):
+    """(VBM, CBM) of the half-filled model on an N1 x N2 mesh that contains the TRIM and K."""
+    special = np.array([[1 / 3, 2 / 3, 0], [2 / 3, 1 / 3, 0]])
+    evals = [eigh_k(model, special)]
+    for start in range(0, mesh[0], ROWS_PER_SLAB):
+        evals.append(eigh_rows(model, mesh, start, min(start + ROWS_PER_SLAB, mesh[0])))
+    evals = np.vstack(evals)
+    nocc = model['num_wann'] // 2
+    return float(evals[:, nocc - 1].max()), float(evals[:, nocc].min())
+
+
+def write_win(fname, win, num_wann, num_points=NUM_POINTS):
+    """Minimal Wannier90 .win describing the model (read back by wannier_tb.parse_win)."""
+    species, frac = win['atoms']
+    with open(fname, 'w') as f:
+        f.write(f"num_wann = {num_wann}\nnum_bands = {num_wann}\n")
+        f.write(f"spinors = {'.true.' if win['spinors'] else '.false.'}\n\n")
+        f.write("begin projections\n" + ''.join(p + '\n' for p in win['projections']) + "end projections\n\n")
+        f.write("begin unit_cell_cart\nang\n")
+        f.write(''.join(f"{x:12.6f}{y:12.6f}{z:12.6f}\n" for x, y, z in win['unit_cell']))
+        f.write("end unit_cell_cart\n\nbegin atoms_frac\n")
+        f.write(''.join(f"{s:<4s}{x:12.6f}{y:12.6f}{z:12.6f}\n" for s, (x, y, z) in zip(species, frac)))
+        f.write("end atoms_frac\n\nbegin kpoint_path\n")
+        for l1, k1, l2, k2 in win['kpoint_path']:
+            f.write(f"{l1} {k1[0]:.6f} {k1[1]:.6f} {k1[2]:.6f}  {l2} {k2[0]:.6f} {k2[1]:.6f} {k2[2]:.6f}\n")
+        f.write(f"end kpoint_path\n\nbands_num_points = {num_points}\n")
+
+
+def write_bands(prefix, model, win, num_points=NUM_POINTS):
+    """<prefix>_band.dat (gnuplot layout, blank line between bands) and <prefix>_band.labelinfo.dat."""
+    kpts, x, ticks, labels = band_path(win, num_points)
+    evals = eigh_k(model, kpts)
+    with open(f"{prefix}_band.dat", 'w') as f:
+        for band in evals.T:
+            np.savetxt(f, np.column_stack([x, band]), fmt='%16.8E')
+            f.write('\n')
+
+    with open(f"{prefix}_band.labelinfo.dat", 'w') as f:
+        for tick, label in zip(ticks, labels):
+            i = int(np.argmin(np.abs(x - tick)))
+            k = kpts[i]
+            f.write(f"{label:<30s}{i + 1:5d}{tick:18.10f}{k[0]:18.10f}{k[1]:18.10f}{k[2]:18.10f}\n")
+
+
+def write_model_files(model, win, meta, outdir=OUTPUT_DIR, num_points=NUM_POINTS):
+    """Writes hr.dat, .win, band.dat, labelinfo and the reference JSON; returns the file prefix."""
+    os.makedirs(outdir, exist_ok=True)
+    prefix = os.path.join(outdir, meta['name'])
+    meta = dict(meta)
+    meta['num_wann'] = model['num_wann']
+    meta['gap'] = half_filling_gap(model)
+    meta['shc_plateau'] = {'window': meta['gap'], 'sigma_e_over_2pi': meta['spin_chern']}
+
+    write_hr_dat(f"{prefix}_hr.dat", model, header=f"model_library.py: {meta['name']} {meta['params']}")
+    write_win(f"{prefix}.win", win, model['num_wann'], num_points)
+    write_bands(prefix, model, win, num_points)
+    with open(f"{prefix}_reference.json", 'w') as f:
+        json.dump(meta, f, indent=2)
+    return prefix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write reference tight-binding models in Wannier90 format.")
+    parser.add_argument('--outdir', default=OUTPUT_DIR)
+    parser.add_argument('--models', nargs='+', default=list(MODELS), choices=list(MODELS))
+    parser.add_argument('--copies', type=int, default=1, help="stack this many replicas of each model")
+    parser.add_argument('--coupling', type=float, default=0.0, help="on-site coupling between replicas (eV)")
+    parser.add_argument('--num-points', type=int, default=NUM_POINTS)
+    args = parser.parse_args()
+
+    for name in args.models:
+        model, win, meta = MODELS[name]()
+        if args.copies > 1:
+            model, win, meta = stack_copies(model, win, meta, args.copies, args.coupling)
+        prefix = write_model_files(model, win, meta, args.outdir, args.num_points)
+        with open(f"{prefix}_reference.json") as f:
+            ref = json.load(f)
+        print(f"{prefix}: num_wann={ref['num_wann']}, Z2={ref['z2']}, gap=({ref['gap'][0]:.3f}, {ref['gap'][1]:.3f}) eV")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import os
+import sys
+from itertools import islice
+
+import numpy as np
+
+# Binary, memory-mapped store for the pw2wannier90 overlap files.
+# The text .mmn / .amn are converted once (streamed block by block, so the conversion
+# itself never holds the whole file) into .npy arrays next to them:
+#   <seed>.mmn.npy : (nk, nnb, nb, nb) complex, M[k, b, m, n] = <u_mk|u_n,k+b>
+#   <seed>.mmn.nn.npz : 'nnlist' (nk, nnb) 0-based neighbour k, 'nncell' (nk, nnb, 3) G-vectors
+#   <seed>.amn.npy : (nk, nb, nw) complex, A[k, m, n] = <psi_mk|g_n>
+# and reopened with np.load(mmap_mode='r'), so diagnostics touch only the k-points
+# they read. A store is rebuilt when the text file is newer than it.
+#
+# Usage:
+#   python overlap_store.py wte2        # convert (if needed) and print diagnostics
+
+# --- CONFIGURATION ---
+SEEDNAME = 'wte2'
+DTYPE = np.complex128 # np.complex64 halves the store; the text files carry ~12 digits
+CHUNK = 64            # k-points per batched SVD in the diagnostics
+
+
+def _fresh(store, source):
+    return os.path.exists(store) and os.path.getmtime(store) >= os.path.getmtime(source)
+
+
+def _read_values(f, nlines):
+    """Next nlines 're im' lines as a complex vector."""
+    vals = np.array(''.join(islice(f, nlines)).split(), dtype=float)
+    if len(vals) != 2 * nlines:
+        raise ValueError(f"{f.name}: truncated block ({len(vals) // 2} of {nlines} values)")
+    return vals[0::2] + 1j * vals[1::2]
+
+
+def convert_mmn(mmn_file, dtype=DTYPE):
+    """Streams <seed>.mmn into <seed>.mmn.npy + <seed>.mmn.nn.npz. Returns the .npy path."""
+    store = mmn_file + '.npy'
+    with open(mmn_file, 'r') as f:
+        f.readline() # header
+        nb, nk, nnb = map(int, f.readline().split())
+        M = np.lib.format.open_memmap(store + '.tmp', mode='w+', dtype=dtype, shape=(nk, nnb, nb, nb))
+        nnlist = np.zeros((nk, nnb), dtype=int)
+        nncell = np.zeros((nk, nnb, 3), dtype=int)
+        for k in range(nk):
+            for b in range(nnb):
+                k1, k2, g1, g2, g3 = map(int, f.readline().split())
+                nnlist[k1 - 1, b] = k2 - 1
+                nncell[k1 - 1, b] = (g1, g2, g3)
+                # Fortran order in the file: m runs fastest -> transpose to M[m, n]
+                M[k1 - 1, b] = _read_values(f, nb * nb).reshape(nb, nb).T
+        M.flush()
+        del M
+    os.replace(store + '.tmp', store)
+    np.savez(mmn_file + '.nn.npz', nnlist=nnlist, nncell=nncell)
+    return store
+
+
+def convert_amn(amn_file, dtype=DTYPE):
+    """Streams <seed>.amn into <seed>.amn.npy. Returns the .npy path."""
+    store = amn_file + '.npy'
+    with open(amn_file, 'r') as f:
+        f.readline()
+        nb, nk, nw = map(int, f.readline().split())
+        A = np.lib.format.open_memmap(store + '.tmp', mode='w+', dtype=dtype, shape=(nk, nb, nw))
+        for k in range(nk):
+            # One k-point = nw * nb lines 'm n k re im', m fastest
+            rows = np.array(''.join(islice(f, nb * nw)).split(), dtype=float).reshape(-1, 5)
+            if len(rows) != nb * nw:
+                raise ValueError(f"{amn_file}: truncated at k-point {k + 1}")
+            m, n, kk = rows[:, 0].astype(int) - 1, rows[:, 1].astype(int) - 1, rows[:, 2].astype(int) - 1
+            A[kk, m, n] = rows[:, 3] + 1j * rows[:, 4]
+        A.flush()
+        del A
+    os.replace(store + '.tmp', store)
+    return store
+
+
+def load_mmn(mmn_file, dtype=DTYPE):
+    """Memory-mapped overlaps: dict with 'M' (nk, nnb, nb, nb), 'nnlist', 'nncell'."""
+    store = mmn_file + '.npy'
+    if not (_fresh(store, mmn_file) and os.path.exists(mmn_file + '.nn.npz')):
+        convert_mmn(mmn_file, dtype)
+    nn = np.load(mmn_file + '.nn.npz')
+    return {'M': np.load(store, mmap_mode='r'), 'nnlist': nn['nnlist'], 'nncell': nn['nncell']}
+
+
+def load_amn(amn_file, dtype=DTYPE):
+    """Memory-mapped projections A (nk, nb, nw)."""
+    store = amn_file + '.npy'
+    if not _fresh(store, amn_file):
+        convert_amn(amn_file, dtype)
+    return np.load(store, mmap_mode='r')
+
+
+def read_eig(eig_file):
+    """Band energies (nk, nb) from a .eig file (lines 'n k E')."""
+    data = np.loadtxt(eig_file, ndmin=2)
+    nb, nk = int(data[:, 0].max()), int(data[:, 1].max())
+    eig = np.zeros((nk, nb))
+    eig[data[:, 1].astype(int) - 1, data[:, 0].astype(int) - 1] = data[:, 2]
+    return eig
+
+
+# --- DIAGNOSTICS (streamed over k in chunks of the memory map) ---
+
+def amn_singular_values(A, chunk=CHUNK):
+    """Singular values of A_mn per k-point, (nk, nw), descending."""
+    nk, nb, nw = A.shape
+    sv = np.empty((nk, min(nb, nw)))
+    for start in range(0, nk, chunk):
+        sv[start:start + chunk] = np.linalg.svd(np.asarray(A[start:start + chunk]), compute_uv=False)
+    return sv
+
+
+def projection_quality(A, chunk=CHUNK):
+    """Per k-point fraction of each trial orbital captured by the bands: sum_m |A_mn|^2, (nk, nw)."""
+    nk = A.shape[0]
+    out = np.empty((nk, A.shape[2]))
+    for start in range(0, nk, chunk):
+        out[start:start + chunk] = (np.abs(np.asarray(A[start:start + chunk]))**2).sum(axis=1)
+    return out
+
+
+def overlap_singular_values(M, chunk=CHUNK):
+    """Singular values of every M(k, b) block, (nk, nnb, nb); ~1 for smooth gauges and full bands."""
+    nk, nnb, nb, _ = M.shape
+    sv = np.empty((nk, nnb, nb))
+    for start in range(0, nk, chunk):
+        sv[start:start + chunk] = np.linalg.svd(np.asarray(M[start:start + chunk]), compute_uv=False)
+    return sv
+
+
+def main():
+    seed = sys.argv[1] if len(sys.argv) > 1 else SEEDNAME
+    for ext in ('mmn', 'amn'):
+        if not os.path.exists(f"{seed}.{ext}"):
+            print(f"Error: {seed}.{ext} not found.")
+            return 1
+
+    mmn = load_mmn(f"{seed}.mmn")
+    A = load_amn(f"{seed}.amn")
+    M = mmn['M']
+    print(f"{seed}.mmn -> {seed}.mmn.npy: nk={M.shape[0]}, nnb={M.shape[1]}, nb={M.shape[2]}, "
+          f"{M.nbytes / 2**20:.1f} MB")
+    print(f"{seed}.amn -> {seed}.amn.npy: nk={A.shape[0]}, nb={A.shape[1]}, nw={A.shape[2]}, "
+          f"{A.nbytes / 2**20:.1f} MB")
+
+    sv = amn_singular_values(A)
+    worst = np.argsort(sv[:, -1])[:5]
+    print(f"A_mn singular values: min {sv.min():.4f}, median of per-k minimum {np.median(sv[:, -1]):.4f}")
+    print("  Weakest k-points (index: min sigma): " + ", ".join(f"{k + 1}: {sv[k, -1]:.4f}" for k in worst))
+    q = projection_quality(A)
+    print(f"Projection weight per trial orbital: min {q.min():.4f}, mean {q.mean():.4f}")
+    osv = overlap_singular_values(M)
+    print(f"M_mn(k,b) singular values: min {osv.min():.4f}, mean {osv.mean():.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,53 +1,28 @@
 import matplotlib.pyplot as plt
-import numpy as np
 
-def parse_wannier_bands(filename):
-    """
-    Reads a standard Wannier90 band.dat file.
-    Gnuplot format separates bands by blank lines.
-    """
-    bands = []
-    current_band = []
-    
-    with open(filename, 'r') as f:
-        for line in f:
-            if not line.strip(): # Blank line = end of a band
-                if current_band:
-                    bands.append(np.array(current_band))
-                    current_band = []
-            else:
-                try:
-                    parts = line.split()
-                    k = float(parts[0])
-                    e = float(parts[1])
-                    current_band.append([k, e])
-                except ValueError:
-                    continue
-    if current_band:
-        bands.append(np.array(current_band))
-    return bands
+from band_render import parse_band_dat, draw_bands
+from fermi import get_fermi_level
 
 # --- PLOTTING ---
 filename = 'wte2_band.dat'
 try:
-    bands = parse_wannier_bands(filename)
-    print(f"Loaded {len(bands)} bands.")
+    k, bands = parse_band_dat(filename)
+    print(f"Loaded {bands.shape[0]} bands.")
+    # Shift to E_F (Wannier model or pw.x output; band.dat assumed pre-shifted if neither exists)
+    bands = bands - get_fermi_level(default=0.0)
 except FileNotFoundError:
     print("Error: wte2_band.dat not found.")
     exit()
 
 fig, ax = plt.subplots(figsize=(6, 8))
 
-# Plot each band as a smooth line
-for band in bands:
-    k = band[:, 0]
-    e = band[:, 1]
-    ax.plot(k, e, color='black', linewidth=1.2, alpha=0.8)
+# Plot all bands as smooth lines (one LineCollection)
+draw_bands(ax, k, bands, color='black', linewidth=1.2, alpha=0.8)
 
 # --- CRITICAL FORMATTING FOR PRESENTATION ---
 # 1. The Window: Focus on the "Action" (-0.5 to 0.5 eV)
 ax.set_ylim(-0.6, 0.6)
-ax.set_xlim(bands[0][0,0], bands[0][-1,0])
+ax.set_xlim(k[0], k[-1])
 
 # 2. The Reference Line
 ax.axhline(0, color='red', linestyle='--', linewidth=1, label='Fermi Level')
@@ -55,7 +30,7 @@ ax.axhline(0, color='red', linestyle='--', linewidth=1, label='Fermi Level')
 # 3. High Symmetry Labels (Manual Placement based on your k-path)
 # Path: G -> X -> M -> G -> Y
 # We assume equal spacing usually, but let's grab the max k
-k_max = bands[0][-1,0]
+k_max = k[-1]
 # Approximate locations for standard 4-segment path
 ticks = [0, k_max * 0.25, k_max * 0.5, k_max * 0.75, k_max]
 labels = [r'$\mathbf{\Gamma}$', r'$\mathbf{X}$', r'$\mathbf{M}$', r'$\mathbf{\Gamma}$', r'$\mathbf{Y}$']
@@ -3,11 +3,15 @@ import numpy as np
 import sys
 import os
 
+from band_render import parse_band_dat, draw_bands
+from fermi import get_fermi_level, NUM_ELECTRONS
+
 # --- CONFIGURATION FOR PRESENTATION ---
 # Robust paths relative to this script
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_FILE = os.path.join(SCRIPT_DIR, "../data/wte2_band.dat")
 LABEL_FILE = os.path.join(SCRIPT_DIR, "../data/wte2_band.labelinfo.dat")
+HR_FILE = os.path.join(SCRIPT_DIR, "../data/wte2_hr.dat")
 OUTPUT_FILE = os.path.join(SCRIPT_DIR, "../figures/Fig_Bands_Presentation.png")
 
 # Presentation "Big Mode" Settings
@@ -65,46 +69,21 @@ def parse_labels(labelfile):
 
 def plot_bands():
     print(f"Reading data from {DATA_FILE}")
-    # 1. Load Band Data
+    # 1. Load Band Data (all bands at once, shape (nbands, nk))
     try:
-        data = np.loadtxt(DATA_FILE)
+        k, bands = parse_band_dat(DATA_FILE)
     except Exception as e:
         print(f"Error reading data: {e}")
         return
 
-    k = data[:, 0]
-    energy = data[:, 1]
-    
-    # Identify unique band segments (Wannier90 separates bands with blank lines or jumps)
-    # or Gnuplot format.
-    bands = []
-    current_band_k = []
-    current_band_e = []
-    
-    # Re-reading file safely to handle blank lines splitting
-    with open(DATA_FILE, 'r') as f:
-        for line in f:
-            if not line.strip(): # Empty line
-                if current_band_k:
-                    bands.append((current_band_k, current_band_e))
-                    current_band_k = []
-                    current_band_e = []
-                continue
-            try:
-                parts = line.split()
-                current_band_k.append(float(parts[0]))
-                current_band_e.append(float(parts[1]))
-            except ValueError:
-                 continue
-                 
-    if current_band_k: bands.append((current_band_k, current_band_e))
+    # Shift to E_F (Wannier model or pw.x output; band.dat assumed pre-shifted if neither exists)
+    bands = bands - get_fermi_level(HR_FILE, default=0.0)
 
     # 2. Setup Plot
     fig, ax = plt.subplots()
     
-    # 3. Plot Bands
-    for bk, be in bands:
-        ax.plot(bk, be, color='#333333', alpha=0.9) # Dark Grey/Black
+    # 3. Plot Bands (single LineCollection instead of one Line2D per band)
+    draw_bands(ax, k, bands, color='#333333', alpha=0.9) # Dark Grey/Black
 
     # 4. Fermi Level
     ax.axhline(0, color='#D50032', linestyle='--', linewidth=2, label='Fermi Level')
@@ -148,9 +127,18 @@ def plot_bands():
     ax.set_title("Relativistic Electronic Structure", pad=20)
 
     # 7. Annotation (The "Money" Shot)
-    # Point to the gap
-    # Arrow properties
-    ax.annotate('Inverted Gap', xy=(0, 0.1), xytext=(0.3, 0.6),
+    # Point to the smallest gap on the path (band NUM_ELECTRONS-1 -> NUM_ELECTRONS); the
+    # label gives the gap over the whole BZ when the model is available (band_gap.py)
+    gap = bands[NUM_ELECTRONS] - bands[NUM_ELECTRONS - 1]
+    i = int(np.argmin(gap))
+    text = 'Inverted Gap'
+    if os.path.exists(HR_FILE):
+        from band_gap import find_gaps
+        from wannier_tb import load_hr_dat
+        bz = find_gaps(load_hr_dat(HR_FILE), NUM_ELECTRONS)
+        text += f"\n{bz['direct'][0] * 1000:.0f} meV (full BZ)"
+    xy = (k[i], 0.5 * (bands[NUM_ELECTRONS, i] + bands[NUM_ELECTRONS - 1, i]))
+    ax.annotate(text, xy=xy, xytext=(xy[0] + 0.1 * (max(k) - min(k)), xy[1] + 0.6),
             arrowprops=dict(facecolor='#D50032', shrink=0.05, width=2),
             fontsize=16, color='#D50032', fontweight='bold')
     
@@ -3,9 +3,13 @@ import numpy as np
 
 import os
 
+from run_ledger import read_ledger, peak_memory
+
 # --- CONFIGURATION ---
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_FILE = os.path.join(SCRIPT_DIR, "../figures/Fig_Feasibility_Memory.png")
+# Used only when the run ledger (run_ledger.py) holds no successful pw.x / wannier90.x stage
+ESTIMATED_PEAK_GB = 38.0 # Estimated requirement for 12x12x1 full matrix
 
 def plot_memory_feasibility():
     """
@@ -13,9 +17,16 @@ def plot_memory_feasibility():
     Compares Standard Desktop vs High-Performance Cluster Node.
     """
     
-    # Data: Peak Memory Usage (Estimated from logs)
+    # Data: Peak Memory Usage, measured by the run ledger when available
     # Wannier90 (High K-mesh) typically spikes memory during disentanglement
-    peak_memory_req = 38.0  # GB (Estimated requirement for 12x12x1 full matrix)
+    rec = peak_memory(read_ledger())
+    if rec is not None:
+        peak_memory_req = rec['peak_rss_gb']
+        source = f"Measured peak, {rec['stage']}" + (f" [{rec['label']}]" if rec['label'] else '')
+    else:
+        peak_memory_req = ESTIMATED_PEAK_GB
+        source = "Min. Requirement, estimated"
+    print(f"Peak memory: {peak_memory_req:.2f} GB ({source})")
     
     # System Capabilities
     systems = ['Standard Workstation', 'High-Performance Node']
@@ -35,24 +46,22 @@ def plot_memory_feasibility():
     # 2. Plot the Requirement Line
     # Draw a dashed line across the plot showing the memory needed
     ax.axhline(y=peak_memory_req, color='#D50032', linestyle='--', linewidth=2, zorder=3)
-    ax.text(0.5, peak_memory_req + 2, f'Min. Requirement (~{int(peak_memory_req)} GB)', 
+    ax.text(0.5, peak_memory_req + 2, f'{source} (~{peak_memory_req:.1f} GB)', 
             color='#D50032', ha='center', fontweight='bold', fontsize=11)
     
     # 3. Annotations (Status)
-    
-    # Bar 1: Standard
-    ax.text(0, ram_limits[0]/2, "16 GB Capacity", ha='center', va='center', color='black')
-    ax.text(0, ram_limits[0] + 2, "FAILURE\n(Out of Memory)", 
-            ha='center', va='bottom', color='#D50032', fontweight='bold')
-    
-    # Bar 2: High Performance
-    ax.text(1, ram_limits[1]/2, "64 GB Capacity", ha='center', va='center', color='white')
-    ax.text(1, peak_memory_req - 10, "Calculation\nConverged", 
-            ha='center', va='center', color='white', fontweight='bold')
+    for i, (limit, text_color) in enumerate(zip(ram_limits, ['black', 'white'])):
+        ax.text(i, limit/2, f"{limit:g} GB Capacity", ha='center', va='center', color=text_color)
+        if limit < peak_memory_req:
+            ax.text(i, limit + 2, "FAILURE\n(Out of Memory)", 
+                    ha='center', va='bottom', color='#D50032', fontweight='bold')
+        else:
+            ax.text(i, limit + 2, "Fits in Memory", 
+                    ha='center', va='bottom', color=edge_colors[i], fontweight='bold')
 
     # 4. Styling
     ax.set_ylabel("System Memory (GB)", fontsize=12)
-    ax.set_ylim(0, 75)
+    ax.set_ylim(0, max(75, 1.2 * peak_memory_req))
     ax.set_title("Computational Resource Feasibility", fontsize=14)
     ax.grid(axis='y', linestyle=':', alpha=0.5)
     
@@ -2,6 +2,11 @@ import matplotlib.pyplot as plt
 import numpy as np
 import glob
 
+from fermi import get_fermi_level
+
+# pw.x Fermi level, used when neither wte2_hr.dat nor a pw.x output is present
+EF_DEFAULT = -2.8364
+
 # Load PDOS data
 # Files are like wte2.pdos_atm#*_wfc#*
 # We need to sum W-d and Te-p
@@ -35,43 +40,42 @@ def load_pdos(species, orbital):
             
     return energy, total_dos
 
-# Load W-d
-e_w, dos_w = load_pdos('W', 'd')
-# Load Te-p
-e_te, dos_te = load_pdos('Te', 'p')
+def plot_pdos():
+    # Load W-d
+    e_w, dos_w = load_pdos('W', 'd')
+    # Load Te-p
+    e_te, dos_te = load_pdos('Te', 'p')
 
-# Plot
-fig, ax = plt.subplots(figsize=(8, 6))
+    # Fermi level: Wannier model (wte2_hr.dat) if present, else the pw.x output, else EF_DEFAULT
+    ef = get_fermi_level(default=EF_DEFAULT)
+    print(f"Fermi level: {ef:.4f} eV")
 
-if e_w is not None:
-    # Fermi Shift? We should verify Fermi level. 
-    # Usually Z2 calculation used ef=-2.8364.
-    # PROJWFC output usually preserves E-E_fermi=0 if nscf.save had it, 
-    # OR we must shift manually.
-    # projwfc usually writes energies as in nscf output.
-    # We will shift by -2.8364 approx if needed, or check 'wte2.proj.out' for Fermi energy.
-    # For now, assume raw energy. We'll label relative energy if we shift.
-    ef = -2.8364 # From wte2.win / nscf
-    
-    ax.plot(e_w - ef, dos_w, color='blue', label='W $5d$', linewidth=2)
-    ax.fill_between(e_w - ef, 0, dos_w, color='blue', alpha=0.1)
+    # Plot
+    fig, ax = plt.subplots(figsize=(8, 6))
+
+    if e_w is not None:
+        # projwfc writes energies as in the nscf output, so shift by E_F
+        ax.plot(e_w - ef, dos_w, color='blue', label='W $5d$', linewidth=2)
+        ax.fill_between(e_w - ef, 0, dos_w, color='blue', alpha=0.1)
+
+    if e_te is not None:
+        ax.plot(e_te - ef, dos_te, color='green', label='Te $5p$', linewidth=2)
+        ax.fill_between(e_te - ef, 0, dos_te, color='green', alpha=0.1)
 
-if e_te is not None:
-    ef = -2.8364
-    ax.plot(e_te - ef, dos_te, color='green', label='Te $5p$', linewidth=2)
-    ax.fill_between(e_te - ef, 0, dos_te, color='green', alpha=0.1)
+    ax.set_xlim(-2, 2) # Zoom on inversion
+    ax.set_ylim(0, max(max(dos_w), max(dos_te)) * 1.1)
 
-ax.set_xlim(-2, 2) # Zoom on inversion
-ax.set_ylim(0, max(max(dos_w), max(dos_te)) * 1.1)
+    ax.axvline(0, color='red', linestyle='--', label='$E_F$')
+    ax.set_xlabel(r"Energy ($E - E_F$) [eV]")
+    ax.set_ylabel("Density of States [states/eV]")
+    ax.set_title("Orbital Inversion (Band Crossing)")
+    ax.legend()
+    ax.text(-1.5, 1, "Valence (Te-p)", color='green', fontweight='bold', fontsize=16)
+    ax.text(0.5, 1, "Conduction (W-d)", color='blue', fontweight='bold', fontsize=16)
 
-ax.axvline(0, color='red', linestyle='--', label='$E_F$')
-ax.set_xlabel(r"Energy ($E - E_F$) [eV]")
-ax.set_ylabel("Density of States [states/eV]")
-ax.set_title("Orbital Inversion (Band Crossing)")
-ax.legend()
-ax.text(-1.5, 1, "Valence (Te-p)", color='green', fontweight='bold', fontsize=16)
-ax.text(0.5, 1, "Conduction (W-d)", color='blue', fontweight='bold', fontsize=16)
+    plt.tight_layout()
+    plt.savefig("Fig_PDOS_Inversion.png", dpi=300)
+    print("PDOS Plot Generated: Fig_PDOS_Inversion.png")
 
-plt.tight_layout()
-plt.savefig("Fig_PDOS_Inversion.png", dpi=300)
-print("PDOS Plot Generated: Fig_PDOS_Inversion.png")
+if __name__ == "__main__":
+    plot_pdos()
@@ -1,120 +1,66 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import sys
+import os
+
+from wannier_tb import load_hr_dat, ribbon_bands
+from fermi import get_fermi_level
+from band_render import draw_bands
+from profiling import phase
+from run_ledger import stage
 
 # --- CONFIGURATION ---
-WIDTH = 30        # Width of ribbon (unit cells).
+WIDTH = 30        # Width of ribbon (unit cells); check convergence with ribbon_width_sweep.py
 NK = 150          # K-points along the periodic direction
 FNAME = 'wte2_hr.dat'
-
-def load_hr_dat(fname):
-    """Parses standard Wannier90 hr.dat format."""
-    try:
-        with open(fname, 'r') as f:
-            f.readline() # Time
-            num_wann = int(f.readline())
-            nrpts = int(f.readline())
-            
-            deg = []
-            while len(deg) < nrpts:
-                deg.extend(map(int, f.readline().split()))
-                
-            lines = f.readlines()
-            all_nums = []
-            for l in lines:
-                all_nums.extend(l.split())
-                
-            iterator = iter(all_nums)
-            hopping_dict = {} 
-            
-            # Total matrix elements expected
-            total_elems = nrpts * num_wann * num_wann
-            
-            for _ in range(total_elems):
-                rx = int(next(iterator))
-                ry = int(next(iterator))
-                rz = int(next(iterator))
-                m  = int(next(iterator))
-                n  = int(next(iterator))
-                re = float(next(iterator))
-                im = float(next(iterator))
-                
-                # Only 2D (Rz=0) needed, or keep all
-                if rz == 0:
-                    key = (rx, ry)
-                    if key not in hopping_dict:
-                        hopping_dict[key] = np.zeros((num_wann, num_wann), dtype=complex)
-                    
-                    # 1-based indexing in file -> 0-based in array
-                    hopping_dict[key][m-1, n-1] = re + 1j*im 
-                        
-        return num_wann, hopping_dict
-                        
-        return num_wann, hopping_dict
-    except FileNotFoundError:
-        print(f"Error: {fname} not found.")
-        sys.exit()
+PRECISION = 'double'  # 'single': complex64 ribbon, half the memory (wannier_tb.PRECISIONS)
+REFINE = (-0.3, 0.3)  # eV relative to E_F, plotted window redone in double precision when PRECISION = 'single'
 
 # --- MAIN CALCULATION ---
-num_orb, hops = load_hr_dat(FNAME)
-print(f"Hamiltonian Loaded. Orbitals: {num_orb}")
+if not os.path.exists(FNAME):
+    print(f"Error: {FNAME} not found.")
+    sys.exit()
 
-k_vals = np.linspace(0, 1.0, NK)
-bands = []
+with stage('plot_ribbon.py', label=f"width {WIDTH}, {PRECISION}"):
+    with phase('parse'):
+        model = load_hr_dat(FNAME)
+    num_orb = model['num_wann']
+    print(f"Hamiltonian Loaded. Orbitals: {num_orb}")
 
-print("Diagonalizing Slab Hamiltonian...")
-for k_linear in k_vals:
-    kx = k_linear * 2 * np.pi
-    
-    # Supercell Hamiltonian (Size: WIDTH * num_orb)
-    H_slab = np.zeros((WIDTH*num_orb, WIDTH*num_orb), dtype=complex)
-    
-    for y_cell in range(WIDTH):
-        for (rx, ry), mat_local in hops.items():
-            # Phase for periodic direction (x)
-            phase = np.exp(1j * kx * rx)
-            
-            # Target Y
-            y_target = y_cell + ry
-            
-            if 0 <= y_target < WIDTH:
-                row = y_cell * num_orb
-                col = y_target * num_orb
-                H_slab[row:row+num_orb, col:col+num_orb] += mat_local * phase
-    
-    evals = np.linalg.eigvalsh(H_slab)
-    bands.append(evals)
+    ef = get_fermi_level(FNAME, default=0.0)
+    print(f"Fermi level: {ef:.4f} eV")
+    k_vals = np.linspace(0, 1.0, NK)
 
-bands = np.array(bands)
+    print("Diagonalizing Slab Hamiltonian...")
+    # Supercell Hamiltonian (Size: WIDTH * num_orb), periodic along x, open along y
+    bands = ribbon_bands(model, WIDTH, k_vals, PRECISION, (ef + REFINE[0], ef + REFINE[1])) - ef # (NK, WIDTH*num_orb)
 
 # --- PLOTTING ---
-# Using landscape-ish or square-ish figure but focused
-plt.figure(figsize=(6, 6))
+with phase('render'):
+    # Using landscape-ish or square-ish figure but focused
+    fig, ax = plt.subplots(figsize=(6, 6))
 
-# --- PLOTTING LOGIC ---
-# 1. Plot ALL bands as "Bulk Continuum"
-# User requested: "dimmed black lines arent much visible, swap it with other colours"
-# We use a nice visible blue/slate color
-for b in range(bands.shape[1]):
-    plt.plot(k_vals, bands[:, b], color='#4682B4', alpha=0.3, linewidth=1.0, zorder=1) # SteelBlue
+    # --- PLOTTING LOGIC ---
+    # 1. Plot ALL bands as "Bulk Continuum"
+    # User requested: "dimmed black lines arent much visible, swap it with other colours"
+    # We use a nice visible blue/slate color
+    draw_bands(ax, k_vals, bands.T, color='#4682B4', alpha=0.3, linewidth=1.0, zorder=1) # SteelBlue
 
-# 2. Identify and highlight Edge States (Red)
-# Heuristic: Crosses zero gap
-mid_k_idx = NK // 2
-for b in range(bands.shape[1]):
-    band_vals = bands[:, b]
-    if min(band_vals) < 0 < max(band_vals):
-        if abs(band_vals[mid_k_idx]) < 0.15: 
-            plt.plot(k_vals, band_vals, color='#D50032', alpha=0.9, linewidth=2.5, zorder=2)
+    # 2. Identify and highlight Edge States (Red)
+    # Heuristic: Crosses zero gap
+    mid_k_idx = NK // 2
+    crosses = (bands.min(axis=0) < 0) & (bands.max(axis=0) > 0) & (np.abs(bands[mid_k_idx]) < 0.15)
+    draw_bands(ax, k_vals, bands[:, crosses].T, color='#D50032', alpha=0.9, linewidth=2.5, zorder=2)
 
-# Formatting - FOCUSED ZOOM
-plt.ylim(-0.3, 0.3)
-plt.xlim(0.2, 0.8) # Focus heavily on the crossing point (usually 0.5)
-plt.axhline(0, color='black', linestyle=':', linewidth=1)
-plt.xlabel(r"$k_{x}$ (Periodic Direction)")
-plt.ylabel("Energy (eV)")
-plt.title(f"Topological Edge States (Zoomed)")
+    # Formatting - FOCUSED ZOOM
+    ax.set_ylim(-0.3, 0.3)
+    ax.set_xlim(0.2, 0.8) # Focus heavily on the crossing point (usually 0.5)
+    ax.axhline(0, color='black', linestyle=':', linewidth=1)
+    ax.set_xlabel(r"$k_{x}$ (Periodic Direction)")
+    ax.set_ylabel("Energy (eV)")
+    ax.set_title(f"Topological Edge States (Zoomed)")
 
-plt.tight_layout()
-plt.savefig("Fig_Ribbon_EdgeStates.png", dpi=300)
+with phase('save'):
+    plt.tight_layout()
+    plt.savefig("Fig_Ribbon_EdgeStates.png", dpi=300)
 print("Ribbon calculation complete (Standard Colors, Zoomed).")
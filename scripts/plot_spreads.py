@@ -1,39 +1,11 @@
 import matplotlib.pyplot as plt
-import re
 
-iterations = []
-spreads = []
+from wannier_tb import parse_wout
 
-in_table = False
-
-with open('wte2.wout', 'r') as f:
-    for line in f:
-        # Detect header: | Iter  Delta Spread     RMS Gradient      Spread (Ang^2)      Time  |<-- CONV
-        if "RMS Gradient" in line and "Spread (Ang^2)" in line:
-            in_table = True
-            continue
-            
-        if in_table:
-            # End of table check
-            if "Total Execution Time" in line or "All done" in line or "trace" in line:
-                in_table = False
-                break
-            
-            # Line format:       1   -0.292E+03       0.499E-05      0.341E+02       0.46
-            parts = line.split()
-            if len(parts) >= 4:
-                try:
-                    # Column 0: Iter
-                    it = int(parts[0])
-                    # Column 3: Spread (Ang^2) - check header order
-                    # Header: Iter, Delta, RMS, Spread, Time
-                    # Index:  0     1      2    3       4
-                    sp = float(parts[3])
-                    
-                    iterations.append(it)
-                    spreads.append(sp)
-                except ValueError:
-                    continue
+# Convergence table of wannier90: | Iter  Delta Spread  RMS Gradient  Spread (Ang^2)  Time |<-- CONV
+wout = parse_wout('wte2.wout')
+iterations = wout['iterations']
+spreads = wout['spreads']
 
 print(f"Parsed {len(iterations)} iterations.")
 if len(iterations) > 0:
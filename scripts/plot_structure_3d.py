@@ -1,10 +1,11 @@
 import matplotlib.pyplot as plt
 import numpy as np
 from mpl_toolkits.mplot3d import Axes3D
-from itertools import product
 import os
 import sys
 
+from structure import parse_qe_input, get_supercell, draw_bonds
+
 # --- PROJECTOR SETTINGS ---
 params = {
     'figure.figsize': (12, 10),
@@ -15,183 +16,40 @@ params = {
 }
 plt.rcParams.update(params)
 
-BOHR_TO_ANG = 0.529177
-
-def parse_qe_input(filename):
-    atoms = []
-    cell = []
-    if not os.path.exists(filename):
-        # Fallback paths
-        if os.path.exists(f"../{filename}"): filename = f"../{filename}"
-        elif os.path.exists(f"repo/{filename}"): filename = f"repo/{filename}"
-        else: return None, None
-        
-    with open(filename, 'r') as f:
-        lines = f.readlines()
-        
-    # Parse Cell
-    for i, line in enumerate(lines):
-        if "CELL_PARAMETERS" in line:
-            scale = BOHR_TO_ANG if "bohr" in line.lower() else 1.0
-            v1 = np.array([float(x) for x in lines[i+1].split()]) * scale
-            v2 = np.array([float(x) for x in lines[i+2].split()]) * scale
-            v3 = np.array([float(x) for x in lines[i+3].split()]) * scale
-            cell = np.array([v1, v2, v3])
-            break
-            
-    # Parse Atoms
-    in_atoms = False
-    atom_scale = 1.0
-    for line in lines:
-        if "ATOMIC_POSITIONS" in line:
-            in_atoms = True
-            if "bohr" in line.lower(): atom_scale = BOHR_TO_ANG
-            elif "crystal" in line.lower(): atom_scale = 'crystal'
-            continue
-        if in_atoms:
-            if line.strip() == "" or "K_POINTS" in line: break
-            parts = line.split()
-            if len(parts) >= 4:
-                species = parts[0]
-                coords = np.array([float(x) for x in parts[1:4]])
-                if atom_scale == 'crystal':
-                    cart = coords[0]*cell[0] + coords[1]*cell[1] + coords[2]*cell[2]
-                    atoms.append({'s': species, 'pos': cart})
-                else:
-                    atoms.append({'s': species, 'pos': coords * atom_scale})
-                    
-    return cell, atoms
-
-def get_supercell(cell, atoms, dim=(2,2,1)):
-    # Expand unit cell to supercell
-    super_atoms = []
-    nx, ny, nz = dim
-    
-    # Range centered around 0 to look nice? Or just positive.
-    # Let's do 0 to N
-    for i, j, k in product(range(nx), range(ny), range(nz)):
-        shift = i*cell[0] + j*cell[1] + k*cell[2]
-        for atom in atoms:
-            pos = atom['pos'] + shift
-            super_atoms.append({'s': atom['s'], 'pos': pos})
-            
-    return super_atoms
-
-def draw_bonds(ax, atoms, cutoff=3.2):
-    # Brute force distance optimization
-    pos = np.array([a['pos'] for a in atoms])
-    n = len(atoms)
-    
-    # Store plotted bonds to avoid dupes drawn twice? 
-    # Matplotlib draws painter's algo, so drawing twice is fine/inefficient but okay.
-    
-    for i in range(n):
-        for j in range(i+1, n):
-            p1 = pos[i]
-            p2 = pos[j]
-            d = np.linalg.norm(p1 - p2)
-            if d < cutoff:
-                # Bond Logic:
-                # W-Te ~ 2.8 A
-                # W-W (zigzag) ~ 2.8 A
-                # Te-Te typically longer > 3.5
-                
-                # Check species
-                s1, s2 = atoms[i]['s'], atoms[j]['s']
-                
-                # Style based on bond type?
-                lw = 2
-                color = 'gray'
-                if s1 == 'W' and s2 == 'W':
-                    color = '#2c3e50' # Dark Blue bond
-                    lw = 3
-                elif (s1 == 'W' and s2 == 'Te') or (s1 == 'Te' and s2 == 'W'):
-                    color = 'gray'
-                    lw = 2
-                else:
-                    continue # Skip Te-Te if any
-                
-                ax.plot([p1[0], p2[0]], [p1[1], p2[1]], [p1[2], p2[2]], 
-                        color=color, linewidth=lw, alpha=0.6)
-
 def plot_3d_structure():
-    cell, unit_atoms = parse_qe_input('wte2.scf.in')
-    if not cell.any():
+    cell, unit_species, unit_pos = parse_qe_input('wte2.scf.in')
+    if cell is None or not cell.any():
         print("Could not parse input.")
         sys.exit(1)
         
     # Create Supercell for connectivity visualization
     # 2x2x1 is standard
-    atoms = get_supercell(cell, unit_atoms, dim=(2,2,1))
+    species, positions, cell_index = get_supercell(cell, unit_species, unit_pos, dim=(2,2,1))
     
     fig = plt.figure(figsize=(14, 10))
     ax = fig.add_subplot(111, projection='3d')
     
     # 1. Draw Bonds FIRST (so atoms sit on top)
-    draw_bonds(ax, atoms, cutoff=3.0) 
+    # W-W and W-Te bonds, one Line3DCollection per type (Te-Te skipped)
+    draw_bonds(ax, species, positions, cutoff=3.0) 
     
     # 2. Draw Atoms
-    xs = [a['pos'][0] for a in atoms]
-    ys = [a['pos'][1] for a in atoms]
-    zs = [a['pos'][2] for a in atoms]
-    species = [a['s'] for a in atoms]
+    xs, ys, zs = positions.T
 
     # Identify Central Cell Atoms vs Supercell Ghosts
-    # "Central" if they are the original atoms (before expansion loop in get_supercell logic)
-    # Actually get_supercell returns a flat list.
-    # Logic: The first N atoms are usually the unit cell? No, get_supercell iterates lattice.
-    # Let's filter by position? If inside unit cell?
-    # Simple Heuristic: If x,y is roughly within 0..a and 0..b?
-    # Better: Identify indices.
-    
-    # Let's rewrite get_supercell to track if it's the central cell (i=0, j=0, k=0)
-    # But existing get_supercell is: for i,j,k...
-    # We can assume central cell is somewhere in the middle of 2x2?
-    # The user wants "one unit cell bold".
-    # Let's pick the cell at index (0,0) or (1,0)?
-    # Since visual box is 2x2, let's pick cell (0,0) as Bold.
-    
-    colors = []
-    alphas = []
-    edgecolors = []
-    
-    # Re-calculate which cell each atom belongs to
-    n_unit = len(unit_atoms)
-    
-    for idx, atom in enumerate(atoms):
-        species_s = atom['s'] # Renamed to avoid conflict with outer 'species' list
-        # Determine if this atom belongs to the "Primary" Unit Cell
-        # We constructed it by looping i,j,k.
-        # idx % n_unit gives index in unit cell.
-        # idx // n_unit gives cell index.
-        # Loop order: i(0..nx), j(0..ny), k(0..nz).
-        # We want i=0, j=0, k=0 (First block) to be bold?
-        # Or maybe the one in the middle?
-        # Let's make the FIRST cell bold for clarity.
-        
-        is_primary = (idx < n_unit) 
-        
-        if species_s == 'W':
-            base_color = '#2c3e50'
-        else:
-            base_color = '#f39c12'
-            
-        if is_primary:
-            colors.append(base_color) # Bold
-            alphas.append(1.0)
-            edgecolors.append('black')
-        else:
-            # Ghost / Faded
-            # Use distinct light color or just alpha?
-            # User said: "make it a bit light colored"
-            if species_s == 'W':
-                colors.append('#bdc3c7') # Light Gray/Blue
-            else:
-                colors.append('#fcd088') # Light Orange
-            alphas.append(0.8) # Slight fade
-            edgecolors.append('gray')
+    # The user wants "one unit cell bold": the cell at translation (0,0,0).
+    is_primary = np.all(cell_index == 0, axis=1)
+    is_w = species == 'W'
+
+    # Bold colours for the primary cell, light (ghost) colours elsewhere
+    # User said: "make it a bit light colored"
+    colors = np.where(is_primary,
+                      np.where(is_w, '#2c3e50', '#f39c12'),
+                      np.where(is_w, '#bdc3c7', '#fcd088')) # Light Gray/Blue, Light Orange
+    alphas = np.where(is_primary, 1.0, 0.8) # Slight fade
+    edgecolors = np.where(is_primary, 'black', 'gray')
 
-    sizes = [400 if s == 'W' else 200 for s in species]
+    sizes = np.where(is_w, 400, 200)
     
     ax.scatter(xs, ys, zs, c=colors, s=sizes, edgecolors=edgecolors, depthshade=False, alpha=alphas)
     
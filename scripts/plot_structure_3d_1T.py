@@ -2,6 +2,8 @@ import matplotlib.pyplot as plt
 import numpy as np
 import os
 
+from structure import get_supercell, draw_bonds
+
 # --- STYLE SETTINGS (MATCHING 1T' SCRIPT) ---
 params = {
     'figure.figsize': (10, 8),
@@ -33,33 +35,17 @@ def plot_1T_3d():
     # Te at (1/3, 2/3, z) and (2/3, 1/3, -z)
     z_te = 1.6 # Approx height
     
-    coords = []
-    species = []
-    
     # Create Broad Grid and then Geometrically Filter
-    # We want a clean strip along Y.
-    nx_range = range(-4, 6)
-    ny_range = range(-4, 10)
-    
-    for i in nx_range:
-        for j in ny_range:
-            # Origin of cell
-            origin = i*a1 + j*a2
-            
-            w_pos = origin
-            coords.append(w_pos)
-            species.append('W')
-            
-            te1_pos = origin + (1.0/3.0)*a1 + (2.0/3.0)*a2 + np.array([0, 0, z_te])
-            coords.append(te1_pos)
-            species.append('Te')
-            
-            te2_pos = origin + (2.0/3.0)*a1 + (1.0/3.0)*a2 + np.array([0, 0, -z_te])
-            coords.append(te2_pos)
-            species.append('Te')
-            
-    coords = np.array(coords)
-    species = np.array(species)
+    # We want a clean strip along Y: cells i in [-4, 6), j in [-4, 10)
+    cell = np.array([a1, a2, c_vec])
+    basis_frac = np.array([
+        [0.0, 0.0, 0.0],             # W at origin
+        [1.0/3.0, 2.0/3.0, 0.0],     # Te (top)
+        [2.0/3.0, 1.0/3.0, 0.0],     # Te (bottom)
+    ])
+    basis = basis_frac @ cell + np.array([[0, 0, 0], [0, 0, z_te], [0, 0, -z_te]])
+    species, coords, _ = get_supercell(cell, np.array(['W', 'Te', 'Te']), basis,
+                                       dim=(10, 14, 1), start=(-4, -4, 0))
     
     # --- DEFINE RECTANGULAR CELL (Match 1T') ---
     u_rect = a1
@@ -74,14 +60,10 @@ def plot_1T_3d():
     
     # Find Primary Atoms (Pre-Shift) for Alignment Calculation
     # These are the ones inside the "Red Box" at i=0, j=0.
-    primary_mask_pre = []
-    
-    for idx, (x, y, z) in enumerate(coords):
-        rx = x - ref_origin[0]
-        ry = y - ref_origin[1]
-        tol = 0.1
-        if (-tol <= rx <= x_limit + tol) and (-tol <= ry <= y_limit + tol):
-            primary_mask_pre.append(idx)
+    tol = 0.1
+    rel = coords - ref_origin
+    primary_mask_pre = ((-tol <= rel[:, 0]) & (rel[:, 0] <= x_limit + tol) &
+                        (-tol <= rel[:, 1]) & (rel[:, 1] <= y_limit + tol))
             
     # --- COORDINATE ALIGNMENT ---
     # Calculate Centroid of these Primary Atoms
@@ -113,30 +95,17 @@ def plot_1T_3d():
     x_min_f, x_max_f = -1.5, 6.0  # Slightly wider than view to avoid edge popping
     y_min_f, y_max_f = -1.0, 14.0 # Strip along Y
     
-    final_coords = []
-    final_species = []
-    final_is_primary = []
+    # 1. VISIBILITY CHECK
+    visible = ((x_min_f <= coords[:, 0]) & (coords[:, 0] <= x_max_f) &
+               (y_min_f <= coords[:, 1]) & (coords[:, 1] <= y_max_f))
+    final_coords = coords[visible]
+    final_species = species[visible]
     
-    # Re-evaluate logic on shifted coords
-    for idx, (x, y, z) in enumerate(coords):
-        # 1. VISIBILITY CHECK
-        if (x_min_f <= x <= x_max_f) and (y_min_f <= y <= y_max_f):
-            final_coords.append([x, y, z])
-            final_species.append(species[idx])
-            
-            # 2. PRIMARY (RED BOX) CHECK
-            # Check if this specific atom was part of our "Primary" set?
-            # Or just re-check if inside the shifted box?
-            # Re-checking shifted box is robust.
-            
-            # Position relative to shifted box origin
-            rx = x - box_origin[0]
-            ry = y - box_origin[1]
-            tol = 0.1
-            in_box = (-tol <= rx <= x_limit + tol) and (-tol <= ry <= y_limit + tol)
-            final_is_primary.append(in_box)
-            
-    final_coords = np.array(final_coords)
+    # 2. PRIMARY (RED BOX) CHECK
+    # Re-checking the shifted box is robust.
+    rel = final_coords - box_origin
+    final_is_primary = ((-tol <= rel[:, 0]) & (rel[:, 0] <= x_limit + tol) &
+                        (-tol <= rel[:, 1]) & (rel[:, 1] <= y_limit + tol))
     
     # --- PLOTTING ---
     
@@ -174,19 +143,9 @@ def plot_1T_3d():
     # Plot Bonds (Re-calc on visible atoms)
     bond_cutoff = 3.2 # Slightly larger to catch bonds
     
-    # Optimization: Only loop visible atoms
-    n_vis = len(final_coords)
-    w_indices = [k for k, s in enumerate(final_species) if s == 'W']
-    te_indices = [k for k, s in enumerate(final_species) if s == 'Te']
-    
-    for i in w_indices:
-        p1 = final_coords[i]
-        for j in te_indices:
-            p2 = final_coords[j]
-            dist = np.linalg.norm(p1 - p2)
-            if dist < bond_cutoff:
-                ax.plot([p1[0], p2[0]], [p1[1], p2[1]], [p1[2], p2[2]], 
-                       color='gray', alpha=0.4, linewidth=2)
+    # KD-tree search on visible atoms, all W-Te bonds as a single Line3DCollection
+    draw_bonds(ax, final_species, final_coords, cutoff=bond_cutoff,
+               styles={('Te', 'W'): {'color': 'gray', 'alpha': 0.4, 'linewidth': 2}})
 
     # Unit Cell Box (Rectangular 1T' shape)
     uc_corners = [
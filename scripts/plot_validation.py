@@ -2,6 +2,9 @@ import matplotlib.pyplot as plt
 import numpy as np
 import re
 
+from band_render import parse_band_dat, draw_bands, draw_band_points
+from profiling import phase
+
 def parse_qe_bands(filename):
     """Parses bands from PWSCF output"""
     bands = []
@@ -85,98 +88,67 @@ def parse_qe_bands(filename):
         
     return np.array(extracted_bands)
 
-def parse_wannier_bands(filename):
-    """
-    Reads a standard Wannier90 band.dat file.
-    """
-    bands = []
-    current_band = []
-    
-    with open(filename, 'r') as f:
-        for line in f:
-            if not line.strip():
-                if current_band:
-                    bands.append(np.array(current_band))
-                    current_band = []
-            else:
-                try:
-                    parts = line.split()
-                    k = float(parts[0])
-                    e = float(parts[1])
-                    current_band.append([k, e])
-                except ValueError:
-                    continue
-    if current_band:
-        bands.append(np.array(current_band))
-    return bands
-
 # --- LOAD DATA ---
-try:
-    qe_data = parse_qe_bands('wte2.dft_bands.out')
-    print(f"Loaded DFT bands: {qe_data.shape} (k-points, bands)")
-except Exception as e:
-    print(f"DFT Load Error: {e}")
-    qe_data = None
+with phase('parse'):
+    try:
+        qe_data = parse_qe_bands('wte2.dft_bands.out')
+        print(f"Loaded DFT bands: {qe_data.shape} (k-points, bands)")
+    except Exception as e:
+        print(f"DFT Load Error: {e}")
+        qe_data = None
 
-try:
-    wan_bands = parse_wannier_bands('wte2_band.dat')
-    print(f"Loaded Wannier bands: {len(wan_bands)} bands")
-except:
-    wan_bands = None
+    try:
+        wan_k, wan_bands = parse_band_dat('wte2_band.dat')
+        print(f"Loaded Wannier bands: {wan_bands.shape[0]} bands")
+    except:
+        wan_bands = None
 
 # --- PLOTTING ---
-fig, ax = plt.subplots(figsize=(8, 6))
+with phase('render'):
+    fig, ax = plt.subplots(figsize=(8, 6))
 
-# Plot DFT (Red Dots)
-if qe_data is not None:
-    # We need an x-axis. Using index is okay if we align path, 
-    # but Wannier has X-axis in path length.
-    # Let's scale DFT x-axis to match Wannier range [0, max_k]
-    # Assuming same k-path (81 points vs 100 points?)
-    # wte2.dft_bands.in has K_POINTS crystal_b with 5 points (20 intervals -> ~80 pts)
-    # Wannier: 100 pts/segment * 4 segments = 400 pts?
-    # Scaling is hard. We will plot separate or overlay roughly.
-    
-    # We will try to map the x-axis:
-    # Best effort: Just plotting Energy vs Index for DFT is misleading.
-    # Let's rely on just energy range visual check or matching k-path length.
+    # Plot DFT (Red Dots)
+    if qe_data is not None:
+        # We need an x-axis. Using index is okay if we align path, 
+        # but Wannier has X-axis in path length.
+        # Let's scale DFT x-axis to match Wannier range [0, max_k]
+        # Assuming same k-path (81 points vs 100 points?)
+        # wte2.dft_bands.in has K_POINTS crystal_b with 5 points (20 intervals -> ~80 pts)
+        # Wannier: 100 pts/segment * 4 segments = 400 pts?
+        # Scaling is hard. We will plot separate or overlay roughly.
     
-    # Simplification: Plot DFT as scattered points on their index normalized to 1?
-    # No, let's just plot DFT Bands.
+        # We will try to map the x-axis:
+        # Best effort: Just plotting Energy vs Index for DFT is misleading.
+        # Let's rely on just energy range visual check or matching k-path length.
     
-    # Actually, let's assume Wannier path is the "master" axis.
-    # We won't perfectly align X-axis in this quick script without computing path length.
-    # We'll plot Energy vs "K-point Index" and scale Wannier to match.
+        # Simplification: Plot DFT as scattered points on their index normalized to 1?
+        # No, let's just plot DFT Bands.
     
-    nk_dft = qe_data.shape[0]
-    x_dft = np.linspace(0, 1, nk_dft)
+        # Actually, let's assume Wannier path is the "master" axis.
+        # We won't perfectly align X-axis in this quick script without computing path length.
+        # We'll plot Energy vs "K-point Index" and scale Wannier to match.
     
-    if wan_bands:
-        nk_wan = len(wan_bands[0])
-        x_wan = np.linspace(0, 1, nk_wan)
+        nk_dft = qe_data.shape[0]
+        x_dft = np.linspace(0, 1, nk_dft)
     
-    # DFT
-    for ib in range(qe_data.shape[1]):
-        ax.scatter(x_dft, qe_data[:, ib], color='red', s=10, label='DFT' if ib==0 else "", zorder=2)
+        # DFT (all bands in a single scatter, qe_data is (k-points, bands))
+        draw_band_points(ax, x_dft, qe_data.T, color='red', s=10, label='DFT', zorder=2)
 
-    # Wannier
-    if wan_bands:
-        for band in wan_bands:
+        # Wannier
+        if wan_bands is not None:
             # Interpolate Wannier to 0..1 x-axis
-            # band[:, 0] is path length.
-            # We normalize it.
-            k_raw = band[:, 0]
-            k_norm = (k_raw - k_raw[0]) / (k_raw[-1] - k_raw[0])
-            e = band[:, 1]
-            ax.plot(k_norm, e, color='blue', linewidth=1, alpha=0.7, label='Wannier' if band is wan_bands[0] else "", zorder=1)
+            # wan_k is path length. We normalize it.
+            k_norm = (wan_k - wan_k[0]) / (wan_k[-1] - wan_k[0])
+            draw_bands(ax, k_norm, wan_bands, color='blue', linewidth=1, alpha=0.7, label='Wannier', zorder=1)
 
-ax.set_ylim(-3, 3)
-ax.axhline(0, color='gray', linestyle='--')
-ax.set_title("Validation: DFT (Red) vs Wannier (Blue)")
-ax.set_xlabel("Normalized K-Path")
-ax.set_ylabel("Energy (eV)")
-ax.legend()
-ax.grid(True, alpha=0.3)
+    ax.set_ylim(-3, 3)
+    ax.axhline(0, color='gray', linestyle='--')
+    ax.set_title("Validation: DFT (Red) vs Wannier (Blue)")
+    ax.set_xlabel("Normalized K-Path")
+    ax.set_ylabel("Energy (eV)")
+    ax.legend()
+    ax.grid(True, alpha=0.3)
 
-plt.savefig("validation_dft_vs_wannier.png", dpi=150)
+with phase('save'):
+    plt.savefig("validation_dft_vs_wannier.png", dpi=150)
 print("Saved validation_dft_vs_wannier.png")
@@ -0,0 +1,173 @@
+import atexit
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Opt-in instrumentation shared by the scripts.
+# Enable with WTE2_PROFILE=1 (or WTE2_PROFILE=my_trace.json) or by passing --profile to
+# any script that imports this module. Code marks named phases with
+#
+#     with phase('diagonalise', nk=150):
+#         ...
+#
+# and, when enabled, each phase records wall time, CPU time (own + waited children) and
+# the peak RSS seen by a background sampler. At exit a Chrome trace (open it in
+# chrome://tracing or ui.perfetto.dev) is written and a flat per-phase summary printed.
+# When disabled, phase() returns a shared no-op context manager.
+
+# --- CONFIGURATION ---
+PROFILE_ENV = 'WTE2_PROFILE'
+SAMPLE_INTERVAL = 0.01  # s, RSS sampling period
+RSS_STEP = 1 << 20      # bytes; RSS counter samples are only kept when RSS moves this much
+
+_NULL = nullcontext()
+_STATE = None
+_PAGE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _rss_bytes():
+    """Current resident set size (falls back to the lifetime peak off Linux)."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * _PAGE
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _children_cpu():
+    ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return ru.ru_utime + ru.ru_stime, ru.ru_maxrss * 1024
+
+
+def _now_us():
+    return (time.perf_counter() - _STATE['t0']) * 1e6
+
+
+def _sampler(state):
+    last = 0
+    while not state['stop'].wait(SAMPLE_INTERVAL):
+        rss = _rss_bytes()
+        with state['lock']:
+            for rec in state['active']:
+                rec['peak'] = max(rec['peak'], rss)
+            if abs(rss - last) >= RSS_STEP:
+                state['counters'].append((_now_us(), rss))
+                last = rss
+
+
+def enable(trace_file=None):
+    """Turns profiling on for this process; the trace and summary are written at exit."""
+    global _STATE
+    if _STATE is not None:
+        return
+    if trace_file is None:
+        script = os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0] or 'python'
+        trace_file = f"profile_{script}.json"
+    _STATE = {'t0': time.perf_counter(), 'trace_file': trace_file, 'events': [], 'counters': [],
+              'active': [], 'lock': threading.Lock(), 'stop': threading.Event(), 'pid': os.getpid()}
+    thread = threading.Thread(target=_sampler, args=(_STATE,), daemon=True)
+    thread.start()
+    atexit.register(report)
+
+
+def enabled():
+    return _STATE is not None
+
+
+def phase(name, **args):
+    """Context manager timing a named phase; extra keyword arguments go into the trace."""
+    # Forked pool workers inherit _STATE, but its lock may have been held by the sampler
+    # at fork time and their events would never reach the trace; their CPU time is still
+    # counted by the parent's phase as waited-for children.
+    if _STATE is None or os.getpid() != _STATE['pid']:
+        return _NULL
+    return _record(name, args)
+
+
+@contextmanager
+def _record(name, args):
+    rss = _rss_bytes()
+    child_cpu, child_rss = _children_cpu()
+    rec = {'name': name, 'peak': rss}
+    with _STATE['lock']:
+        _STATE['active'].append(rec)
+    ts = _now_us()
+    cpu0 = time.process_time()
+    try:
+        yield
+    finally:
+        cpu = time.process_time() - cpu0
+        dur = _now_us() - ts
+        child_cpu1, child_rss1 = _children_cpu()
+        rss = _rss_bytes()
+        with _STATE['lock']:
+            _STATE['active'].remove(rec)
+            peak = max(rec['peak'], rss)
+            event_args = dict(args)
+            event_args.update({'cpu_s': cpu + child_cpu1 - child_cpu, 'peak_rss_mb': peak / 2**20})
+            if child_rss1 > child_rss:
+                event_args['child_peak_rss_mb'] = child_rss1 / 2**20
+            _STATE['events'].append({'name': name, 'ph': 'X', 'ts': ts, 'dur': dur,
+                                     'pid': _STATE['pid'], 'tid': threading.get_ident(),
+                                     'args': event_args})
+
+
+def profiled(name=None):
+    """Decorator form of phase(); the name defaults to the function name."""
+    def wrap(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def inner(*a, **kw):
+            with phase(label):
+                return func(*a, **kw)
+        return inner
+    return wrap
+
+
+def summary():
+    """Per-phase rows: (name, calls, wall_s, cpu_s, peak_rss_mb), by descending wall time."""
+    rows = {}
+    for ev in _STATE['events']:
+        r = rows.setdefault(ev['name'], [0, 0.0, 0.0, 0.0])
+        r[0] += 1
+        r[1] += ev['dur'] * 1e-6
+        r[2] += ev['args']['cpu_s']
+        r[3] = max(r[3], ev['args'].get('child_peak_rss_mb', 0.0), ev['args']['peak_rss_mb'])
+    return sorted(((n, *r) for n, r in rows.items()), key=lambda r: -r[2])
+
+
+def report():
+    """Writes the Chrome trace and prints the summary table (called at exit when enabled)."""
+    if _STATE is None or os.getpid() != _STATE['pid']:
+        return # Forked pool workers inherit the state but do not own the trace
+    _STATE['stop'].set()
+    total = _now_us() * 1e-6
+    with _STATE['lock']:
+        rows = summary()
+        trace = list(_STATE['events'])
+        trace += [{'name': 'RSS', 'ph': 'C', 'ts': ts, 'pid': _STATE['pid'], 'args': {'MB': rss / 2**20}}
+                  for ts, rss in _STATE['counters']]
+
+    with open(_STATE['trace_file'], 'w') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms',
+                   'otherData': {'argv': sys.argv, 'total_wall_s': total}}, f)
+
+    print(f"\n--- Profile ({total:.3f} s total, trace: {_STATE['trace_file']}) ---")
+    print(f"{'phase':<28s}{'calls':>7s}{'wall (s)':>11s}{'cpu (s)':>11s}{'% wall':>8s}{'peak RSS (MB)':>15s}")
+    for name, calls, wall, cpu, peak in rows:
+        print(f"{name:<28s}{calls:7d}{wall:11.3f}{cpu:11.3f}{100 * wall / total:8.1f}{peak:15.1f}")
+
+
+# Opt-in at import time: environment variable or a --profile flag (removed from argv so
+# argument parsing in the calling script is unaffected)
+_value = os.environ.get(PROFILE_ENV, '')
+if '--profile' in sys.argv[1:] or _value not in ('', '0'):
+    if '--profile' in sys.argv[1:]:
+        sys.argv.remove('--profile')
+    enable(_value if _value.endswith('.json') else None)
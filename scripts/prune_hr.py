@@ -0,0 +1,168 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+
+from wannier_tb import load_hr_dat, prune_model, hk, eigh_k, parse_win, parse_wout, band_path
+
+# Hopping truncation for the Wannier Hamiltonian, with its accuracy cost.
+# prune_model (wannier_tb) drops |H_mn(R)| below an energy cut and hoppings longer than a
+# distance cut; this script reports what that costs on a test k-set:
+#   bound    : sum_R ||dH(R)||_F, an upper bound on ||H(k) - H'(k)||_2 and therefore (Weyl)
+#              on the shift of every eigenvalue at every k
+#   max/rms  : measured eigenvalue errors on TEST_K random k-points plus the .win band path
+#   near E_F : max error of the states within NEAR_EF of the Fermi level
+# and the H(k) build time before / after. The pruned model is stored as sparse per-R
+# blocks (<hr>.pruned.npz: one CSR row of nw^2 elements per R) and, with --hr-out, as a
+# regular hr.dat with the empty R-vectors removed.
+#
+# Usage:
+#   python prune_hr.py --energy-cut 1e-4 3e-4 1e-3 3e-3          # scan
+#   python prune_hr.py --energy-cut 1e-3 --max-dist 20 --save    # keep one
+
+# --- CONFIGURATION ---
+FNAME = 'wte2_hr.dat'
+WIN_FILE = 'wte2.win'
+WOUT_FILE = 'wte2.wout'
+TEST_K = 400
+NEAR_EF = 0.5 # eV
+SEED = 0
+
+
+def save_pruned(fname, model):
+    """Writes a model as sparse per-R blocks: CSR (nR, nw^2) plus rvecs / deg."""
+    nw = model['num_wann']
+    csr = sparse.csr_matrix(model['ham'].reshape(len(model['rvecs']), nw * nw))
+    np.savez_compressed(fname, num_wann=nw, rvecs=model['rvecs'], deg=model['deg'],
+                        data=csr.data, indices=csr.indices, indptr=csr.indptr)
+
+
+def load_pruned(fname):
+    """Model dict (dense per-R blocks) from save_pruned output."""
+    f = np.load(fname)
+    nw, nr = int(f['num_wann']), len(f['rvecs'])
+    csr = sparse.csr_matrix((f['data'], f['indices'], f['indptr']), shape=(nr, nw * nw))
+    return {'num_wann': nw, 'rvecs': f['rvecs'], 'deg': f['deg'],
+            'ham': csr.toarray().reshape(nr, nw, nw)}
+
+
+def error_bound(model, pruned):
+    """sum_R ||H(R) - H'(R)||_F over all R of the full model (dropped R count in full)."""
+    index = {tuple(r): i for i, r in enumerate(pruned['rvecs'])}
+    total = 0.0
+    for r, h in zip(model['rvecs'], model['ham']):
+        i = index.get(tuple(r))
+        total += np.linalg.norm(h if i is None else h - pruned['ham'][i])
+    return total
+
+
+def test_kpoints(n=TEST_K, win=None, seed=SEED):
+    """n random in-plane k-points, plus the band path of win when given."""
+    kpts = np.random.default_rng(seed).random((n, 3))
+    kpts[:, 2] = 0.0
+    if win is not None and win['kpoint_path']:
+        kpts = np.vstack([kpts, band_path(win)[0]])
+    return kpts
+
+
+def band_error(model, pruned, kpts, ef=None, near_ef=NEAR_EF, ref=None):
+    """
+    Eigenvalue errors of pruned vs model on kpts: dict with 'max', 'rms' and, if ef is
+    given, 'max_near_ef' (states of the full model within near_ef of ef).
+    ref : optional precomputed eigenvalues of model on kpts.
+    """
+    e0 = eigh_k(model, kpts) if ref is None else ref
+    err = np.abs(eigh_k(pruned, kpts) - e0)
+    out = {'max': float(err.max()), 'rms': float(np.sqrt(np.mean(err**2)))}
+    if ef is not None:
+        near = np.abs(e0 - ef) < near_ef
+        out['max_near_ef'] = float(err[near].max()) if near.any() else 0.0
+    return out
+
+
+def _build_time(model, kpts, repeat=3):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        hk(model, kpts)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    # no prefix matching: '--hr' must not silently mean '--hr-out' and overwrite the input
+    parser = argparse.ArgumentParser(description="Prune small / long-range hoppings and report the band error.",
+                                     allow_abbrev=False)
+    parser.add_argument('hr', nargs='?', default=FNAME)
+    parser.add_argument('--energy-cut', type=float, nargs='+', default=[1e-3], help="eV, one or more values")
+    parser.add_argument('--max-dist', type=float, default=None, help="Angstrom (needs the .win cell)")
+    parser.add_argument('--win', default=WIN_FILE)
+    parser.add_argument('--wout', default=WOUT_FILE, help="WF centres for --max-dist")
+    parser.add_argument('--test-k', type=int, default=TEST_K)
+    parser.add_argument('--ef', type=float, default=None, help="Fermi level (default: fermi.py, cached)")
+    parser.add_argument('--save', action='store_true', help="write <hr>.pruned.npz for the last cut")
+    parser.add_argument('--hr-out', default=None, help="also write the pruned model as hr.dat")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.hr):
+        print(f"Error: {args.hr} not found.")
+        return 1
+    if args.hr_out is not None and os.path.abspath(args.hr_out) == os.path.abspath(args.hr):
+        print(f"Error: --hr-out would overwrite the input model {args.hr}.")
+        return 1
+    win = parse_win(args.win) if os.path.exists(args.win) else None
+    cell = win['unit_cell'] if win is not None else None
+    if args.max_dist is not None and cell is None:
+        print(f"Error: --max-dist needs the unit cell from {args.win}.")
+        return 1
+    centres = None
+    if args.max_dist is not None and os.path.exists(args.wout):
+        centres = parse_wout(args.wout)['centres']
+        if len(centres) == 0:
+            centres = None
+
+    model = load_hr_dat(args.hr)
+    nw = model['num_wann']
+    ef = args.ef
+    if ef is None:
+        try:
+            from fermi import fermi_level
+            ef = fermi_level(args.hr)
+        except Exception as e: # E_F is only used for the near-E_F column
+            print(f"Warning: no Fermi level ({e}); skipping the near-E_F error.")
+
+    kpts = test_kpoints(args.test_k, win)
+    ref = eigh_k(model, kpts)
+    t_full = _build_time(model, kpts)
+    print(f"{args.hr}: {len(model['rvecs'])} R-vectors, {nw} WFs, {len(kpts)} test k-points"
+          + (f", E_F = {ef:.4f} eV" if ef is not None else ""))
+    print(f"{'cut (eV)':>10s}{'nR':>6s}{'kept %':>9s}{'bound':>11s}{'max err':>11s}{'rms err':>11s}"
+          f"{'near E_F':>11s}{'H(k) x':>9s}")
+
+    pruned = None
+    for cut in args.energy_cut:
+        pruned = prune_model(model, cut, args.max_dist, cell, centres)
+        err = band_error(model, pruned, kpts, ef, ref=ref)
+        kept = 100.0 * np.count_nonzero(pruned['ham']) / model['ham'].size
+        speed = t_full / _build_time(pruned, kpts)
+        near = f"{err['max_near_ef']:11.2e}" if 'max_near_ef' in err else f"{'-':>11s}"
+        print(f"{cut:10.1e}{len(pruned['rvecs']):6d}{kept:9.2f}{error_bound(model, pruned):11.2e}"
+              f"{err['max']:11.2e}{err['rms']:11.2e}{near}{speed:9.2f}")
+
+    if args.save:
+        out = os.path.splitext(args.hr)[0] + '.pruned.npz'
+        save_pruned(out, pruned)
+        print(f"Saved {out} (energy cut {args.energy_cut[-1]:g} eV)")
+    if args.hr_out:
+        from synthetic_hr import write_hr_dat
+        write_hr_dat(args.hr_out, pruned, header=f"pruned from {args.hr}: |H| > {args.energy_cut[-1]:g} eV"
+                     + (f", |d| <= {args.max_dist:g} A" if args.max_dist is not None else ""))
+        print(f"Saved {args.hr_out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
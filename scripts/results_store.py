@@ -0,0 +1,407 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+try:
+    import h5py
+except ImportError: # Optional: the directory format below needs only numpy
+    h5py = None
+
+from wannier_tb import load_hr_dat, eigh_rows, berry_curvature_rows
+
+# Chunked, compressed store for k-resolved results, so consumers read slices instead of
+# re-parsing ASCII files. A store is either an HDF5 file (path ending in .h5 / .hdf5,
+# needs h5py) or a directory:
+#   <store>/meta.json                 store metadata + per-array shape, dtype, chunks, attrs
+#   <store>/<array>/r<start>.npz      compressed row chunks (axis 0)
+# Arrays are 2D-or-more with k (or energy) along axis 0. Every array keeps the min / max of
+# each column, so window queries ("bands within +/-1 eV") pick the columns before any
+# chunk is read. Layout used by the importers and the mesh producer:
+#   path/x, path/energies (nk,), (nk, nb)      from <seed>_band.dat (+ labelinfo in attrs)
+#   shc/data (nE, ncol)                        from <seed>-kubo_S_xy.dat
+#   pdos/<species>_<orbital> (nE, 2)           E, summed LDOS of the projwfc.x files
+#   kpoints/frac (nk, 4)                       from kpoints_frac.txt
+#   mesh/k, mesh/energies, mesh/weights, mesh/berry   from `results_store.py mesh`
+#
+# Usage:
+#   python results_store.py import wte2_results          # ASCII outputs -> store
+#   python results_store.py mesh wte2_results --mesh 200 100 --berry
+#   python results_store.py show wte2_results
+
+# --- CONFIGURATION ---
+STORE = 'wte2_results'
+SEEDNAME = 'wte2'
+FNAME = 'wte2_hr.dat'
+CHUNK_ROWS = 4096 # rows per chunk for whole-array writes
+COMPRESSION = 'gzip'
+
+
+def _is_h5(path):
+    return path.endswith(('.h5', '.hdf5'))
+
+
+def _require_h5(path):
+    if h5py is None:
+        raise ImportError(f"{path}: HDF5 stores need h5py; use a directory path instead")
+
+
+# --- DIRECTORY BACKEND ---
+
+def _dir_meta(path):
+    fname = os.path.join(path, 'meta.json')
+    if not os.path.exists(fname):
+        return {'meta': {}, 'arrays': {}}
+    with open(fname, 'r') as f:
+        return json.load(f)
+
+
+def _dir_save_meta(path, meta):
+    os.makedirs(path, exist_ok=True)
+    tmp = os.path.join(path, 'meta.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp, os.path.join(path, 'meta.json'))
+
+
+def _col_range(rows):
+    flat = np.asarray(rows).reshape(len(rows), -1)
+    if not np.isrealobj(flat) or not len(flat):
+        return None, None
+    return flat.min(axis=0), flat.max(axis=0)
+
+
+# --- PUBLIC API (both backends) ---
+
+def set_meta(path, **meta):
+    """Merges store-level metadata (JSON-serialisable values)."""
+    if _is_h5(path):
+        _require_h5(path)
+        with h5py.File(path, 'a') as f:
+            old = json.loads(f.attrs.get('meta', '{}'))
+            old.update(meta)
+            f.attrs['meta'] = json.dumps(old)
+        return
+    store = _dir_meta(path)
+    store['meta'].update(meta)
+    _dir_save_meta(path, store)
+
+
+def read_meta(path):
+    if _is_h5(path):
+        _require_h5(path)
+        with h5py.File(path, 'r') as f:
+            return json.loads(f.attrs.get('meta', '{}'))
+    return _dir_meta(path)['meta']
+
+
+def list_arrays(path):
+    """{name: {'shape', 'dtype', 'attrs'}} for every array in the store."""
+    if _is_h5(path):
+        _require_h5(path)
+        out = {}
+        with h5py.File(path, 'r') as f:
+            def visit(name, obj):
+                if isinstance(obj, h5py.Dataset):
+                    out[name] = {'shape': list(obj.shape), 'dtype': str(obj.dtype),
+                                 'attrs': json.loads(obj.attrs.get('attrs', '{}'))}
+            f.visititems(visit)
+        return out
+    return {name: {k: a[k] for k in ('shape', 'dtype', 'attrs')} for name, a in _dir_meta(path)['arrays'].items()}
+
+
+def is_current(path, name):
+    """True if the store holds `name` and the file it was imported from has not changed since."""
+    if not os.path.exists(path) or (_is_h5(path) and h5py is None):
+        return False
+    a = list_arrays(path).get(name)
+    if a is None:
+        return False
+    source = a['attrs'].get('source')
+    return source is None or not os.path.exists(source) or os.path.getmtime(source) <= a['attrs']['source_mtime']
+
+
+def append_rows(path, name, rows, attrs=None):
+    """
+    Appends rows (along axis 0) to array `name`, creating it on first use; every call
+    becomes one compressed chunk, so streaming producers write slab by slab.
+    """
+    rows = np.asarray(rows)
+    lo, hi = _col_range(rows)
+    if _is_h5(path):
+        _require_h5(path)
+        with h5py.File(path, 'a') as f:
+            if name not in f:
+                ds = f.create_dataset(name, shape=(0,) + rows.shape[1:], maxshape=(None,) + rows.shape[1:],
+                                      dtype=rows.dtype, chunks=(max(1, len(rows)),) + rows.shape[1:],
+                                      compression=COMPRESSION)
+                ds.attrs['attrs'] = json.dumps(attrs or {})
+            ds = f[name]
+            n = ds.shape[0]
+            ds.resize(n + len(rows), axis=0)
+            ds[n:] = rows
+            if attrs:
+                ds.attrs['attrs'] = json.dumps(dict(json.loads(ds.attrs['attrs']), **attrs))
+            if lo is not None:
+                old_lo = ds.attrs.get('col_min', lo)
+                old_hi = ds.attrs.get('col_max', hi)
+                ds.attrs['col_min'] = np.minimum(old_lo, lo)
+                ds.attrs['col_max'] = np.maximum(old_hi, hi)
+        return
+
+    store = _dir_meta(path)
+    a = store['arrays'].get(name)
+    if a is None:
+        a = {'shape': [0] + list(rows.shape[1:]), 'dtype': str(rows.dtype), 'chunks': [], 'attrs': {},
+             'col_min': None, 'col_max': None}
+        store['arrays'][name] = a
+    elif list(rows.shape[1:]) != a['shape'][1:]:
+        raise ValueError(f"{name}: rows of shape {rows.shape[1:]} do not match {a['shape'][1:]}")
+    start = a['shape'][0]
+    os.makedirs(os.path.join(path, name), exist_ok=True)
+    np.savez_compressed(os.path.join(path, name, f"r{start:09d}.npz"), rows=rows)
+    a['chunks'].append([start, start + len(rows)])
+    a['shape'][0] += len(rows)
+    a['attrs'].update(attrs or {})
+    if lo is not None:
+        a['col_min'] = lo.tolist() if a['col_min'] is None else np.minimum(a['col_min'], lo).tolist()
+        a['col_max'] = hi.tolist() if a['col_max'] is None else np.maximum(a['col_max'], hi).tolist()
+    _dir_save_meta(path, store)
+
+
+def write_array(path, name, data, chunk_rows=CHUNK_ROWS, attrs=None):
+    """Writes a whole array (replacing any existing one) in chunks of chunk_rows."""
+    delete_array(path, name)
+    data = np.asarray(data)
+    if data.ndim == 1:
+        data = data[:, None]
+        attrs = dict(attrs or {}, squeeze=True)
+    for start in range(0, max(len(data), 1), chunk_rows):
+        append_rows(path, name, data[start:start + chunk_rows], attrs)
+
+
+def delete_array(path, name):
+    if _is_h5(path):
+        _require_h5(path)
+        if os.path.exists(path):
+            with h5py.File(path, 'a') as f:
+                if name in f:
+                    del f[name]
+        return
+    store = _dir_meta(path)
+    if store['arrays'].pop(name, None) is not None:
+        for fname in glob.glob(os.path.join(path, name, 'r*.npz')):
+            os.remove(fname)
+        _dir_save_meta(path, store)
+
+
+def read_array(path, name, rows=None, cols=None):
+    """
+    Reads array `name`, optionally only rows (slice) and cols (slice or index array on
+    axis 1). Only the chunks overlapping the rows are decompressed.
+    """
+    rows = rows if rows is not None else slice(None)
+    cols = cols if cols is not None else slice(None)
+    if _is_h5(path):
+        _require_h5(path)
+        with h5py.File(path, 'r') as f:
+            ds = f[name]
+            squeeze = json.loads(ds.attrs.get('attrs', '{}')).get('squeeze', False)
+            out = ds[rows]
+    else:
+        a = _dir_meta(path)['arrays'][name]
+        squeeze = a['attrs'].get('squeeze', False)
+        r0, r1, step = rows.indices(a['shape'][0])
+        parts = []
+        for start, stop in a['chunks']:
+            if stop <= r0 or start >= r1:
+                continue
+            with np.load(os.path.join(path, name, f"r{start:09d}.npz")) as z:
+                parts.append(z['rows'][max(r0, start) - start:min(r1, stop) - start])
+        out = np.concatenate(parts) if parts else np.zeros([0] + a['shape'][1:], dtype=a['dtype'])
+        out = out[::step]
+    if squeeze:
+        return out[:, 0]
+    return out[:, cols]
+
+
+def columns_in_window(path, name, emin, emax):
+    """Indices of the columns of `name` whose values reach into [emin, emax] (e.g. bands)."""
+    if _is_h5(path):
+        _require_h5(path)
+        with h5py.File(path, 'r') as f:
+            lo, hi = f[name].attrs['col_min'], f[name].attrs['col_max']
+    else:
+        a = _dir_meta(path)['arrays'][name]
+        lo, hi = np.array(a['col_min']), np.array(a['col_max'])
+    return np.flatnonzero((hi >= emin) & (lo <= emax))
+
+
+def read_bands(path, emin=None, emax=None, shift=0.0):
+    """
+    Band path from the store: x (nk,), bands (nsel, nk) (band.dat layout) and the band
+    indices. With emin / emax only the bands crossing [emin, emax] (after subtracting
+    shift) are read.
+    """
+    cols = None
+    if emin is not None or emax is not None:
+        cols = columns_in_window(path, 'path/energies', (emin if emin is not None else -np.inf) + shift,
+                                 (emax if emax is not None else np.inf) + shift)
+    energies = read_array(path, 'path/energies', cols=cols)
+    bands = np.arange(energies.shape[1]) if cols is None else cols
+    return read_array(path, 'path/x'), energies.T - shift, bands
+
+
+# --- IMPORTERS (ASCII outputs) ---
+
+def _source_attrs(fname):
+    return {'source': os.path.abspath(fname), 'source_mtime': os.path.getmtime(fname)}
+
+
+def import_band_dat(path, fname, labelinfo=None):
+    from band_render import parse_band_dat
+    x, bands = parse_band_dat(fname)
+    attrs = _source_attrs(fname)
+    if labelinfo and os.path.exists(labelinfo):
+        with open(labelinfo, 'r') as f:
+            rows = [l.split() for l in f if l.strip()]
+        attrs['labels'] = [r[0] for r in rows]
+        attrs['ticks'] = [float(r[2]) for r in rows]
+    write_array(path, 'path/x', x, attrs=attrs)
+    write_array(path, 'path/energies', bands.T, chunk_rows=256, attrs=attrs)
+
+
+def import_kubo(path, fname):
+    write_array(path, 'shc/data', np.loadtxt(fname, ndmin=2), attrs=_source_attrs(fname))
+
+
+def import_pdos(path, seed=SEEDNAME):
+    """Sums the LDOS column of the projwfc.x files per (species, orbital)."""
+    groups = {}
+    for fname in sorted(glob.glob(f"{seed}.pdos.pdos_atm#*")):
+        base = os.path.basename(fname)
+        species = base.split('(')[1].split(')')[0]
+        orbital = base.split('(')[2][0]
+        data = np.loadtxt(fname, ndmin=2)
+        key = f"pdos/{species}_{orbital}"
+        if key in groups:
+            groups[key][:, 1] += data[:, 1]
+        else:
+            groups[key] = data[:, :2].copy()
+    for key, data in groups.items():
+        write_array(path, key, data, attrs={'columns': ['E', 'ldos']})
+    return list(groups)
+
+
+def import_kpoints(path, fname):
+    write_array(path, 'kpoints/frac', np.loadtxt(fname, ndmin=2), attrs=_source_attrs(fname))
+
+
+# --- MESH PRODUCER ---
+
+def store_mesh(path, model, mesh, rows_per_slab=8, mask=None, berry=False, hr_file=None,
+               precision='double'):
+    """
+    Streams eigenvalues (and orbital weights / Berry curvature) over an N1 x N2 mesh
+    into the store, one chunk per slab of k1 rows:
+      mesh/k (nk, 3), mesh/energies (nk, nw), mesh/weights (nk, nw, nproj),
+      mesh/berry (nk, nw) (Omega_xy per band, fractional units).
+    """
+    from dos import mesh_rows
+    from fatbands import fat_band_weights
+    for name in ('mesh/k', 'mesh/energies', 'mesh/weights', 'mesh/berry'):
+        delete_array(path, name)
+    attrs = {'mesh': list(mesh), 'precision': precision}
+    for start in range(0, mesh[0], rows_per_slab):
+        stop = min(start + rows_per_slab, mesh[0])
+        append_rows(path, 'mesh/k', mesh_rows(mesh, start, stop), attrs)
+        if berry:
+            # one diagonalisation per slab: the Kubo eigenvectors also give the weights
+            evals, omega, evecs = berry_curvature_rows(model, mesh, start, stop, vectors=True)
+            append_rows(path, 'mesh/berry', omega, attrs)
+        elif mask is None:
+            evals = eigh_rows(model, mesh, start, stop, precision=precision)
+        else:
+            evals, evecs = eigh_rows(model, mesh, start, stop, vectors=True, precision=precision)
+        if mask is not None:
+            append_rows(path, 'mesh/weights', fat_band_weights(evecs, mask), attrs)
+        append_rows(path, 'mesh/energies', evals, attrs)
+
+    meta = {'mesh': list(mesh), 'num_wann': model['num_wann'], 'nrpts': len(model['rvecs']),
+            'written': time.strftime('%Y-%m-%d %H:%M:%S')}
+    if hr_file is not None:
+        from fermi import _file_hash
+        meta.update({'hr_file': os.path.abspath(hr_file), 'hr_sha1': _file_hash(hr_file)})
+    set_meta(path, **meta)
+
+
+def show(path):
+    meta = read_meta(path)
+    print(f"{path}:")
+    for k, v in meta.items():
+        print(f"  {k}: {v}")
+    for name, a in sorted(list_arrays(path).items()):
+        print(f"  {name:<24s} {str(tuple(a['shape'])):<20s} {a['dtype']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunked, compressed store for k-resolved results.")
+    parser.add_argument('action', choices=['import', 'mesh', 'show'])
+    parser.add_argument('store', nargs='?', default=STORE, help="directory, or .h5 file (needs h5py)")
+    parser.add_argument('--seed', default=SEEDNAME)
+    parser.add_argument('--hr', default=FNAME)
+    parser.add_argument('--mesh', type=int, nargs=2, default=[200, 100])
+    parser.add_argument('--berry', action='store_true', help="also store the Berry curvature")
+    parser.add_argument('--weights', default=None, metavar='WIN', help=".win file: store orbital weights")
+    args = parser.parse_args()
+
+    if _is_h5(args.store) and h5py is None:
+        print(f"Error: h5py is not installed; use a directory store instead of {args.store}.")
+        return 1
+    if args.action == 'show':
+        if not os.path.exists(args.store):
+            print(f"Error: {args.store} not found.")
+            return 1
+        show(args.store)
+        return 0
+
+    if args.action == 'import':
+        found = []
+        band = f"{args.seed}_band.dat"
+        if os.path.exists(band):
+            import_band_dat(args.store, band, f"{args.seed}_band.labelinfo.dat")
+            found.append(band)
+        kubo = f"{args.seed}-kubo_S_xy.dat"
+        if os.path.exists(kubo):
+            import_kubo(args.store, kubo)
+            found.append(kubo)
+        found += import_pdos(args.store, args.seed)
+        if os.path.exists('kpoints_frac.txt'):
+            import_kpoints(args.store, 'kpoints_frac.txt')
+            found.append('kpoints_frac.txt')
+        if not found:
+            print(f"Error: no {args.seed} output files found.")
+            return 1
+        print(f"Imported into {args.store}: {', '.join(found)}")
+        return 0
+
+    if not os.path.exists(args.hr):
+        print(f"Error: {args.hr} not found.")
+        return 1
+    model = load_hr_dat(args.hr)
+    mask = None
+    if args.weights:
+        from fatbands import projection_mask
+        from wannier_tb import parse_win
+        mask = projection_mask(parse_win(args.weights))
+    store_mesh(args.store, model, tuple(args.mesh), mask=mask, berry=args.berry, hr_file=args.hr)
+    show(args.store)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
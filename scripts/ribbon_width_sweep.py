@@ -0,0 +1,209 @@
+import argparse
+import os
+import sys
+import time
+
+import matplotlib.pyplot as plt
+import numpy as np
+from scipy.optimize import minimize_scalar
+from scipy.sparse.linalg import ArpackNoConvergence, eigsh
+
+from fermi import fermi_level
+from wannier_tb import load_hr_dat, ribbon_csr
+
+# Width convergence of the ribbon edge states (plot_ribbon.py uses one WIDTH).
+# In a finite ribbon the edge states of the two edges overlap and hybridise, which
+# opens a splitting at E_F:
+#   Delta(W) = min over kx of [lowest eigenvalue above E_F - highest below E_F]
+# For a topological ribbon Delta(W) ~ exp(-W / xi) once W exceeds the edge decay length
+# xi; the sweep reports Delta for every width, a fit of xi, and the first width from
+# which Delta stays below TOL. All widths run in one pass, reusing work:
+#   - the hoppings are folded once into blocks H_(r1, ry) (R3 summed); H_ry(kx) for any
+#     kx and any width is then a phase sum over r1 (no pass over the hr.dat R-vectors)
+#   - each ribbon is a sparse block-banded matrix (wannier_tb.ribbon_csr); the states
+#     around E_F come from shift-invert Lanczos (eigsh, sigma = E_F), started from the
+#     last eigenvector found: the previous kx of the same width, or for a new width the
+#     previous width's vector with the extra cells inserted (zero) in the middle, which
+#     keeps its edge amplitudes (plus a little noise, and a cold restart if ARPACK stalls)
+#   - only the first width scans kx over [0, 1/2] (E(kx) = E(-kx)); later widths refine
+#     kx_min in a window around the previous width's minimum
+#
+# Usage:
+#   python ribbon_width_sweep.py                         # wte2_hr.dat, widths 10..60 step 5
+#   python ribbon_width_sweep.py model_library/bhz_hr.dat --efermi 0 --widths 4 40 2
+
+# --- CONFIGURATION ---
+FNAME = 'wte2_hr.dat'
+WIDTHS = (10, 60, 5)  # first, last, step (cells along a2)
+TOL = 1e-3            # eV, hybridisation splitting counted as converged
+NK_SCAN = 41          # kx points in [0, 1/2] for the first width
+KX_WINDOW = 0.03      # fractional, refinement window around the previous kx_min
+NEV = 6               # eigenvalues around E_F per ribbon
+WARM_NOISE = 1e-3     # relative random admixture to the warm-start vector
+OUTPUT_FILE = 'Fig_Ribbon_WidthSweep.png'
+
+
+def fold_table(model):
+    """r1 values (nr1,), ry values (nry,) and the blocks H_(r1, ry) (nr1, nry, nw, nw)."""
+    rvecs = model['rvecs']
+    r1_vals, i1 = np.unique(rvecs[:, 0], return_inverse=True)
+    ry_vals, i2 = np.unique(rvecs[:, 1], return_inverse=True)
+    table = np.zeros((len(r1_vals), len(ry_vals)) + model['ham'].shape[1:], dtype=complex)
+    np.add.at(table, (i1.ravel(), i2.ravel()), model['ham'])
+    return r1_vals, ry_vals, table
+
+
+def blocks_at(fold, kx):
+    """H_ry(kx) (nry, nw, nw) from the fold table, as wannier_tb.fold_ribbon_hoppings."""
+    r1_vals, ry_vals, table = fold
+    return ry_vals, np.tensordot(np.exp(2j * np.pi * kx * r1_vals), table, axes=(0, 0))
+
+
+def gap_at(fold, width, kx, e0, v0=None, nev=NEV):
+    """
+    (gap around e0, eigenvector closest to e0) of the ribbon at kx. The warm start v0
+    gets a small random admixture: an exact eigenvector alone spans too little of a
+    near-degenerate (Kramers) cluster and can stall ARPACK, which is then rerun cold.
+    """
+    H = ribbon_csr(*blocks_at(fold, kx), width).tocsc()
+    k = min(nev, H.shape[0] - 2)
+    if v0 is not None:
+        rng = np.random.default_rng(width)
+        noise = rng.standard_normal(len(v0)) + 1j * rng.standard_normal(len(v0))
+        v0 = v0 + WARM_NOISE * noise / np.linalg.norm(noise)
+    try:
+        evals, evecs = eigsh(H, k=k, sigma=e0, v0=v0)
+    except ArpackNoConvergence:
+        if v0 is None:
+            raise
+        evals, evecs = eigsh(H, k=k, sigma=e0)
+    above, below = evals[evals > e0], evals[evals <= e0]
+    gap = above.min() - below.max() if len(above) and len(below) else np.inf
+    return float(gap), evecs[:, np.argmin(np.abs(evals - e0))]
+
+
+def widen(v, nw, old_width, new_width):
+    """Warm start for a wider ribbon: the extra cells are inserted, empty, in the middle."""
+    half = (old_width // 2) * nw
+    v = np.concatenate([v[:half], np.zeros((new_width - old_width) * nw, dtype=v.dtype), v[half:]])
+    return v / np.linalg.norm(v)
+
+
+def width_sweep(model, widths, e0, nk_scan=NK_SCAN, window=KX_WINDOW, nev=NEV):
+    """
+    Splitting at e0 for each width (ascending). Yields, width by width, dicts with 'width',
+    'kx' (fractional kx of the minimum), 'splitting' (eV), 'evals' (eigsh calls), 'time' (s).
+    """
+    fold = fold_table(model)
+    nw = model['num_wann']
+    state = {'v0': None, 'width': None, 'calls': 0}
+
+    def objective(kx, width):
+        gap, v = gap_at(fold, width, kx, e0, state['v0'], nev)
+        state['v0'] = v
+        state['calls'] += 1
+        return gap
+
+    kx_min = None
+    for width in widths:
+        t0 = time.perf_counter()
+        state['calls'] = 0
+        if state['v0'] is not None:
+            state['v0'] = widen(state['v0'], nw, state['width'], width)
+        state['width'] = width
+        if kx_min is None:
+            grid = np.linspace(0.0, 0.5, nk_scan)
+            gaps = [objective(kx, width) for kx in grid]
+            kx_min, step = grid[int(np.argmin(gaps))], grid[1] - grid[0]
+        else:
+            step = window
+        lo, hi = max(kx_min - step, 0.0), min(kx_min + step, 0.5)
+        res = minimize_scalar(objective, bounds=(lo, hi), args=(width,), method='bounded', options={'xatol': 1e-5})
+        # the bounded search never lands exactly on an end, and the minimum is often at
+        # kx = 0 or 1/2; the last evaluation leaves the warm start at kx_min for the next width
+        ends = {kx: objective(kx, width) for kx in (lo, hi)}
+        kx_min = min(ends, key=ends.get) if min(ends.values()) < res.fun else float(res.x)
+        splitting, state['v0'] = gap_at(fold, width, kx_min, e0, state['v0'], nev)
+        yield {'width': width, 'kx': kx_min, 'splitting': splitting, 'evals': state['calls'] + 1,
+               'time': time.perf_counter() - t0}
+
+
+def converged_width(results, tol=TOL):
+    """First width from which the splitting stays below tol, or None."""
+    width = None
+    for r in results:
+        if r['splitting'] < tol:
+            width = width if width is not None else r['width']
+        else:
+            width = None
+    return width
+
+
+def decay_length(results, floor=1e-10):
+    """xi (cells) from a fit of log Delta = c - W / xi over the widths above floor, or None."""
+    w = np.array([r['width'] for r in results if r['splitting'] > floor], dtype=float)
+    d = np.array([r['splitting'] for r in results if r['splitting'] > floor])
+    if len(w) < 3:
+        return None
+    slope = np.polyfit(w, np.log(d), 1)[0]
+    return -1.0 / slope if slope < 0 else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Edge-state splitting at E_F versus ribbon width.")
+    parser.add_argument('hr', nargs='?', default=FNAME)
+    parser.add_argument('--widths', type=int, nargs=3, default=list(WIDTHS), metavar=('FIRST', 'LAST', 'STEP'))
+    parser.add_argument('--tol', type=float, default=TOL, help="converged splitting (eV)")
+    parser.add_argument('--efermi', type=float, default=None, help="eV (default: fermi.fermi_level of the model)")
+    parser.add_argument('--nk-scan', type=int, default=NK_SCAN, help="kx scan of the first width")
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.hr):
+        print(f"Error: {args.hr} not found.")
+        return 1
+    model = load_hr_dat(args.hr)
+    e0 = fermi_level(args.hr) if args.efermi is None else args.efermi
+    widths = list(range(args.widths[0], args.widths[1] + 1, args.widths[2]))
+    if not widths or widths[0] < 1:
+        print("Error: --widths must give at least one positive width.")
+        return 1
+
+    t0 = time.perf_counter()
+    print(f"{args.hr}: {len(widths)} widths, E_F = {e0:.4f} eV")
+    print(f"{'width':>6s}{'kx_min':>10s}{'splitting (meV)':>18s}{'eigsh':>7s}{'time (s)':>10s}")
+    results = []
+    for r in width_sweep(model, widths, e0, args.nk_scan):
+        results.append(r)
+        print(f"{r['width']:6d}{r['kx']:10.5f}{r['splitting'] * 1000:18.6f}{r['evals']:7d}{r['time']:10.2f}")
+    print(f"Total {time.perf_counter() - t0:.1f} s")
+
+    xi = decay_length(results)
+    conv = converged_width(results, args.tol)
+    if xi is not None:
+        print(f"Edge hybridisation decay length: xi = {xi:.2f} cells")
+    if conv is not None:
+        print(f"Splitting below {args.tol * 1000:g} meV from width {conv} on.")
+    else:
+        print(f"Splitting not below {args.tol * 1000:g} meV for all widths up to {widths[-1]}"
+              + (f" (extrapolated: W ~ {xi * np.log(results[-1]['splitting'] / args.tol) + widths[-1]:.0f})"
+                 if xi is not None else "; no exponential decay (no edge states at E_F?)"))
+
+    out = os.path.splitext(args.output)[0] + '.dat'
+    np.savetxt(out, [[r['width'], r['kx'], r['splitting']] for r in results], fmt=['%6d', '%12.6f', '%16.8e'],
+               header='width kx_min splitting(eV)')
+    fig, ax = plt.subplots(figsize=(6, 4))
+    w = [r['width'] for r in results]
+    ax.semilogy(w, [max(r['splitting'], 1e-12) * 1000 for r in results], 'o-', color='#D50032')
+    ax.axhline(args.tol * 1000, color='black', linestyle=':', linewidth=1)
+    ax.set_xlabel("Ribbon width (cells)")
+    ax.set_ylabel(r"Edge splitting at $E_F$ (meV)")
+    ax.grid(True, which='both', alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(args.output, dpi=300)
+    print(f"Saved {out} and {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
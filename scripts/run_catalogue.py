@@ -0,0 +1,402 @@
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from fermi import read_pw_fermi
+
+# Run catalogue: one SQLite table row per pw.x / wannier90.x calculation.
+# ingest() reads an output file (and its input deck) and records the code, calculation
+# kind, status, total energy (Ry), Fermi energy (eV), final spreads (Ang^2), wall / CPU
+# time and the artifact paths; every namelist / .win keyword goes into the indexed
+# `params` table (numeric values also as REAL), so parameter queries are joins on
+# (key, num) instead of greps over input decks:
+#   find_runs(kind='scf', ecutwfc=('>=', 60), kmesh='12x6x1')
+# Each run also stores param_hash, the sha1 of its input with the I/O keywords removed;
+# completed(input) finds an earlier successful run of the same input, which the drivers
+# use to skip duplicate work. series() returns (x, y) arrays for figure scripts.
+#
+# Usage:
+#   python run_catalogue.py ingest convergence_results/*.out wte2.wout
+#   python run_catalogue.py query --kind scf --where "ecutwfc>=60" kmesh=12x6x1
+#   python run_catalogue.py series ecutwfc total_energy --kind scf --where kmesh=12x6x1 --plot conv.png
+
+# --- CONFIGURATION ---
+CATALOGUE = os.environ.get('WTE2_CATALOGUE', 'run_catalogue.sqlite')
+IO_KEYS = {'outdir', 'prefix', 'pseudo_dir', 'wfcdir', 'title', 'verbosity', 'restart_mode',
+           'disk_io', 'iprint'} # left out of param_hash: they do not change the physics
+RESULT_COLUMNS = ['total_energy', 'fermi', 'omega_total', 'omega_i', 'omega_d', 'omega_od',
+                  'wall_s', 'cpu_s']
+OPS = ('>=', '<=', '!=', '=', '>', '<')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    code TEXT, kind TEXT, status TEXT,
+    input TEXT, output TEXT UNIQUE, param_hash TEXT, output_mtime REAL, ingested TEXT,
+    total_energy REAL, fermi REAL,
+    omega_total REAL, omega_i REAL, omega_d REAL, omega_od REAL,
+    wall_s REAL, cpu_s REAL
+);
+CREATE TABLE IF NOT EXISTS params (
+    run_id INTEGER REFERENCES runs(id) ON DELETE CASCADE,
+    key TEXT, num REAL, text TEXT
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    run_id INTEGER REFERENCES runs(id) ON DELETE CASCADE,
+    kind TEXT, path TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_kind ON runs(kind, status);
+CREATE INDEX IF NOT EXISTS runs_hash ON runs(param_hash, status);
+CREATE INDEX IF NOT EXISTS params_num ON params(key, num, run_id);
+CREATE INDEX IF NOT EXISTS params_text ON params(key, text, run_id);
+CREATE INDEX IF NOT EXISTS params_run ON params(run_id);
+CREATE INDEX IF NOT EXISTS artifacts_run ON artifacts(run_id);
+"""
+
+
+def connect(db=CATALOGUE):
+    con = sqlite3.connect(db, timeout=30.0) # concurrent sweep jobs ingest into one file
+    con.row_factory = sqlite3.Row
+    con.execute('PRAGMA foreign_keys = ON')
+    con.executescript(SCHEMA)
+    return con
+
+
+# --- PARSING ---
+
+def _strip_comment(line):
+    return re.split(r'[!#]', line, maxsplit=1)[0].strip()
+
+
+def _value(text):
+    """Fortran / .win literal -> float for numbers and logicals, else None."""
+    t = text.strip().strip("'\"").lower()
+    if t in ('.true.', 'true', 't'):
+        return 1.0
+    if t in ('.false.', 'false', 'f'):
+        return 0.0
+    try:
+        return float(t.replace('d', 'e'))
+    except ValueError:
+        return None
+
+
+def _key_of(line):
+    m = re.match(r'([A-Za-z_][\w()]*)\s*[=:]?', line)
+    return m.group(1).lower() if m else None
+
+
+def param_hash(fname):
+    """sha1 of the input with comments, blank lines, spacing and IO_KEYS removed."""
+    lines = []
+    with open(fname, 'r') as f:
+        for line in f:
+            line = ' '.join(_strip_comment(line).split())
+            if line and _key_of(line) not in IO_KEYS:
+                lines.append(line.lower())
+    return hashlib.sha1('\n'.join(lines).encode()).hexdigest()
+
+
+def parse_pw_input(fname):
+    """Namelist keywords {key: text} of a pw.x input plus 'kmesh' / nk1..nk3 for automatic k-points."""
+    params = {}
+    with open(fname, 'r') as f:
+        lines = [_strip_comment(l) for l in f]
+    for line in lines:
+        # one or more comma-separated assignments per namelist line
+        for key, value in re.findall(r'([A-Za-z_][\w()]*)\s*=\s*([^,]+)', line):
+            params[key.lower()] = value.strip()
+    for i, line in enumerate(lines):
+        if line.upper().startswith('K_POINTS') and 'automatic' in line.lower():
+            nk = lines[i + 1].split()[:3]
+            params.update({'nk1': nk[0], 'nk2': nk[1], 'nk3': nk[2], 'kmesh': 'x'.join(nk)})
+    return params
+
+
+def parse_win_params(fname):
+    """Scalar keywords {key: text} of a .win file (blocks skipped), with mp_grid as kmesh."""
+    params = {}
+    block = False
+    with open(fname, 'r') as f:
+        for line in f:
+            line = _strip_comment(line)
+            low = line.lower()
+            if low.startswith('begin'):
+                block = True
+            elif low.startswith('end'):
+                block = False
+            elif line and not block:
+                parts = re.split(r'\s*[=:]\s*|\s+', line, maxsplit=1)
+                if len(parts) == 2:
+                    params[parts[0].lower()] = parts[1].strip()
+    if 'mp_grid' in params:
+        nk = params['mp_grid'].split()
+        params.update({'nk1': nk[0], 'nk2': nk[1], 'nk3': nk[2], 'kmesh': 'x'.join(nk)})
+    return params
+
+
+def _seconds(text):
+    """'1h 2m', '3m12.50s', '45.10s' -> seconds."""
+    total = 0.0
+    for value, unit in re.findall(r'([\d\.]+)\s*([dhms])', text):
+        total += float(value) * {'d': 86400, 'h': 3600, 'm': 60, 's': 1}[unit]
+    return total
+
+
+def _value_after_equals(line):
+    """Number after '=' as text, or None (e.g. a line cut short by a killed job)."""
+    m = re.search(r'=\s*([-+\d\.Ee]+)', line)
+    return m.group(1) if m else None
+
+
+def parse_pw_output(fname):
+    """Results of a pw.x output: total_energy (last '!'), fermi, wall_s, cpu_s, status and cutoffs."""
+    out = {'total_energy': None, 'fermi': read_pw_fermi(fname), 'wall_s': None, 'cpu_s': None}
+    status = 'failed'
+    params = {}
+    with open(fname, 'r') as f:
+        for line in f:
+            if line.startswith('!') and 'total energy' in line and _value_after_equals(line):
+                out['total_energy'] = float(_value_after_equals(line))
+            elif 'kinetic-energy cutoff' in line and _value_after_equals(line):
+                params['ecutwfc'] = _value_after_equals(line)
+            elif 'charge density cutoff' in line and _value_after_equals(line):
+                params['ecutrho'] = _value_after_equals(line)
+            elif re.match(r'\s*PWSCF\s*:', line):
+                m = re.search(r':(.*)CPU(.*)WALL', line)
+                if m:
+                    out['cpu_s'], out['wall_s'] = _seconds(m.group(1)), _seconds(m.group(2))
+            elif 'convergence NOT achieved' in line:
+                status = 'unconverged'
+            elif 'JOB DONE' in line and status == 'failed':
+                status = 'done'
+    return out, status, params
+
+
+def _pw_artifacts(params, base):
+    outdir = os.path.join(base, params.get('outdir', './').strip("'\""))
+    prefix = params.get('prefix', 'pwscf').strip("'\"")
+    return [('save', os.path.join(outdir, f"{prefix}.save"))]
+
+
+def _wannier_artifacts(seed):
+    return [(ext, f"{seed}{ext}") for ext in ('_hr.dat', '_band.dat', '_centres.xyz', '.chk')]
+
+
+# --- INGEST / QUERY ---
+
+def ingest(output, input=None, tags=None, db=CATALOGUE):
+    """
+    Records one calculation (re-ingesting an output replaces its row). The input deck
+    defaults to the output name with .in (pw.x) or .win (wannier90.x). tags are extra
+    params, e.g. {'study': 'ecut convergence'}. Returns the run id.
+    """
+    output = os.path.abspath(output)
+    seed, ext = os.path.splitext(output)
+    if ext == '.wout':
+        from wannier_tb import parse_wout
+        code = 'wannier90.x'
+        input = input or f"{seed}.win"
+        w = parse_wout(output)
+        res = {k: w[k] for k in ('omega_total', 'omega_i', 'omega_d', 'omega_od')}
+        res['wall_s'] = w['total_time']
+        status = 'done' if w['total_time'] is not None else 'failed'
+        params = parse_win_params(input) if os.path.exists(input) else {}
+        kind = 'wannier'
+        artifacts = _wannier_artifacts(seed)
+    else:
+        code = 'pw.x'
+        input = input or f"{seed}.in"
+        res, status, params = parse_pw_output(output)
+        if os.path.exists(input):
+            params.update(parse_pw_input(input))
+        kind = params.get('calculation', "'scf'").strip("'\"").lower()
+        artifacts = _pw_artifacts(params, os.path.dirname(os.path.abspath(input)))
+    params.update({k: str(v) for k, v in (tags or {}).items()})
+    artifacts = [('input', os.path.abspath(input)), ('output', output)] + artifacts
+
+    with connect(db) as con:
+        con.execute('DELETE FROM runs WHERE output = ?', (output,))
+        cur = con.execute(
+            'INSERT INTO runs (code, kind, status, input, output, param_hash, output_mtime, ingested, '
+            + ', '.join(RESULT_COLUMNS) + ') VALUES (' + ', '.join('?' * (8 + len(RESULT_COLUMNS))) + ')',
+            [code, kind, status, os.path.abspath(input), output,
+             param_hash(input) if os.path.exists(input) else None, os.path.getmtime(output),
+             time.strftime('%Y-%m-%d %H:%M:%S')] + [res.get(c) for c in RESULT_COLUMNS])
+        run_id = cur.lastrowid
+        con.executemany('INSERT INTO params (run_id, key, num, text) VALUES (?, ?, ?, ?)',
+                        [(run_id, k, _value(v), v.strip("'\"")) for k, v in params.items()])
+        con.executemany('INSERT INTO artifacts (run_id, kind, path) VALUES (?, ?, ?)',
+                        [(run_id, k, os.path.abspath(p)) for k, p in artifacts if os.path.exists(p)])
+    return run_id
+
+
+def _condition(key, cond):
+    """SQL for one params condition: value, (op, value) or a list of values."""
+    if isinstance(cond, (list, tuple)) and len(cond) == 2 and cond[0] in OPS:
+        op, value = cond
+    elif isinstance(cond, (list, set)):
+        values = list(cond)
+        col = 'text' if any(isinstance(v, str) for v in values) else 'num'
+        marks = ', '.join('?' * len(values))
+        return (f"EXISTS (SELECT 1 FROM params p WHERE p.run_id = runs.id AND p.key = ? "
+                f"AND p.{col} IN ({marks}))", [key] + [str(v) if col == 'text' else float(v) for v in values])
+    else:
+        op, value = '=', cond
+    col = 'text' if isinstance(value, str) else 'num'
+    value = value if col == 'text' else float(value)
+    return (f"EXISTS (SELECT 1 FROM params p WHERE p.run_id = runs.id AND p.key = ? AND p.{col} {op} ?)",
+            [key, value])
+
+
+def find_runs(kind=None, status='done', db=CATALOGUE, ids=None, **conditions):
+    """
+    Runs matching every condition on their parameters, newest first, as dicts with the
+    runs columns plus 'params' {key: text}. A condition is a value (equality), an
+    (op, value) pair with op in OPS, or a list of accepted values. ids restricts the
+    search to those run ids (e.g. the runs of one study, as returned by ingest).
+    """
+    where, args = [], []
+    if ids is not None:
+        ids = [int(i) for i in ids]
+        where.append(f"id IN ({', '.join('?' * len(ids))})" if ids else '0')
+        args += ids
+    if kind is not None:
+        where.append('kind = ?')
+        args.append(kind)
+    if status is not None:
+        where.append('status = ?')
+        args.append(status)
+    for key, cond in conditions.items():
+        sql, a = _condition(key.lower(), cond)
+        where.append(sql)
+        args += a
+    query = 'SELECT * FROM runs' + (' WHERE ' + ' AND '.join(where) if where else '') + ' ORDER BY id DESC'
+    with connect(db) as con:
+        rows = [dict(r) for r in con.execute(query, args)]
+        for r in rows:
+            r['params'] = {p['key']: p['text'] for p in con.execute(
+                'SELECT key, text FROM params WHERE run_id = ?', (r['id'],))}
+    return rows
+
+
+def completed(input, db=CATALOGUE):
+    """Latest successful run of an input with the same param_hash, or None."""
+    if not os.path.exists(db) or not os.path.exists(input):
+        return None
+    with connect(db) as con:
+        row = con.execute("SELECT * FROM runs WHERE param_hash = ? AND status = 'done' ORDER BY id DESC LIMIT 1",
+                          (param_hash(input),)).fetchone()
+    return dict(row) if row is not None else None
+
+
+def _field(run, name):
+    if name in run:
+        return run[name]
+    return _value(run['params'].get(name, '')) if name in run['params'] else None
+
+
+def series(x, y, kind=None, db=CATALOGUE, ids=None, **conditions):
+    """
+    (x, y) arrays over the matching runs, sorted by x; x and y are runs columns
+    (total_energy, wall_s, ...) or numeric parameters (ecutwfc, nk1, ...). For repeated
+    x the latest run is used. ids: see find_runs.
+    """
+    points = {}
+    for run in reversed(find_runs(kind, db=db, ids=ids, **conditions)): # oldest first, newer overwrite
+        vx, vy = _field(run, x), _field(run, y)
+        if vx is not None and vy is not None:
+            points[vx] = vy
+    xs = sorted(points)
+    return np.array(xs), np.array([points[v] for v in xs])
+
+
+def _parse_where(items):
+    conditions = {}
+    for item in items or []:
+        m = re.match(r'\s*(\w+)\s*(>=|<=|!=|=|>|<)\s*(.+)', item)
+        if not m:
+            raise ValueError(f"Cannot parse condition '{item}' (expected key<op>value)")
+        key, op, value = m.groups()
+        num = _value(value)
+        conditions[key] = (op, num if num is not None else value.strip())
+    return conditions
+
+
+def print_runs(runs):
+    print(f"{'id':>4s} {'code':<12s}{'kind':<9s}{'status':<12s}{'ecutwfc':>8s}{'kmesh':>9s}"
+          f"{'E_tot (Ry)':>17s}{'E_F (eV)':>10s}{'Omega':>10s}{'wall (s)':>10s}  output")
+    fmt = lambda v, w, p: f"{v:{w}.{p}f}" if v is not None else f"{'-':>{w}s}"
+    for r in runs:
+        print(f"{r['id']:4d} {r['code']:<12s}{r['kind']:<9s}{r['status']:<12s}"
+              f"{r['params'].get('ecutwfc', '-'):>8s}{r['params'].get('kmesh', '-'):>9s}"
+              f"{fmt(r['total_energy'], 17, 8)}{fmt(r['fermi'], 10, 4)}{fmt(r['omega_total'], 10, 3)}"
+              f"{fmt(r['wall_s'], 10, 1)}  {os.path.relpath(r['output'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite catalogue of pw.x / wannier90.x runs.")
+    parser.add_argument('--db', default=CATALOGUE)
+    sub = parser.add_subparsers(dest='action', required=True)
+    p = sub.add_parser('ingest', help="record output files (.out for pw.x, .wout)")
+    p.add_argument('outputs', nargs='+')
+    p.add_argument('--input', default=None, help="input deck (single output only)")
+    p.add_argument('--tag', nargs='+', default=[], help="extra key=value params, e.g. study=ecut")
+    p = sub.add_parser('query', help="list runs")
+    p.add_argument('--kind', default=None)
+    p.add_argument('--all', action='store_true', help="include failed / unconverged runs")
+    p.add_argument('--where', nargs='+', default=None, help='conditions, e.g. "ecutwfc>=60" kmesh=12x6x1')
+    p = sub.add_parser('series', help="print an (x, y) series")
+    p.add_argument('x')
+    p.add_argument('y')
+    p.add_argument('--kind', default=None)
+    p.add_argument('--where', nargs='+', default=None)
+    p.add_argument('--plot', default=None, metavar='FILE', help="also draw the series to FILE")
+    args = parser.parse_args()
+
+    if args.action == 'ingest':
+        tags = dict(t.split('=', 1) for t in args.tag)
+        for out in args.outputs:
+            if not os.path.exists(out):
+                print(f"Error: {out} not found.")
+                return 1
+            run_id = ingest(out, args.input if len(args.outputs) == 1 else None, tags, args.db)
+            print(f"  {out} -> run {run_id}")
+        return 0
+
+    if not os.path.exists(args.db):
+        print(f"Error: {args.db} not found.")
+        return 1
+    try:
+        conditions = _parse_where(args.where)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    if args.action == 'query':
+        print_runs(find_runs(args.kind, None if args.all else 'done', args.db, **conditions))
+    else:
+        xs, ys = series(args.x, args.y, args.kind, args.db, **conditions)
+        print(f"{args.x:>12s} {args.y:>18s}")
+        for vx, vy in zip(xs, ys):
+            print(f"{vx:12g} {vy:18.8f}")
+        if args.plot and len(xs):
+            import matplotlib.pyplot as plt
+            plt.figure(figsize=(6, 4))
+            plt.plot(xs, ys, 'o-', color='#D50032')
+            plt.xlabel(args.x)
+            plt.ylabel(args.y)
+            plt.grid(True, alpha=0.3)
+            plt.tight_layout()
+            plt.savefig(args.plot, dpi=300)
+            print(f"Plot saved to {args.plot}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
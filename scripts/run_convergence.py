@@ -3,6 +3,10 @@ import os
 import subprocess
 import re
 
+from profiling import phase
+from run_catalogue import completed, ingest, series
+from run_ledger import run_stage
+
 # --- CONFIGURATION ---
 PSEUDO_DIR = "./"  # Where your UPF files are
 OUT_DIR = "convergence_results"
@@ -37,28 +41,41 @@ def get_energy(outfile):
 def main():
     if not os.path.exists(OUT_DIR): os.makedirs(OUT_DIR)
     
-    energies = []
+    run_ids = [] # catalogue ids of this study's runs, one per cutoff
     print("Starting Convergence Study...")
     
     for cut in CUTOFFS:
-        inp = update_input(cut)
+        with phase('write input', cutoff=cut):
+            inp = update_input(cut)
         out = inp.replace(".in", ".out")
         
-        print(f"Running Cutoff {cut} Ry...")
-        # Run PW.x with MPI (4 cores) and disable HCOLL to prevent errors
-        os.system(f"export OMPI_MCA_coll_hcoll_enable=0; mpirun -np 4 pw.x < {inp} > {OUT_DIR}/{out}")
-        
-        E = get_energy(f"{OUT_DIR}/{out}")
+        # Same input already run (run catalogue): reuse its energy
+        prev = completed(inp)
+        if prev is not None:
+            print(f"Cutoff {cut} Ry: already in the catalogue ({os.path.relpath(prev['output'])})")
+            E = prev['total_energy']
+            run_ids.append(prev['id'])
+        else:
+            print(f"Running Cutoff {cut} Ry...")
+            # Run PW.x with MPI (4 cores) and disable HCOLL to prevent errors
+            with phase('pw.x', cutoff=cut):
+                run_stage(f"export OMPI_MCA_coll_hcoll_enable=0; mpirun -np 4 pw.x < {inp} > {OUT_DIR}/{out}",
+                          label=f"ecutwfc={cut}", meta={'study': 'ecut convergence', 'ecutwfc': cut})
+
+            with phase('parse', cutoff=cut):
+                E = get_energy(f"{OUT_DIR}/{out}")
+                if os.path.exists(f"{OUT_DIR}/{out}"):
+                    run_ids.append(ingest(f"{OUT_DIR}/{out}", inp, tags={'study': 'ecut convergence'}))
         if E:
-            energies.append(E)
             print(f"  -> Energy: {E} Ry")
         else:
             print("  -> Failed")
-            energies.append(None)
 
     # Plot
-    valid_cuts = [c for c, e in zip(CUTOFFS, energies) if e is not None]
-    valid_enes = [e for c, e in zip(CUTOFFS, energies) if e is not None]
+    # Series straight from the run catalogue, restricted to the runs of this study (a
+    # failed pw.x run is catalogued with status 'failed' and drops out)
+    valid_cuts, valid_enes = series('ecutwfc', 'total_energy', kind='scf', ids=run_ids)
+    valid_cuts, valid_enes = list(valid_cuts), list(valid_enes)
     
     # Delta E relative to most converged
     if not valid_enes:
@@ -76,15 +93,17 @@ def main():
 
     try:
         import matplotlib.pyplot as plt
-        plt.figure(figsize=(6,4))
-        plt.plot(valid_cuts, delta_E, 'o-', color='#D50032')
-        plt.xlabel("Plane Wave Cutoff (Ry)")
-        plt.ylabel("Energy Difference (eV)")
-        plt.title("Wavefunction Convergence Test")
-        plt.grid(True, alpha=0.3)
-        plt.axhline(0, color='black', lw=1)
-        plt.tight_layout()
-        plt.savefig("Fig_Convergence_Cutoff.png", dpi=300)
+        with phase('render'):
+            plt.figure(figsize=(6,4))
+            plt.plot(valid_cuts, delta_E, 'o-', color='#D50032')
+            plt.xlabel("Plane Wave Cutoff (Ry)")
+            plt.ylabel("Energy Difference (eV)")
+            plt.title("Wavefunction Convergence Test")
+            plt.grid(True, alpha=0.3)
+            plt.axhline(0, color='black', lw=1)
+            plt.tight_layout()
+        with phase('save'):
+            plt.savefig("Fig_Convergence_Cutoff.png", dpi=300)
         print("Plot saved to Fig_Convergence_Cutoff.png")
     except ImportError:
         print("Matplotlib not found. Skipping plot generation.")
@@ -3,6 +3,10 @@ import subprocess
 import re
 import time
 
+from profiling import phase
+from run_catalogue import completed, ingest, series
+from run_ledger import run_stage
+
 # --- CONFIGURATION ---
 # Smart Configuration:
 # 1. Skip unstable low cutoffs (30, 40 Ry)
@@ -39,39 +43,47 @@ def get_energy(outfile):
 def main():
     if not os.path.exists(OUT_DIR): os.makedirs(OUT_DIR)
     
-    energies = []
+    run_ids = [] # catalogue ids of this study's runs, one per cutoff
     print("Starting SMART Convergence Study (Stable Regime)...")
     
     for cut in CUTOFFS:
-        inp = update_input(cut)
+        with phase('write input', cutoff=cut):
+            inp = update_input(cut)
         out = inp.replace(".in", ".out")
         
-        print(f"Running Cutoff {cut} Ry (Priority High)...")
-        # Run PW.x with MPI (4 cores)
-        # Using nohup logic handled by caller, but internal execution is standard
-        cmd = f"export OMPI_MCA_coll_hcoll_enable=0; mpirun -np 4 pw.x < {inp} > {OUT_DIR}/{out}"
-        
-        start_time = time.time()
-        os.system(cmd)
-        duration = time.time() - start_time
-        
-        E = get_energy(f"{OUT_DIR}/{out}")
+        # Same input already run (run catalogue): reuse its energy and timing
+        prev = completed(inp)
+        if prev is not None:
+            print(f"Cutoff {cut} Ry: already in the catalogue ({os.path.relpath(prev['output'])})")
+            E, duration = prev['total_energy'], prev['wall_s'] or 0.0
+            run_ids.append(prev['id'])
+        else:
+            print(f"Running Cutoff {cut} Ry (Priority High)...")
+            # Run PW.x with MPI (4 cores)
+            # Using nohup logic handled by caller, but internal execution is standard
+            cmd = f"export OMPI_MCA_coll_hcoll_enable=0; mpirun -np 4 pw.x < {inp} > {OUT_DIR}/{out}"
+
+            start_time = time.time()
+            with phase('pw.x', cutoff=cut):
+                run_stage(cmd, label=f"ecutwfc={cut}", meta={'study': 'ecut convergence', 'ecutwfc': cut})
+            duration = time.time() - start_time
+
+            with phase('parse', cutoff=cut):
+                E = get_energy(f"{OUT_DIR}/{out}")
+                if os.path.exists(f"{OUT_DIR}/{out}"):
+                    run_ids.append(ingest(f"{OUT_DIR}/{out}", inp, tags={'study': 'ecut convergence (smart)'}))
         if E:
-            energies.append(E)
             print(f"  -> Finished in {duration:.1f}s. Energy: {E} Ry")
         else:
             print("  -> Failed")
-            energies.append(None)
 
     # Save Data
-    valid_cuts = [c for c, e in zip(CUTOFFS, energies) if e is not None]
-    valid_enes = [e for c, e in zip(CUTOFFS, energies) if e is not None]
+    # Series straight from the run catalogue, restricted to the runs of this study (a
+    # failed pw.x run is catalogued with status 'failed' and drops out)
+    valid_cuts, valid_enes = series('ecutwfc', 'total_energy', kind='scf', ids=run_ids)
+    valid_cuts, valid_enes = list(valid_cuts), list(valid_enes)
     
     if valid_enes:
-        # Sort for plotting (since we ran out of order)
-        sorted_data = sorted(zip(valid_cuts, valid_enes))
-        valid_cuts, valid_enes = zip(*sorted_data)
-        
         # Delta Relative to 80 Ry (or max available)
         ref_E = valid_enes[-1]
         delta_E = [(e - ref_E)*13.605 for e in valid_enes] # eV
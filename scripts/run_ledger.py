@@ -0,0 +1,233 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Run ledger: measured wall time, CPU time and peak memory of every workflow stage.
+# External codes (pw.x, pw2wannier90.x, wannier90.x, postw90.x) go through run_stage(),
+# which samples the RSS of the whole process tree from /proc (mpirun + ranks) and takes
+# the CPU time from the rusage returned by wait4(). Python stages use `with stage(...)`
+# (fermi.py, dos.py, band_gap.py, fatbands.py and plot_ribbon.py record themselves).
+# Every stage appends one JSON line to LEDGER_FILE; plot_feasibility*.py read it.
+#
+# Usage (wrapping a command by hand):
+#   python run_ledger.py --label "scf 12x6" -- mpirun -np 4 pw.x -in wte2.scf.in
+#   python run_ledger.py --show
+
+# --- CONFIGURATION ---
+LEDGER_FILE = os.environ.get('WTE2_LEDGER', 'run_ledger.jsonl')
+PLATFORM = os.environ.get('WTE2_PLATFORM', platform.node()) # Label used to group runs in the charts
+SAMPLE_INTERVAL = 0.5 # s
+PYTHON_STAGES = ['fermi.py', 'dos.py', 'band_gap.py', 'fatbands.py', 'plot_ribbon.py']
+WORKFLOW_STAGES = ['pw.x', 'pw2wannier90.x', 'wannier90.x', 'postw90.x'] + PYTHON_STAGES
+
+_PAGE = os.sysconf('SC_PAGE_SIZE')
+
+
+def _tree_rss(root):
+    """Summed RSS (bytes) of root and all its descendants, from /proc."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # The command name may contain spaces; fields resume after the last ')'
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total = 0
+    todo = [root]
+    while todo:
+        pid = todo.pop()
+        try:
+            with open(f'/proc/{pid}/statm', 'r') as f:
+                total += int(f.read().split()[1]) * _PAGE
+        except OSError:
+            pass
+        todo.extend(children.get(pid, []))
+    return total
+
+
+def _track_peak(pid, interval=SAMPLE_INTERVAL):
+    """
+    Samples _tree_rss(pid) in a background thread. Returns a function that stops the
+    sampling and returns the peak (bytes).
+    """
+    state = {'peak': 0}
+    done = threading.Event()
+
+    def loop():
+        while True:
+            state['peak'] = max(state['peak'], _tree_rss(pid))
+            if done.wait(interval):
+                return
+
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+
+    def finish():
+        done.set()
+        thread.join()
+        return max(state['peak'], _tree_rss(pid)) # pid may be gone (0) or still live (Python stages)
+    return finish
+
+
+def _stage_name(cmd):
+    """Executable name of a shell command (first token ending in .x), else the first word."""
+    tokens = cmd.split() if isinstance(cmd, str) else list(cmd)
+    for tok in tokens:
+        name = os.path.basename(tok)
+        if name.endswith('.x'):
+            return name
+    return os.path.basename(tokens[0]) if tokens else 'unknown'
+
+
+def append_record(record, ledger=LEDGER_FILE):
+    with open(ledger, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def _record(stage_name, label, wall, cpu, peak, returncode, meta):
+    return {'stage': stage_name, 'label': label, 'platform': PLATFORM, 'host': platform.node(),
+            'start': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time() - wall)),
+            'wall_s': wall, 'cpu_s': cpu, 'peak_rss_gb': peak / 2**30,
+            'returncode': returncode, 'meta': meta or {}}
+
+
+def run_stage(cmd, stage=None, label=None, stdin=None, stdout=None, meta=None, ledger=LEDGER_FILE,
+              cwd=None, env=None):
+    """
+    Runs an external command (shell string or argv list), records its resources in
+    the ledger and returns the record. stdin / stdout are optional file names (relative
+    to the caller, not to cwd); env entries are added to the inherited environment.
+    """
+    stage = stage or _stage_name(cmd)
+    fin = open(stdin, 'r') if stdin else None
+    fout = open(stdout, 'w') if stdout else None
+    t0 = time.perf_counter()
+    try:
+        proc = subprocess.Popen(cmd, shell=isinstance(cmd, str), stdin=fin, stdout=fout, cwd=cwd,
+                                env=dict(os.environ, **env) if env else None)
+        finish = _track_peak(proc.pid)
+        # wait4 gives the usage of this child (and the descendants it reaped) alone, so
+        # stages launched concurrently from threads do not see each other's CPU time
+        _, status, ru = os.wait4(proc.pid, 0)
+        returncode = proc.returncode = os.waitstatus_to_exitcode(status)
+        sampled = finish()
+    finally:
+        for f in (fin, fout):
+            if f:
+                f.close()
+    wall = time.perf_counter() - t0
+    cpu = ru.ru_utime + ru.ru_stime
+    peak = max(sampled, ru.ru_maxrss * 1024)
+
+    rec = _record(stage, label, wall, cpu, peak, returncode, meta)
+    append_record(rec, ledger)
+    return rec
+
+
+@contextmanager
+def stage(name, label=None, meta=None, ledger=LEDGER_FILE):
+    """
+    Records a Python stage (wall, own CPU time, peak RSS of this process) in the ledger.
+    The return code is that of a sys.exit() inside the block, or 1 on an exception.
+    """
+    finish = _track_peak(os.getpid(), interval=min(SAMPLE_INTERVAL, 0.05))
+    cpu0 = time.process_time()
+    t0 = time.perf_counter()
+    returncode = 0
+    try:
+        yield
+    except SystemExit as e:
+        returncode = e.code if isinstance(e.code, int) else int(e.code is not None)
+        raise
+    except BaseException:
+        returncode = 1
+        raise
+    finally:
+        wall = time.perf_counter() - t0
+        cpu = time.process_time() - cpu0
+        append_record(_record(name, label, wall, cpu, finish(), returncode, meta), ledger)
+
+
+def read_ledger(ledger=LEDGER_FILE):
+    """All ledger records (list of dicts); empty if the ledger does not exist."""
+    if not os.path.exists(ledger):
+        return []
+    with open(ledger, 'r') as f:
+        return [json.loads(l) for l in f if l.strip()]
+
+
+def successful(records, stages=None):
+    return [r for r in records if r['returncode'] == 0 and (stages is None or r['stage'] in stages)]
+
+
+def workflow_time_by_platform(records, stages=WORKFLOW_STAGES):
+    """
+    Time to solution per platform (minutes): the latest successful run of every
+    (stage, label) pair, summed. Side studies (records with meta['study'], e.g. the
+    cutoff convergence scans) are not part of the workflow and are skipped.
+    Returns {platform: minutes}.
+    """
+    latest = {}
+    for r in successful(records, stages):
+        if r['meta'].get('study'):
+            continue
+        latest[(r['platform'], r['stage'], r['label'])] = r
+    totals = {}
+    for (plat, _, _), r in latest.items():
+        totals[plat] = totals.get(plat, 0.0) + r['wall_s'] / 60.0
+    return totals
+
+
+def peak_memory(records, stages=WORKFLOW_STAGES):
+    """
+    The record with the largest peak RSS among successful workflow stages, or None.
+    Side studies (meta['study']) are skipped, as in workflow_time_by_platform.
+    """
+    recs = [r for r in successful(records, stages) if not r['meta'].get('study')]
+    return max(recs, key=lambda r: r['peak_rss_gb']) if recs else None
+
+
+def print_ledger(records):
+    print(f"{'start':<20s}{'platform':<16s}{'stage':<16s}{'label':<20s}{'wall (min)':>11s}"
+          f"{'cpu (min)':>11s}{'peak (GB)':>11s}{'rc':>4s}")
+    for r in records:
+        print(f"{r['start']:<20s}{r['platform'][:15]:<16s}{r['stage']:<16s}{str(r['label'])[:19]:<20s}"
+              f"{r['wall_s'] / 60:11.2f}{r['cpu_s'] / 60:11.2f}{r['peak_rss_gb']:11.3f}{r['returncode']:4d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a command and record its resources in the run ledger.")
+    parser.add_argument('--stage', default=None, help="stage name (default: the *.x executable)")
+    parser.add_argument('--label', default=None)
+    parser.add_argument('--stdin', default=None)
+    parser.add_argument('--stdout', default=None)
+    parser.add_argument('--ledger', default=LEDGER_FILE)
+    parser.add_argument('--show', action='store_true', help="print the ledger and exit")
+    parser.add_argument('cmd', nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    if args.show:
+        print_ledger(read_ledger(args.ledger))
+        return 0
+    cmd = args.cmd[1:] if args.cmd[:1] == ['--'] else args.cmd
+    if not cmd:
+        parser.error("no command given")
+    rec = run_stage(cmd, args.stage, args.label, args.stdin, args.stdout, ledger=args.ledger)
+    print(f"{rec['stage']}: {rec['wall_s']:.1f} s wall, {rec['cpu_s']:.1f} s CPU, "
+          f"peak {rec['peak_rss_gb']:.3f} GB, rc={rec['returncode']}")
+    return rec['returncode']
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+import argparse
+import itertools
+import os
+import sys
+
+import numpy as np
+
+from overlap_store import load_amn, read_eig
+from wannier_tb import parse_win, wannier_orbitals
+
+# Pre-screening of disentanglement windows from the .amn / .eig files alone.
+# For an outer window the initial guess of wannier90 is the projection A_mn(k) restricted
+# to the bands inside it; its singular values tell how well the num_wann trial orbitals
+# are spanned there (a near-zero value means an orbital has no weight in the window and
+# the minimisation starts from a rank-deficient subspace). For every setting on a grid of
+# (dis_win_min, dis_win_max, dis_froz_min, dis_froz_max) and every k-point this computes
+#   sigma(k)  : singular values of A restricted to the outer window, via the eigenvalues
+#               of A^H P_win A (one batched eigvalsh over windows x k)
+#   n_win(k)  : bands in the outer window (must be >= num_wann)
+#   n_froz(k) : frozen bands (must be <= num_wann)
+#   w_froz    : smallest projection weight sum_n |A_mn|^2 of a frozen band (frozen states
+#               the trial orbitals miss cannot be reproduced by the Wannier functions)
+# and ranks the settings: feasible first, then by min sigma, then by mean n_froz.
+#
+# Usage:
+#   python screen_windows.py                                   # grid around the .win values
+#   python screen_windows.py --froz-max 0 1 2 3 --win-max 20 30 40 --top 15
+
+# --- CONFIGURATION ---
+SEEDNAME = 'wte2'
+WIN_OFFSETS = [-10.0, -5.0, 0.0, 5.0, 10.0] # eV around the .win values when no grid is given
+FROZ_OFFSETS = [-2.0, -1.0, 0.0, 1.0, 2.0]
+CHUNK = 16 # window settings per batched eigvalsh
+TOP = 10
+
+
+def window_grid(win_min, win_max, froz_min, froz_max):
+    """All combinations with win_min < froz_min < froz_max < win_max, as an (n, 4) array."""
+    grid = [c for c in itertools.product(win_min, win_max, froz_min, froz_max)
+            if c[0] < c[2] < c[3] < c[1]]
+    return np.array(grid, dtype=float).reshape(-1, 4)
+
+
+def screen(A, eig, grid, chunk=CHUNK):
+    """
+    Screens every window setting of grid (n, 4) against projections A (nk, nb, nw) and
+    energies eig (nk, nb). Returns a dict of (n,) arrays: 'sigma_min', 'sigma_k_median'
+    (median over k of the per-k minimum), 'n_win_min', 'n_froz_max', 'n_froz_mean',
+    'froz_weight_min', and (n, nw) 'orbital_weight_min' (smallest window weight of each
+    trial orbital over k).
+    """
+    A = np.asarray(A)
+    nk, nb, nw = A.shape
+    lo, hi, flo, fhi = (grid[:, i, None, None] for i in range(4))
+    in_win = (eig >= lo) & (eig <= hi)        # (n, nk, nb)
+    in_froz = (eig >= flo) & (eig <= fhi) & in_win
+    band_weight = (np.abs(A)**2).sum(axis=2)  # (nk, nb): weight of each band on the trial orbitals
+    out = {'n_win_min': in_win.sum(axis=2).min(axis=1),
+           'n_froz_max': in_froz.sum(axis=2).max(axis=1),
+           'n_froz_mean': in_froz.sum(axis=2).mean(axis=1),
+           'froz_weight_min': np.where(in_froz, band_weight, np.inf).min(axis=(1, 2))}
+
+    # The projection spectrum depends on the outer window only: one batch per distinct pair
+    outer, which = np.unique(grid[:, :2], axis=0, return_inverse=True)
+    sigma_min, sigma_med = np.empty(len(outer)), np.empty(len(outer))
+    orb_min = np.empty((len(outer), nw))
+    AH = A.conj().transpose(0, 2, 1)
+    orb_weight = np.abs(A)**2                 # (nk, nb, nw)
+    for start in range(0, len(outer), chunk):
+        lo, hi = (outer[start:start + chunk, i, None, None, None] for i in range(2))
+        mask = (eig[:, None, :] >= lo) & (eig[:, None, :] <= hi) # (chunk, nk, 1, nb)
+        # A^H P A per (window, k): nw x nw Hermitian instead of an SVD of the n_win x nw block
+        gram = (AH * mask) @ A
+        sigma = np.sqrt(np.clip(np.linalg.eigvalsh(gram)[..., 0], 0.0, None)) # (chunk, nk)
+        sigma_min[start:start + chunk] = sigma.min(axis=1)
+        sigma_med[start:start + chunk] = np.median(sigma, axis=1)
+        orb_min[start:start + chunk] = (mask @ orb_weight)[:, :, 0].min(axis=1)
+    out.update({'sigma_min': sigma_min[which], 'sigma_k_median': sigma_med[which],
+                'orbital_weight_min': orb_min[which]})
+    return out
+
+
+def rank(grid, res, num_wann):
+    """Indices of grid ordered best first; also returns the feasibility mask."""
+    feasible = (res['n_win_min'] >= num_wann) & (res['n_froz_max'] <= num_wann)
+    # lexsort: last key is primary
+    order = np.lexsort((-res['n_froz_mean'], -res['sigma_min'], ~feasible))
+    return order, feasible
+
+
+def _grid_axis(values, default, offsets):
+    if values:
+        return values
+    return [default + d for d in offsets]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank disentanglement windows from .amn/.eig before running wannier90.x.")
+    parser.add_argument('seed', nargs='?', default=SEEDNAME)
+    parser.add_argument('--win-min', type=float, nargs='+', default=None)
+    parser.add_argument('--win-max', type=float, nargs='+', default=None)
+    parser.add_argument('--froz-min', type=float, nargs='+', default=None)
+    parser.add_argument('--froz-max', type=float, nargs='+', default=None)
+    parser.add_argument('--top', type=int, default=TOP)
+    args = parser.parse_args()
+
+    for ext in ('win', 'amn', 'eig'):
+        if not os.path.exists(f"{args.seed}.{ext}"):
+            print(f"Error: {args.seed}.{ext} not found.")
+            return 1
+
+    win = parse_win(f"{args.seed}.win")
+    A = load_amn(f"{args.seed}.amn")
+    eig = read_eig(f"{args.seed}.eig")
+    nk, nb, nw = A.shape
+    if eig.shape != (nk, nb):
+        print(f"Error: {args.seed}.eig has shape {eig.shape}, {args.seed}.amn has (nk, nb) = {(nk, nb)}")
+        return 1
+
+    grid = window_grid(_grid_axis(args.win_min, win.get('dis_win_min', eig.min()), WIN_OFFSETS),
+                       _grid_axis(args.win_max, win.get('dis_win_max', eig.max()), WIN_OFFSETS),
+                       _grid_axis(args.froz_min, win.get('dis_froz_min', eig.min()), FROZ_OFFSETS),
+                       _grid_axis(args.froz_max, win.get('dis_froz_max', eig.max()), FROZ_OFFSETS))
+    if not len(grid):
+        print("Error: no window setting with win_min < froz_min < froz_max < win_max.")
+        return 1
+
+    res = screen(A, eig, grid)
+    order, feasible = rank(grid, res, nw)
+    print(f"{len(grid)} window settings, {nk} k-points, {nb} bands, {nw} trial orbitals "
+          f"({feasible.sum()} feasible)")
+    print(f"{'win_min':>8s}{'win_max':>8s}{'froz_min':>9s}{'froz_max':>9s}{'sigma_min':>11s}{'sigma_med':>11s}"
+          f"{'n_win>=':>8s}{'n_froz<=':>9s}{'<n_froz>':>9s}{'w_froz':>8s}  ok")
+    for i in order[:args.top]:
+        lo, hi, flo, fhi = grid[i]
+        wf = res['froz_weight_min'][i]
+        print(f"{lo:8.2f}{hi:8.2f}{flo:9.2f}{fhi:9.2f}{res['sigma_min'][i]:11.4f}{res['sigma_k_median'][i]:11.4f}"
+              f"{res['n_win_min'][i]:8d}{res['n_froz_max'][i]:9d}{res['n_froz_mean'][i]:9.1f}"
+              f"{wf if np.isfinite(wf) else 0.0:8.3f}  {'yes' if feasible[i] else 'no'}")
+
+    # Which projection line is weakest for the best setting
+    best = order[0]
+    orb = wannier_orbitals(win)
+    print("Smallest window weight per projection line (best setting):")
+    for group, line in enumerate(win['projections']):
+        sel = orb['group'] == group
+        print(f"  {line:<12s} {res['orbital_weight_min'][best][sel].min():.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import numpy as np
+import os
+from scipy.spatial import cKDTree
+
+# Shared crystal-structure helpers for the 3D structure plotters.
+# Atoms are kept as parallel NumPy arrays (species (n,), positions (n, 3) in Angstrom)
+# instead of a list of dicts, so supercells of thousands of atoms stay cheap.
+
+BOHR_TO_ANG = 0.529177
+
+# Bond styles keyed by the sorted species pair. Pairs not listed are not drawn (e.g. Te-Te).
+DEFAULT_BOND_STYLES = {
+    ('W', 'W'): {'color': '#2c3e50', 'linewidth': 3, 'alpha': 0.6},  # Dark Blue bond (zigzag chain)
+    ('Te', 'W'): {'color': 'gray', 'linewidth': 2, 'alpha': 0.6},
+}
+
+
+def parse_qe_input(filename):
+    """
+    Reads CELL_PARAMETERS and ATOMIC_POSITIONS from a pw.x input.
+    Returns cell (3, 3), species (n,), positions (n, 3) in Angstrom,
+    or (None, None, None) if the file cannot be found.
+    """
+    if not os.path.exists(filename):
+        # Fallback paths
+        if os.path.exists(f"../{filename}"): filename = f"../{filename}"
+        elif os.path.exists(f"repo/{filename}"): filename = f"repo/{filename}"
+        else: return None, None, None
+
+    with open(filename, 'r') as f:
+        lines = f.readlines()
+
+    # Parse Cell
+    cell = None
+    for i, line in enumerate(lines):
+        if "CELL_PARAMETERS" in line:
+            scale = BOHR_TO_ANG if "bohr" in line.lower() else 1.0
+            cell = np.array([[float(x) for x in lines[i + n].split()[:3]] for n in (1, 2, 3)]) * scale
+            break
+
+    # Parse Atoms
+    species = []
+    coords = []
+    in_atoms = False
+    atom_scale = 1.0
+    for line in lines:
+        if "ATOMIC_POSITIONS" in line:
+            in_atoms = True
+            if "bohr" in line.lower(): atom_scale = BOHR_TO_ANG
+            elif "crystal" in line.lower(): atom_scale = 'crystal'
+            continue
+        if in_atoms:
+            if line.strip() == "" or "K_POINTS" in line: break
+            parts = line.split()
+            if len(parts) >= 4:
+                species.append(parts[0])
+                coords.append([float(x) for x in parts[1:4]])
+
+    coords = np.array(coords)
+    if atom_scale == 'crystal':
+        positions = coords @ cell
+    else:
+        positions = coords * atom_scale
+    return cell, np.array(species), positions
+
+
+def get_supercell(cell, species, positions, dim=(2, 2, 1), start=(0, 0, 0)):
+    """
+    Expands the unit cell by broadcasting over lattice translations.
+    Cells run from `start` to `start + dim` along each lattice vector; the atom order
+    is cell-major (i, j, k outermost) exactly like the old nested loop.
+    Returns species (N,), positions (N, 3) and cell_index (N, 3) integer translations.
+    """
+    ranges = [np.arange(s, s + n) for s, n in zip(start, dim)]
+    translations = np.stack(np.meshgrid(*ranges, indexing='ij'), axis=-1).reshape(-1, 3)
+    shifts = translations @ cell
+
+    n_unit = len(species)
+    super_pos = (shifts[:, None, :] + positions[None, :, :]).reshape(-1, 3)
+    super_species = np.tile(species, len(translations))
+    cell_index = np.repeat(translations, n_unit, axis=0)
+    return super_species, super_pos, cell_index
+
+
+def find_bonds(positions, cutoff, cell=None, pbc=(False, False, False)):
+    """
+    Finds all atom pairs closer than `cutoff` with a KD-tree.
+    Periodic directions (pbc) use the tree's periodic box, which requires an
+    orthorhombic cell aligned with x, y, z (true for the 1T'-WTe2 cell).
+    Returns pairs (m, 2) and bond vectors (m, 3) from the first atom to the nearest
+    image of the second.
+    """
+    positions = np.asarray(positions, dtype=float)
+    pbc = np.asarray(pbc, dtype=bool)
+
+    if not pbc.any():
+        pairs = cKDTree(positions).query_pairs(cutoff, output_type='ndarray')
+        return pairs, positions[pairs[:, 1]] - positions[pairs[:, 0]]
+
+    lengths = np.diag(cell)
+    if not np.allclose(cell, np.diag(lengths)):
+        raise ValueError("Periodic bond search needs an orthorhombic cell aligned with the axes.")
+
+    # Periodic dims: wrap into [0, L). Open dims: shift to >= 0 and pad the box so nothing wraps.
+    lo = positions.min(axis=0)
+    extent = positions.max(axis=0) - lo
+    boxsize = np.where(pbc, lengths, extent + 2 * cutoff + 1.0)
+    wrapped = np.where(pbc, np.mod(positions, lengths), positions - lo)
+    wrapped = np.mod(wrapped, boxsize)  # guards against x == L after rounding
+
+    pairs = cKDTree(wrapped, boxsize=boxsize).query_pairs(cutoff, output_type='ndarray')
+    vec = wrapped[pairs[:, 1]] - wrapped[pairs[:, 0]]
+    vec -= np.where(pbc, boxsize * np.round(vec / boxsize), 0.0)
+    return pairs, vec
+
+
+def draw_bonds(ax, species, positions, cutoff=3.2, styles=None, cell=None, pbc=(False, False, False)):
+    """
+    Draws every bond type as ONE Line3DCollection (instead of one ax.plot per bond).
+    `styles` maps a sorted species pair to Line3DCollection keyword arguments;
+    pairs without a style are skipped.
+    """
+    from mpl_toolkits.mplot3d.art3d import Line3DCollection
+
+    if styles is None:
+        styles = DEFAULT_BOND_STYLES
+
+    species = np.asarray(species)
+    pairs, vec = find_bonds(positions, cutoff, cell=cell, pbc=pbc)
+    start = np.asarray(positions, dtype=float)[pairs[:, 0]]
+    segments = np.stack([start, start + vec], axis=1)
+
+    # Sorted species pair per bond -> boolean mask per style
+    s1 = species[pairs[:, 0]]
+    s2 = species[pairs[:, 1]]
+    first = np.where(s1 <= s2, s1, s2)
+    second = np.where(s1 <= s2, s2, s1)
+
+    collections = {}
+    for (a, b), style in styles.items():
+        a, b = sorted((a, b))
+        mask = (first == a) & (second == b)
+        if not mask.any():
+            continue
+        lc = Line3DCollection(segments[mask], **style)
+        ax.add_collection3d(lc)
+        collections[(a, b)] = lc
+    return collections
@@ -0,0 +1,245 @@
+import argparse
+import csv
+import itertools
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from run_catalogue import ingest
+from run_ledger import run_stage
+from wannier_tb import parse_win, parse_wout
+
+# Parallel wannier90.x sweep over the disentanglement windows and iteration counts.
+# Every setting gets its own directory under SWEEP_DIR with a modified copy of <seed>.win
+# and symlinks to one shared, read-only copy of <seed>.mmn / .amn / .eig (wannier90.x only
+# reads them), so N settings cost N small .win files on disk instead of N copies of the
+# overlaps. Runs are launched JOBS at a time, each single-threaded, and go through the run
+# ledger (meta 'study': 'window sweep'); finished directories (a complete .wout) are
+# skipped when the sweep is resumed. The final spreads of every .wout are collected into
+# one table, printed and written to SWEEP_DIR/sweep_results.csv; a setting whose run
+# failed stays in the table with its status and no spreads.
+#
+# Usage:
+#   python sweep_windows.py --froz-max 0 1 2 3 4 --win-max 30 40 --jobs 20
+#   python sweep_windows.py --froz-max 0 1 2 3 4 --screen 8   # keep the 8 best of screen_windows.py
+#   python sweep_windows.py --collect                         # table from an existing sweep
+
+# --- CONFIGURATION ---
+SEEDNAME = 'wte2'
+SWEEP_DIR = 'window_sweep'
+WANNIER90 = 'wannier90.x'
+SHARED = ['mmn', 'amn', 'eig'] # read-only inputs shared by symlink
+JOBS = os.cpu_count() or 1
+THREADS_PER_RUN = 1            # OMP/BLAS threads per wannier90.x, JOBS x THREADS_PER_RUN <= cores
+KEYWORDS = ['dis_win_min', 'dis_win_max', 'dis_froz_min', 'dis_froz_max', 'num_iter']
+
+
+def set_keywords(text, params):
+    """Returns .win text with each keyword of params replaced (or prepended when absent)."""
+    for key, value in params.items():
+        pattern = re.compile(rf'^[ \t]*{key}(?=[ \t=:])[^\n!#]*', re.I | re.M)
+        line = f"{key} = {value:g}" if isinstance(value, float) else f"{key} = {value}"
+        if pattern.search(text):
+            text = pattern.sub(line, text, count=1)
+        else:
+            text = f"{line}\n{text}"
+    return text
+
+
+def sweep_grid(axes):
+    """
+    Product of the keyword axes {keyword: [values]}, keeping only settings with
+    dis_win_min < dis_froz_min < dis_froz_max < dis_win_max. Returns a list of dicts.
+    """
+    keys = list(axes)
+    grid = []
+    for values in itertools.product(*(axes[k] for k in keys)):
+        p = dict(zip(keys, values))
+        if p['dis_win_min'] < p['dis_froz_min'] < p['dis_froz_max'] < p['dis_win_max']:
+            grid.append(p)
+    return grid
+
+
+def run_tag(params):
+    """Directory name of a setting, e.g. 'win-15_40_froz-10_2_iter100'."""
+    return (f"win{params['dis_win_min']:g}_{params['dis_win_max']:g}"
+            f"_froz{params['dis_froz_min']:g}_{params['dis_froz_max']:g}_iter{params['num_iter']}")
+
+
+def prepare_run(seed, params, sweep_dir=SWEEP_DIR):
+    """Creates the run directory: modified .win plus symlinks to the shared overlaps."""
+    run_dir = os.path.join(sweep_dir, run_tag(params))
+    os.makedirs(run_dir, exist_ok=True)
+    with open(f"{seed}.win", 'r') as f:
+        text = f.read()
+    with open(os.path.join(run_dir, f"{seed}.win"), 'w') as f:
+        f.write(set_keywords(text, params))
+    for ext in SHARED:
+        link = os.path.join(run_dir, f"{seed}.{ext}")
+        if not os.path.lexists(link):
+            os.symlink(os.path.abspath(f"{seed}.{ext}"), link)
+    return run_dir
+
+
+def _finished(wout):
+    if not os.path.exists(wout):
+        return False
+    with open(wout, 'r') as f:
+        return 'Total Execution Time' in f.read()
+
+
+def run_one(seed, params, sweep_dir=SWEEP_DIR, exe=WANNIER90):
+    """
+    Runs wannier90.x for one setting (skipped if its .wout is complete). Returns the run
+    dir; raises RuntimeError if wannier90.x exits with an error.
+    """
+    run_dir = prepare_run(seed, params, sweep_dir)
+    wout = os.path.join(run_dir, f"{seed}.wout")
+    if not _finished(wout):
+        threads = str(THREADS_PER_RUN)
+        rec = run_stage([exe, seed], stage='wannier90.x', label=run_tag(params), cwd=run_dir,
+                        env={'OMP_NUM_THREADS': threads, 'OPENBLAS_NUM_THREADS': threads, 'MKL_NUM_THREADS': threads},
+                        meta={'study': 'window sweep', **params})
+        # wannier90.x can fail before it writes the .wout (bad .win, missing overlaps)
+        if os.path.exists(wout):
+            ingest(wout, tags={'study': 'window sweep'})
+        if rec['returncode'] != 0:
+            raise RuntimeError(f"{exe} exited with code {rec['returncode']}")
+    return run_dir
+
+
+def collect(seed, grid, sweep_dir=SWEEP_DIR, errors=None):
+    """
+    One row per setting: the keywords, a status ('done', 'incomplete', 'missing' or the
+    error of errors[run_tag]) and the final spreads of its .wout (None unless done).
+    """
+    errors = errors or {}
+    rows = []
+    for params in grid:
+        wout = os.path.join(sweep_dir, run_tag(params), f"{seed}.wout")
+        row = dict(params)
+        row.update({'omega_i': None, 'omega_d': None, 'omega_od': None, 'omega_total': None,
+                    'max_wf_spread': None, 'iterations': None, 'time_s': None})
+        done = _finished(wout)
+        row['status'] = ('done' if done else errors.get(run_tag(params))
+                         or ('incomplete' if os.path.exists(wout) else 'missing'))
+        if done:
+            w = parse_wout(wout)
+            row.update({'omega_i': w['omega_i'], 'omega_d': w['omega_d'], 'omega_od': w['omega_od'],
+                        'omega_total': w['omega_total'], 'time_s': w['total_time'],
+                        'max_wf_spread': float(w['wf_spreads'].max()) if len(w['wf_spreads']) else None,
+                        'iterations': w['iterations'][-1] if w['iterations'] else None})
+        rows.append(row)
+    return rows
+
+
+def existing_grid(sweep_dir, seed):
+    """Settings of an earlier sweep, read back from the .win files of its run directories."""
+    grid = []
+    for name in sorted(os.listdir(sweep_dir)):
+        fname = os.path.join(sweep_dir, name, f"{seed}.win")
+        if os.path.exists(fname):
+            win = parse_win(fname)
+            grid.append({k: win[k] for k in KEYWORDS})
+    return grid
+
+
+def screened(seed, grid, keep):
+    """The keep settings of grid ranked best by screen_windows.py (needs .amn and .eig)."""
+    from overlap_store import load_amn, read_eig
+    from screen_windows import rank, screen
+
+    A = load_amn(f"{seed}.amn")
+    windows = np.array([[p[k] for k in KEYWORDS[:4]] for p in grid])
+    res = screen(A, read_eig(f"{seed}.eig"), windows)
+    order, _ = rank(windows, res, A.shape[2])
+    # num_iter does not enter the screen: keep every iteration count of the best windows
+    best = []
+    for i in order:
+        w = tuple(windows[i])
+        if w not in best:
+            best.append(w)
+    best = set(best[:keep])
+    return [p for p in grid if tuple(p[k] for k in KEYWORDS[:4]) in best]
+
+
+def print_table(rows):
+    print(f"{'win_min':>8s}{'win_max':>8s}{'froz_min':>9s}{'froz_max':>9s}{'iter':>6s}"
+          f"{'Omega_I':>10s}{'Omega_D':>10s}{'Omega_OD':>10s}{'Omega':>10s}{'max WF':>9s}{'time (s)':>10s}  status")
+    fmt = lambda v, w, p: f"{v:{w}.{p}f}" if v is not None else f"{'-':>{w}s}"
+    for r in sorted(rows, key=lambda r: (r['omega_total'] is None, r['omega_total'] or 0.0)):
+        print(f"{r['dis_win_min']:8.2f}{r['dis_win_max']:8.2f}{r['dis_froz_min']:9.2f}{r['dis_froz_max']:9.2f}"
+              f"{r['num_iter']:6d}{fmt(r['omega_i'], 10, 4)}{fmt(r['omega_d'], 10, 4)}{fmt(r['omega_od'], 10, 4)}"
+              f"{fmt(r['omega_total'], 10, 4)}{fmt(r['max_wf_spread'], 9, 3)}{fmt(r['time_s'], 10, 1)}  {r['status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run wannier90.x over a grid of disentanglement windows in parallel.")
+    parser.add_argument('seed', nargs='?', default=SEEDNAME)
+    for key in KEYWORDS:
+        parser.add_argument('--' + key.replace('dis_', '').replace('_', '-'), dest=key, nargs='+',
+                            type=int if key == 'num_iter' else float, default=None,
+                            help=f"values of {key} (default: the .win value)")
+    parser.add_argument('--jobs', type=int, default=JOBS, help="concurrent wannier90.x runs")
+    parser.add_argument('--screen', type=int, default=None, metavar='N',
+                        help="only run the N best windows of screen_windows.py")
+    parser.add_argument('--sweep-dir', default=SWEEP_DIR)
+    parser.add_argument('--exe', default=WANNIER90)
+    parser.add_argument('--dry-run', action='store_true', help="prepare the directories only")
+    parser.add_argument('--collect', action='store_true', help="only tabulate an existing sweep")
+    args = parser.parse_args()
+
+    errors = {} # run_tag -> why the run failed
+    if args.collect:
+        if not os.path.isdir(args.sweep_dir):
+            print(f"Error: {args.sweep_dir} not found.")
+            return 1
+        grid = existing_grid(args.sweep_dir, args.seed)
+    else:
+        for ext in ['win'] + SHARED:
+            if not os.path.exists(f"{args.seed}.{ext}"):
+                print(f"Error: {args.seed}.{ext} not found.")
+                return 1
+        win = parse_win(f"{args.seed}.win")
+        axes = {k: getattr(args, k) or [win.get(k, 100 if k == 'num_iter' else None)] for k in KEYWORDS}
+        missing = [k for k, v in axes.items() if v[0] is None]
+        if missing:
+            print(f"Error: no value for {', '.join(missing)} in {args.seed}.win or on the command line.")
+            return 1
+        grid = sweep_grid(axes)
+        if args.screen is not None:
+            grid = screened(args.seed, grid, args.screen)
+        print(f"{len(grid)} settings, {min(args.jobs, len(grid))} concurrent {args.exe} run(s) in {args.sweep_dir}/")
+
+        if args.dry_run:
+            for params in grid:
+                prepare_run(args.seed, params, args.sweep_dir)
+            return 0
+        with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+            jobs = [pool.submit(run_one, args.seed, p, args.sweep_dir, args.exe) for p in grid]
+            for params, job in zip(grid, jobs):
+                try:
+                    print(f"  done: {job.result()}")
+                except Exception as e: # one failed setting must not lose the table of the others
+                    errors[run_tag(params)] = f"failed: {e}"
+                    print(f"  failed: {run_tag(params)} ({e})")
+
+    rows = collect(args.seed, grid, args.sweep_dir, errors)
+    print_table(rows)
+    out = os.path.join(args.sweep_dir, 'sweep_results.csv')
+    with open(out, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else KEYWORDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Saved {out}")
+    failed = [r for r in rows if r['status'] != 'done']
+    if failed:
+        print(f"{len(failed)} of {len(rows)} settings did not finish.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import numpy as np
+import sys
+
+# Synthetic Wannier90 hr.dat generator for benchmarking.
+# Produces a Hermitian 2D model (H(-R) = H(R)^dagger) with hoppings decaying with |R|,
+# so parsing / H(k) / ribbon timings can be measured at any num_wann and nrpts
+# without running pw.x + wannier90.x.
+
+
+def lattice_vectors(nrpts):
+    """R = 0 plus the nrpts // 2 shortest +/-R pairs of a 2D square lattice (Rz = 0)."""
+    if nrpts % 2 == 0:
+        raise ValueError("nrpts must be odd (R = 0 plus +/-R pairs)")
+    n = int(np.ceil(np.sqrt(nrpts))) + 1
+    r = np.arange(-n, n + 1)
+    grid = np.stack(np.meshgrid(r, r, indexing='ij'), axis=-1).reshape(-1, 2)
+    # One representative per +/- pair: first non-zero component positive
+    half = grid[(grid[:, 0] > 0) | ((grid[:, 0] == 0) & (grid[:, 1] > 0))]
+    half = half[np.lexsort((half[:, 1], half[:, 0], np.hypot(half[:, 0], half[:, 1])))]
+    half = half[:nrpts // 2]
+    rvecs = np.vstack([-half[::-1], [[0, 0]], half])
+    return np.column_stack([rvecs, np.zeros(len(rvecs), dtype=int)])
+
+
+def synthetic_model(num_wann, nrpts, seed=0, bandwidth=5.0, decay=1.5):
+    """Model dict (see wannier_tb) with random hoppings ~ exp(-|R| / decay)."""
+    rng = np.random.default_rng(seed)
+    rvecs = lattice_vectors(nrpts)
+    mid = nrpts // 2
+    ham = np.zeros((nrpts, num_wann, num_wann), dtype=complex)
+
+    for i in range(mid + 1, nrpts):
+        scale = 0.3 * np.exp(-np.linalg.norm(rvecs[i]) / decay)
+        h = scale * (rng.normal(size=(num_wann, num_wann)) + 1j * rng.normal(size=(num_wann, num_wann)))
+        ham[i] = h
+        ham[2 * mid - i] = h.conj().T # R and -R sit symmetrically around R = 0
+
+    h0 = 0.3 * (rng.normal(size=(num_wann, num_wann)) + 1j * rng.normal(size=(num_wann, num_wann)))
+    ham[mid] = 0.5 * (h0 + h0.conj().T) + np.diag(np.linspace(-bandwidth, bandwidth, num_wann))
+
+    return {'num_wann': num_wann, 'rvecs': rvecs, 'deg': np.ones(nrpts), 'ham': ham}
+
+
+def write_hr_dat(fname, model, header='written by synthetic_hr.py'):
+    """Writes a model dict in the Wannier90 hr.dat layout (15 degeneracies per line, m fastest)."""
+    nw = model['num_wann']
+    rvecs = model['rvecs']
+    nrpts = len(rvecs)
+    deg = np.asarray(model['deg']).astype(int)
+    ham = model['ham'] * model['deg'][:, None, None] # hr.dat stores H(R) without the 1/deg
+
+    i_r, n, m = np.meshgrid(np.arange(nrpts), np.arange(nw), np.arange(nw), indexing='ij')
+    i_r, n, m = i_r.ravel(), n.ravel(), m.ravel()
+    vals = ham[i_r, m, n]
+    table = np.column_stack([rvecs[i_r], m + 1, n + 1])
+
+    with open(fname, 'w') as f:
+        f.write(header + '\n')
+        f.write(f"{nw:12d}\n{nrpts:12d}\n")
+        for start in range(0, nrpts, 15):
+            f.write(''.join(f"{d:5d}" for d in deg[start:start + 15]) + '\n')
+        np.savetxt(f, np.column_stack([table, vals.real, vals.imag]),
+                   fmt='%5d%5d%5d%5d%5d%12.6f%12.6f')
+
+
+def write_synthetic_hr(fname, num_wann=44, nrpts=25, seed=0):
+    model = synthetic_model(num_wann, nrpts, seed)
+    write_hr_dat(fname, model, header=f"synthetic hr.dat: num_wann={num_wann} nrpts={nrpts} seed={seed}")
+    return model
+
+
+if __name__ == "__main__":
+    # Usage: python synthetic_hr.py out_hr.dat [num_wann] [nrpts] [seed]
+    if len(sys.argv) < 2:
+        print("Usage: python synthetic_hr.py out_hr.dat [num_wann] [nrpts] [seed]")
+        sys.exit(1)
+    fname = sys.argv[1]
+    num_wann = int(sys.argv[2]) if len(sys.argv) > 2 else 44
+    nrpts = int(sys.argv[3]) if len(sys.argv) > 3 else 25
+    seed = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+    write_synthetic_hr(fname, num_wann, nrpts, seed)
+    print(f"Wrote {fname}: num_wann={num_wann}, nrpts={nrpts}")
@@ -0,0 +1,168 @@
+import argparse
+import os
+import sys
+import time
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+import dos
+from dos import map_slabs
+from wannier_tb import load_hr_dat, ribbon_slices
+
+# Two-terminal Landauer transmission of a ribbon (periodic direction a1 becomes the
+# transport direction, WIDTH cells along a2, open edges) from the Wannier model.
+# The ribbon slices T_r1 (wannier_tb.ribbon_slices) are grouped into principal layers
+# of L = max|R1| slices, so only neighbouring layers couple (H00, H01). The leads are
+# semi-infinite copies of the clean ribbon; their surface Green's functions come from
+# Sancho-Rubio decimation, and the device of LENGTH layers is swept once with the
+# recursive Green's function method:
+#   G_1 = (z - H_1 - Sigma_L)^-1,  G_n = (z - H_n - H10 G_(n-1) H01 [- Sigma_R])^-1,
+#   G_n1 = G_n H10 G_(n-1)1,       T(E) = Tr[Gamma_R G_N1 Gamma_L G_N1^+]
+# so the cost is linear in LENGTH. Every step is batched over a chunk of energies, and
+# the chunks run in the dos.py process pool. With spinful WFs T counts spin channels:
+# G = (e^2/h) T, and a helical edge pair gives T = 2, G = 2e^2/h, inside the bulk gap.
+#
+# Usage:
+#   python transport.py                             # wte2_hr.dat
+#   python transport.py model_library/bhz_hr.dat --width 20 --length 50 --emin -1 --emax 1
+
+# --- CONFIGURATION ---
+FNAME = 'wte2_hr.dat'
+WIDTH = 20          # cells along a2
+LENGTH = 20         # device principal layers
+ENERGIES = (-0.5, 0.5, 201) # eV: emin, emax, count
+ETA = 1e-8          # eV, imaginary part of z = E + i eta (T is low by ~ eta * LENGTH)
+DECIMATION_TOL = 1e-10
+ENERGY_CHUNK = 8    # energies per batched RGF sweep
+OUTPUT_FILE = 'Fig_Transmission.png'
+
+
+def principal_layers(slices):
+    """(H00, H01) of principal layers of L = max|r1| slices, H01 = <layer n|H|layer n+1>."""
+    L = max(abs(r) for r in slices)
+    if L == 0:
+        raise ValueError("the model has no hopping along a1: no transport direction")
+    m = slices[0].shape[0]
+    zero = np.zeros((m, m), dtype=complex)
+    h00 = np.block([[slices.get(j - i, zero) for j in range(L)] for i in range(L)])
+    h01 = np.block([[slices.get(L + j - i, zero) for j in range(L)] for i in range(L)])
+    return h00, h01
+
+
+def surface_green(z, h00, h01, tol=DECIMATION_TOL, max_iter=100):
+    """
+    Sancho-Rubio decimation: surface Green's function (nE, M, M) of the semi-infinite
+    lead made of layers h00 that extends away from its surface through h01 (surface ->
+    next layer). z (nE,) complex energies. Pass h01^+ for a lead extending to the left.
+    """
+    eye = np.eye(len(h00))
+    zI = z[:, None, None] * eye
+    alpha = np.broadcast_to(h01, zI.shape)
+    beta = np.broadcast_to(h01.conj().T, zI.shape)
+    eps_s = eps = np.broadcast_to(h00, zI.shape)
+    for _ in range(max_iter):
+        g = np.linalg.inv(zI - eps)
+        ag, bg = alpha @ g, beta @ g
+        agb, bga = ag @ beta, bg @ alpha
+        eps_s = eps_s + agb
+        eps = eps + agb + bga
+        alpha, beta = ag @ alpha, bg @ beta
+        if np.abs(alpha).max() < tol and np.abs(beta).max() < tol:
+            break
+    return np.linalg.inv(zI - eps_s)
+
+
+def transmission(energies, h00, h01, length=LENGTH, disorder=None, eta=ETA):
+    """
+    T(E) (nE,) through a device of `length` principal layers between clean leads.
+    disorder : optional (length, M) on-site energies added to the device layers.
+    """
+    z = np.asarray(energies, dtype=float) + 1j * eta
+    zI = z[:, None, None] * np.eye(len(h00))
+    h10 = h01.conj().T
+    sigma_l = h10 @ surface_green(z, h00, h10) @ h01
+    sigma_r = h01 @ surface_green(z, h00, h01) @ h10
+    gamma_l = 1j * (sigma_l - sigma_l.conj().transpose(0, 2, 1))
+    gamma_r = 1j * (sigma_r - sigma_r.conj().transpose(0, 2, 1))
+
+    G = G_n1 = None
+    for n in range(length):
+        h = h00 if disorder is None else h00 + np.diag(disorder[n])
+        a = zI - h
+        if n == 0:
+            a = a - sigma_l
+        else:
+            a = a - h10 @ G @ h01
+        if n == length - 1:
+            a = a - sigma_r
+        G = np.linalg.inv(a)
+        G_n1 = G if n == 0 else G @ h10 @ G_n1
+    t = gamma_r @ G_n1 @ gamma_l @ G_n1.conj().transpose(0, 2, 1)
+    return np.real(np.trace(t, axis1=1, axis2=2))
+
+
+def _transmission_chunk(task):
+    """Worker: task = (index, energies, length, disorder); the layers are in dos._MODEL."""
+    i, energies, length, disorder = task
+    return i, transmission(energies, dos._MODEL['h00'], dos._MODEL['h01'], length, disorder)
+
+
+def transmission_parallel(energies, h00, h01, length=LENGTH, disorder=None, chunk=ENERGY_CHUNK,
+                          processes=None):
+    """transmission() with the energies split into chunks run in a process pool."""
+    energies = np.asarray(energies, dtype=float)
+    starts = range(0, len(energies), chunk)
+    tasks = [(s, energies[s:s + chunk], length, disorder) for s in starts]
+    T = np.empty(len(energies))
+    for s, part in map_slabs(_transmission_chunk, tasks, {'h00': h00, 'h01': h01}, processes=processes):
+        T[s:s + len(part)] = part
+    return T
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Landauer transmission of a ribbon by recursive Green's functions.")
+    parser.add_argument('hr', nargs='?', default=FNAME)
+    parser.add_argument('--width', type=int, default=WIDTH)
+    parser.add_argument('--length', type=int, default=LENGTH)
+    parser.add_argument('--emin', type=float, default=ENERGIES[0])
+    parser.add_argument('--emax', type=float, default=ENERGIES[1])
+    parser.add_argument('--ne', type=int, default=ENERGIES[2])
+    parser.add_argument('--shift', type=float, default=0.0, help="energy offset (e.g. E_F), eV")
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.hr):
+        print(f"Error: {args.hr} not found.")
+        return 1
+    model = load_hr_dat(args.hr)
+    try:
+        h00, h01 = principal_layers(ribbon_slices(model, args.width))
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    energies = np.linspace(args.emin, args.emax, args.ne)
+    t0 = time.perf_counter()
+    T = transmission_parallel(energies + args.shift, h00, h01, args.length, processes=args.processes)
+    print(f"{args.hr}: width {args.width}, {args.length} layers of size {len(h00)}, {len(energies)} energies "
+          f"in {time.perf_counter() - t0:.1f} s")
+
+    out = os.path.splitext(args.output)[0] + '.dat'
+    np.savetxt(out, np.column_stack([energies, T]), fmt='%14.6f', header='E-shift(eV) T(E)')
+    fig, ax = plt.subplots(figsize=(6, 4))
+    ax.plot(energies, T, color='#D50032')
+    ax.set_xlabel(r"$E$ (eV)")
+    ax.set_ylabel(r"$T(E)$ ($e^2/h$)")
+    ax.set_xlim(energies[0], energies[-1])
+    ax.set_ylim(bottom=0)
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(args.output, dpi=300)
+    print(f"Saved {out} and {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,599 @@
+import numpy as np
+import re
+import scipy.linalg
+from scipy import sparse
+
+from profiling import phase
+
+# Shared Wannier90 tight-binding helpers.
+# Model = plain dict:
+#   'num_wann' : number of Wannier functions
+#   'rvecs'    : (nR, 3) integer lattice vectors
+#   'deg'      : (nR,) Wigner-Seitz degeneracies
+#   'ham'      : (nR, nw, nw) complex H(R) with the degeneracy already folded in (H(R)/deg)
+# H(k) = sum_R exp(2 pi i k.R) H(R)/deg(R), k in fractional (crystal) coordinates.
+
+BOHR_TO_ANG = 0.529177
+
+# precision='single' builds and diagonalises in complex64: half the memory of every H and
+# faster LAPACK, with eigenvalue errors ~1e-7 * bandwidth. refine=(emin, emax) rebuilds H
+# in double precision for the k-points that have an eigenvalue inside the window and
+# diagonalises those again. Near E_F that is nearly every k-point, and the refinement then
+# costs more than precision='double' from the start: keep the window narrow, or use double.
+PRECISIONS = {'double': np.complex128, 'single': np.complex64}
+
+# Angular momentum l of each projection letter (Wannier90 convention)
+L_ORBITALS = {'s': 0, 'p': 1, 'd': 2, 'f': 3}
+
+# Single real orbitals accepted in a projection line -> (l, m index in Wannier90 order)
+ORBITAL_NAMES = {'pz': (1, 0), 'px': (1, 1), 'py': (1, 2),
+                 'dz2': (2, 0), 'dxz': (2, 1), 'dyz': (2, 2), 'dx2-y2': (2, 3), 'dxy': (2, 4)}
+
+
+def load_hr_dat(fname, energy_cut=None, max_dist=None, cell=None, centres=None):
+    """
+    Parses a standard Wannier90 hr.dat file into a model dict (vectorized).
+    With energy_cut (eV) or max_dist (Angstrom) the model is pruned (see prune_model).
+    """
+    with open(fname, 'r') as f:
+        f.readline() # Time
+        num_wann = int(f.readline())
+        nrpts = int(f.readline())
+
+        deg = []
+        while len(deg) < nrpts:
+            deg.extend(map(int, f.readline().split()))
+
+        data = np.loadtxt(f, ndmin=2)
+
+    if data.shape[0] != nrpts * num_wann * num_wann:
+        raise ValueError(f"{fname}: expected {nrpts * num_wann**2} matrix elements, found {data.shape[0]}")
+
+    # Rows are grouped by R, with (m, n) running inside each block
+    rvecs = data[::num_wann * num_wann, :3].astype(int)
+    deg = np.array(deg, dtype=float)
+    i_r = np.repeat(np.arange(nrpts), num_wann * num_wann)
+    m = data[:, 3].astype(int) - 1 # 1-based indexing in file -> 0-based in array
+    n = data[:, 4].astype(int) - 1
+
+    ham = np.zeros((nrpts, num_wann, num_wann), dtype=complex)
+    ham[i_r, m, n] = data[:, 5] + 1j * data[:, 6]
+    ham /= deg[:, None, None]
+
+    model = {'num_wann': num_wann, 'rvecs': rvecs, 'deg': deg, 'ham': ham}
+    if energy_cut is not None or max_dist is not None:
+        model = prune_model(model, energy_cut or 0.0, max_dist, cell, centres)
+    return model
+
+
+def prune_model(model, energy_cut=0.0, max_dist=None, cell=None, centres=None):
+    """
+    Drops hoppings with |H_mn(R)/deg(R)| <= energy_cut (eV) and, if max_dist is given,
+    those longer than max_dist (Angstrom): |R.cell + c_n - c_m|, with cell (3, 3) rows in
+    Angstrom and centres (nw, 3) Cartesian WF centres (zero if None). Both criteria are
+    symmetric under (R, m, n) -> (-R, n, m), so H(k) stays Hermitian. R-vectors left
+    without any hopping are removed, which is what makes every H(k) sum cheaper.
+    """
+    nw = model['num_wann']
+    keep = np.abs(model['ham']) > energy_cut
+    if max_dist is not None:
+        if cell is None:
+            raise ValueError("max_dist needs the unit cell (Angstrom)")
+        c = np.zeros((nw, 3)) if centres is None else np.asarray(centres)
+        hop = (model['rvecs'] @ np.asarray(cell))[:, None, None, :] + c[None, None, :, :] - c[None, :, None, :]
+        keep &= np.linalg.norm(hop, axis=-1) <= max_dist
+    rows = keep.any(axis=(1, 2))
+    ham = np.where(keep, model['ham'], 0.0)[rows]
+    return {'num_wann': nw, 'rvecs': model['rvecs'][rows], 'deg': model['deg'][rows], 'ham': ham}
+
+
+def hk(model, kpts, dtype=complex):
+    """Builds H(k) for a batch of fractional k-points, in dtype. Returns (nk, nw, nw)."""
+    kpts = np.atleast_2d(kpts)
+    phase = np.exp(2j * np.pi * (kpts @ model['rvecs'].T)).astype(dtype, copy=False) # (nk, nR)
+    return np.tensordot(phase, model['ham'].astype(dtype, copy=False), axes=(1, 0))
+
+
+def eigh_k(model, kpts, vectors=False, chunk=256, precision='double', refine=None):
+    """
+    Batched diagonalisation of H(k) in chunks of k-points.
+    Returns eigenvalues (nk, nw) and, if vectors=True, eigenvectors (nk, nw, nw)
+    with U[k, :, n] the n-th eigenstate in the Wannier basis.
+    precision / refine : see PRECISIONS.
+    """
+    kpts = np.atleast_2d(kpts)
+    nk = len(kpts)
+    nw = model['num_wann']
+    evals = np.empty((nk, nw))
+    evecs = np.empty((nk, nw, nw), dtype=complex) if vectors else None
+
+    for start in range(0, nk, chunk):
+        sl = slice(start, start + chunk)
+        with phase('build H(k)'):
+            h = hk(model, kpts[sl], PRECISIONS[precision])
+        res = _diagonalise(h, vectors, refine, lambda redo: hk(model, kpts[sl][redo]))
+        if vectors:
+            evals[sl], evecs[sl] = res
+        else:
+            evals[sl] = res
+    return (evals, evecs) if vectors else evals
+
+
+def _diagonalise(h, vectors=False, refine=None, h_double=None):
+    """
+    Batched eigh / eigvalsh of h (nk, nw, nw) in its own precision. For a single-precision
+    h with refine, the k-points having an eigenvalue inside the window are redone in double
+    on h_double(redo), which builds their H(k) in complex128.
+    """
+    with phase('diagonalise'):
+        res = np.linalg.eigh(h) if vectors else np.linalg.eigvalsh(h)
+    if h.dtype == np.complex128:
+        return res
+    evals = (res[0] if vectors else res).astype(float)
+    evecs = res[1].astype(complex) if vectors else None
+    if refine is not None:
+        redo = ((evals >= refine[0]) & (evals <= refine[1])).any(axis=1)
+        if redo.any():
+            with phase('refine', fraction=float(redo.mean())):
+                hd = h_double(redo)
+                if vectors:
+                    evals[redo], evecs[redo] = np.linalg.eigh(hd)
+                else:
+                    evals[redo] = np.linalg.eigvalsh(hd)
+    return (evals, evecs) if vectors else evals
+
+
+# --- UNIFORM MESHES (separable Fourier sum) ---
+# On a Gamma-centred N1 x N2 mesh the k2 sum is a discrete Fourier transform: the
+# hoppings are folded onto an N2-point grid by R2 mod N2 (exact on the mesh, whatever
+# the extent of R) after the k1 phases are applied on the small (rows, nR) table. The
+# folded grid is transformed by one batched FFT when it is dense; a short-ranged model
+# only fills a few R2 columns, and then the same transform is a (N2, nR2) phase matrix
+# product, which is cheaper than an FFT over mostly empty columns. Cost per slab is
+# rows * nw^2 * (nR + N2 * min(nR2, ~FFT_BINS_PER_LOG * log2 N2)) instead of
+# rows * N2 * nR * nw^2 for hk().
+FFT_BINS_PER_LOG = 10 # FFT once the occupied R2 columns exceed this many per log2(N2)
+
+
+def hk_rows(model, mesh, row_start, row_stop, dtype=complex):
+    """
+    H(k) on rows [row_start, row_stop) of an N1 x N2 Gamma-centred mesh (k3 = 0),
+    row-major with k2 fastest (the order of dos.mesh_rows). Rows past N1 wrap around.
+    Returns (rows * N2, nw, nw) in dtype.
+    """
+    n1, n2 = mesh
+    nw = model['num_wann']
+    rvecs = model['rvecs']
+    ham = model['ham'].reshape(len(rvecs), -1).astype(dtype, copy=False)
+    ph = np.exp(2j * np.pi * np.outer(np.arange(row_start, row_stop) / n1, rvecs[:, 0])).astype(dtype, copy=False)
+    bins, inv = np.unique(rvecs[:, 1] % n2, return_inverse=True)
+
+    folded = np.zeros((len(ph), len(bins), nw * nw), dtype=dtype)
+    for i in range(len(bins)):
+        sel = inv == i
+        folded[:, i] = ph[:, sel] @ ham[sel]
+
+    if len(bins) > FFT_BINS_PER_LOG * np.log2(max(n2, 2)):
+        grid = np.zeros((len(ph), n2, nw * nw), dtype=dtype)
+        grid[:, bins] = folded
+        h = (np.fft.ifft(grid, axis=1) * n2).astype(dtype, copy=False) # sum_b exp(+2 pi i j b / N2) G[b]
+    else:
+        h = np.exp(2j * np.pi * np.outer(np.arange(n2) / n2, bins)).astype(dtype, copy=False) @ folded
+    return h.reshape(-1, nw, nw)
+
+
+def hk_mesh(model, mesh, rows_per_slab=8):
+    """Streams H(k) over an N1 x N2 mesh: yields (row_start, row_stop, H) per slab of k1 rows."""
+    for start in range(0, mesh[0], rows_per_slab):
+        stop = min(start + rows_per_slab, mesh[0])
+        with phase('build H(k)'):
+            h = hk_rows(model, mesh, start, stop)
+        yield start, stop, h
+
+
+def eigh_rows(model, mesh, row_start, row_stop, vectors=False, precision='double', refine=None):
+    """eigh_k on rows [row_start, row_stop) of an N1 x N2 mesh, with H(k) from hk_rows."""
+    with phase('build H(k)'):
+        h = hk_rows(model, mesh, row_start, row_stop, PRECISIONS[precision])
+
+    def h_double(redo):
+        # only the refined k-points, rebuilt in complex128 by the general sum
+        n1, n2 = mesh
+        idx = np.flatnonzero(redo)
+        kpts = np.column_stack([(row_start + idx // n2) % n1 / n1, idx % n2 / n2, np.zeros(len(idx))])
+        return hk(model, kpts)
+
+    return _diagonalise(h, vectors, refine, h_double)
+
+
+DEGEN_TOL = 1e-6 # eV; band pairs closer than this are left out of the Kubo sum
+
+
+def berry_curvature_rows(model, mesh, row_start, row_stop, degen_tol=DEGEN_TOL, vectors=False):
+    """
+    Kubo-formula Berry curvature of every band on rows [row_start, row_stop) of the mesh:
+      Omega_n = -2 Im sum_{m != n} <n|dH/dk1|m><m|dH/dk2|n> / (E_n - E_m)^2
+    with k in fractional units (multiply by A_cell / (2 pi)^2 for Angstrom^2).
+    Returns eigenvalues and Omega, both (rows * N2, nw), plus the eigenvectors
+    (rows * N2, nw, nw) if vectors=True.
+    """
+    evals, U = eigh_rows(model, mesh, row_start, row_stop, vectors=True)
+    UH = U.conj().transpose(0, 2, 1)
+    dh = []
+    for i in range(2):
+        d = dict(model, ham=2j * np.pi * model['rvecs'][:, i, None, None] * model['ham'])
+        with phase('build H(k)'):
+            dh.append(UH @ hk_rows(d, mesh, row_start, row_stop) @ U)
+    de = evals[:, :, None] - evals[:, None, :]
+    with np.errstate(divide='ignore'):
+        inv2 = np.where(np.abs(de) > degen_tol, 1.0 / de**2, 0.0)
+    omega = -2.0 * np.imag(np.sum(dh[0] * dh[1].transpose(0, 2, 1) * inv2, axis=2))
+    return (evals, omega, U) if vectors else (evals, omega)
+
+
+# --- .win PARSING ---
+
+def _strip_comment(line):
+    return re.split(r'[!#]', line, maxsplit=1)[0].strip()
+
+
+def parse_win(fname):
+    """
+    Reads the parts of a Wannier90 .win file used by the post-processing scripts.
+    Scalar keywords are returned lower-cased as strings (or numbers where obvious);
+    blocks: 'projections' (list of lines), 'unit_cell' (3x3, Angstrom),
+    'atoms' (species list, (n, 3) fractional), 'kpoint_path' (list of segments).
+    """
+    with open(fname, 'r') as f:
+        lines = [_strip_comment(l) for l in f]
+
+    win = {'projections': [], 'kpoint_path': []}
+    block = None
+    block_lines = []
+
+    for line in lines:
+        if not line:
+            continue
+        low = line.lower()
+        if low.startswith('begin'):
+            block = low.split()[1]
+            block_lines = []
+            continue
+        if low.startswith('end'):
+            _store_block(win, block, block_lines)
+            block = None
+            continue
+        if block is not None:
+            block_lines.append(line)
+            continue
+
+        parts = re.split(r'\s*[=:]\s*|\s+', line, maxsplit=1)
+        if len(parts) == 2:
+            win[parts[0].lower()] = _convert(parts[1])
+
+    return win
+
+
+def _convert(value):
+    value = value.strip()
+    low = value.lower()
+    if low in ('.true.', 'true', 't'):
+        return True
+    if low in ('.false.', 'false', 'f'):
+        return False
+    tokens = value.split()
+    try:
+        nums = [int(t) for t in tokens]
+    except ValueError:
+        try:
+            nums = [float(t) for t in tokens]
+        except ValueError:
+            return value
+    return nums[0] if len(nums) == 1 else nums
+
+
+def _store_block(win, block, lines):
+    if block == 'projections':
+        win['projections'] = lines
+    elif block in ('unit_cell_cart',):
+        scale = 1.0
+        if lines and lines[0].lower() in ('bohr', 'ang'):
+            scale = BOHR_TO_ANG if lines[0].lower() == 'bohr' else 1.0
+            lines = lines[1:]
+        win['unit_cell'] = np.array([[float(x) for x in l.split()[:3]] for l in lines[:3]]) * scale
+    elif block in ('atoms_frac', 'atoms_cart'):
+        scale = 1.0
+        if lines and lines[0].lower() in ('bohr', 'ang'):
+            scale = BOHR_TO_ANG if lines[0].lower() == 'bohr' else 1.0
+            lines = lines[1:]
+        species = [l.split()[0] for l in lines]
+        coords = np.array([[float(x) for x in l.split()[1:4]] for l in lines])
+        if block == 'atoms_cart':
+            coords = (coords * scale) @ np.linalg.inv(win['unit_cell'])
+        win['atoms'] = (species, coords)
+    elif block == 'kpoint_path':
+        segments = []
+        for l in lines:
+            p = l.split()
+            segments.append((p[0], np.array([float(x) for x in p[1:4]]),
+                             p[4], np.array([float(x) for x in p[5:8]])))
+        win['kpoint_path'] = segments
+    elif block == 'mp_grid':
+        win['mp_grid'] = [int(x) for x in lines[0].split()]
+
+
+def reciprocal_lattice(cell):
+    """Rows are b_i with a_i . b_j = 2 pi delta_ij."""
+    return 2 * np.pi * np.linalg.inv(cell).T
+
+
+def band_path(win, num_points=100):
+    """
+    Reproduces the Wannier90 kpoint_path sampling (bands_num_points in the first
+    segment, the others proportional to their length).
+    Returns kpts (nk, 3) fractional, x (nk,) path length in 1/Angstrom,
+    tick positions and tick labels.
+    """
+    segments = win['kpoint_path']
+    bvec = reciprocal_lattice(win['unit_cell'])
+    lengths = [np.linalg.norm((k2 - k1) @ bvec) for _, k1, _, k2 in segments]
+    counts = [max(1, int(round(num_points * l / lengths[0]))) for l in lengths]
+
+    kpts = []
+    x = []
+    ticks = [0.0]
+    labels = [segments[0][0]]
+    x0 = 0.0
+    for (l1, k1, l2, k2), length, n in zip(segments, lengths, counts):
+        t = np.arange(n) / n
+        kpts.append(k1 + t[:, None] * (k2 - k1))
+        x.append(x0 + t * length)
+        x0 += length
+        ticks.append(x0)
+        labels.append(l2)
+    kpts.append(segments[-1][3][None, :])
+    x.append([x0])
+    return np.vstack(kpts), np.concatenate(x), ticks, labels
+
+
+def wannier_orbitals(win):
+    """
+    Expands the `begin projections` block into one record per Wannier function,
+    following the Wannier90 ordering: projection line -> atom of that species (in
+    `atoms` order) -> angular channel -> m -> spin (innermost, when spinors = true).
+    Returns a dict of (num_wann,) arrays: 'group' (projection line index), 'atom',
+    'species', 'l', 'm', 'spin'.
+    """
+    species, _ = win['atoms']
+    nspin = 2 if win.get('spinors', False) else 1
+    rec = {'group': [], 'atom': [], 'species': [], 'l': [], 'm': [], 'spin': []}
+
+    for group, line in enumerate(win['projections']):
+        if ':' not in line:
+            raise ValueError(f"Unsupported projection line: '{line}'")
+        site, channels = [s.strip() for s in line.split(':', 1)]
+        lm = [] # (l, list of m) per channel
+        for ch in channels.split(';'):
+            ch = ch.strip().lower()
+            if ch.startswith('l='):
+                l = int(ch[2:])
+                lm.append((l, range(2 * l + 1)))
+            elif ch in L_ORBITALS:
+                l = L_ORBITALS[ch]
+                lm.append((l, range(2 * l + 1)))
+            elif ch in ORBITAL_NAMES:
+                l, m = ORBITAL_NAMES[ch]
+                lm.append((l, [m]))
+            else:
+                raise ValueError(f"Unsupported angular channel '{ch}' in '{line}'")
+
+        atoms = [i for i, s in enumerate(species) if s == site]
+        if not atoms:
+            raise ValueError(f"Projection site '{site}' matches no atom in the atoms block")
+
+        for ia in atoms:
+            for l, ms in lm:
+                for m in ms:
+                    for s in range(nspin):
+                        rec['group'].append(group)
+                        rec['atom'].append(ia)
+                        rec['species'].append(site)
+                        rec['l'].append(l)
+                        rec['m'].append(m)
+                        rec['spin'].append(s)
+
+    return {k: np.array(v) for k, v in rec.items()}
+
+
+# --- RIBBON (periodic along a1, WIDTH cells along a2) ---
+
+def fold_ribbon_hoppings(model, kx):
+    """
+    Folds H(R) along the periodic direction: H_ry(kx) = sum_{R: R2 = ry} exp(2 pi i kx R1) H(R).
+    kx is fractional (units of 2 pi / a1). Returns ry values (nry,) and blocks (nry, nw, nw).
+    H(R) carries the 1/deg of load_hr_dat and R3 is summed (kz = 0), so the blocks satisfy
+    sum_ry exp(2 pi i ky ry) H_ry(kx) = hk(model, (kx, ky, 0)): an infinitely wide ribbon
+    has the bulk bands of eigh_k / band.dat. For a monolayer model (mp_grid k3 = 1) every
+    R3 is 0 and the sum over R3 changes nothing.
+    """
+    ry_vals, inv = np.unique(model['rvecs'][:, 1], return_inverse=True)
+    phase = np.exp(2j * np.pi * kx * model['rvecs'][:, 0])
+    blocks = np.zeros((len(ry_vals), model['num_wann'], model['num_wann']), dtype=complex)
+    np.add.at(blocks, inv, phase[:, None, None] * model['ham'])
+    return ry_vals, blocks
+
+
+def _ribbon_matrix(ry_vals, blocks, width, dtype=complex):
+    nw = blocks.shape[1]
+    H = np.zeros((width, nw, width, nw), dtype=dtype)
+    for ry, block in zip(ry_vals, blocks):
+        # Cell y couples to cell y + ry when the target stays inside the ribbon
+        y = np.arange(max(0, -ry), min(width, width - ry))
+        if len(y):
+            H[y, :, y + ry, :] = block
+    return H.reshape(width * nw, width * nw)
+
+
+def ribbon_csr(ry_vals, blocks, width):
+    """Sparse (CSR) ribbon Hamiltonian of the folded blocks: the same matrix as _ribbon_matrix."""
+    H = sparse.csr_matrix((width * blocks.shape[1],) * 2, dtype=blocks.dtype)
+    for ry, block in zip(ry_vals, blocks):
+        if abs(ry) < width:
+            H = H + sparse.kron(sparse.eye(width, k=int(ry), format='csr'), sparse.csr_matrix(block), format='csr')
+    return H
+
+
+def ribbon_hamiltonian(model, width, kx, dtype=complex):
+    """Block-Toeplitz slab Hamiltonian (width*nw)^2 at fractional kx, open along a2."""
+    ry_vals, blocks = fold_ribbon_hoppings(model, kx)
+    return _ribbon_matrix(ry_vals, blocks, width, dtype)
+
+
+def ribbon_slices(model, width):
+    """
+    Real-space ribbon slices for transport along a1: {r1: T_r1} with T_r1 the
+    (width*nw)^2 coupling <cell x| H |cell x + r1> of one width-cell slice (R3 summed).
+    """
+    slices = {}
+    for r1 in np.unique(model['rvecs'][:, 0]):
+        sel = model['rvecs'][:, 0] == r1
+        ry_vals, inv = np.unique(model['rvecs'][sel, 1], return_inverse=True)
+        blocks = np.zeros((len(ry_vals), model['num_wann'], model['num_wann']), dtype=complex)
+        np.add.at(blocks, inv, model['ham'][sel])
+        slices[int(r1)] = _ribbon_matrix(ry_vals, blocks, width)
+    return slices
+
+
+def ribbon_apply(ry_vals, blocks, width, V):
+    """H @ V for the ribbon Hamiltonian of the folded blocks, without forming H. V (width*nw, m)."""
+    nw = blocks.shape[1]
+    V = V.reshape(width, nw, -1)
+    out = np.zeros(V.shape, dtype=np.result_type(blocks, V))
+    for ry, block in zip(ry_vals, blocks):
+        y = np.arange(max(0, -ry), min(width, width - ry))
+        if len(y):
+            out[y] += np.matmul(block, V[y + ry])
+    return out.reshape(width * nw, -1)
+
+
+def ribbon_bands(model, width, kx_vals, precision='double', refine=None):
+    """
+    Eigenvalues (nk, width*nw) of the ribbon along a list of fractional kx.
+    precision='single' builds the ribbon in complex64 (half the memory) and diagonalises
+    it with LAPACK heevr in single precision. refine=(emin, emax) then recomputes the
+    eigenvalues in that window by Rayleigh-Ritz in double precision: the single-precision
+    eigenvectors of the window are orthonormalised and the double-precision H is applied
+    block by block (ribbon_apply), so the dense double matrix is never formed.
+    """
+    bands = np.empty((len(kx_vals), width * model['num_wann']))
+    for i, kx in enumerate(kx_vals):
+        with phase('build ribbon H'):
+            ry_vals, blocks = fold_ribbon_hoppings(model, kx)
+            H = _ribbon_matrix(ry_vals, blocks, width, PRECISIONS[precision])
+        with phase('diagonalise'):
+            if precision == 'double':
+                bands[i] = np.linalg.eigvalsh(H)
+                continue
+            bands[i] = scipy.linalg.eigh(H, eigvals_only=True, driver='evr')
+        if refine is None:
+            continue
+        idx = np.flatnonzero((bands[i] >= refine[0]) & (bands[i] <= refine[1]))
+        if len(idx):
+            with phase('refine'):
+                _, V = scipy.linalg.eigh(H, subset_by_index=[idx[0], idx[-1]], driver='evr')
+                Q, _ = np.linalg.qr(V.astype(complex))
+                bands[i, idx[0]:idx[-1] + 1] = np.linalg.eigvalsh(Q.conj().T @ ribbon_apply(ry_vals, blocks, width, Q))
+    return bands
+
+
+# --- SUPERCELL PATCHES (sparse, n1 x n2 cells, open or periodic per direction) ---
+
+def supercell_csr(model, n1, n2, periodic=(False, False), k=(0.0, 0.0), keep=None):
+    """
+    CSR Hamiltonian of an n1 x n2 patch of cells (R3 summed), basis index
+    (c1 * n2 + c2) * nw + m. Open directions drop the hoppings that leave the patch;
+    periodic ones wrap them with the Bloch phase exp(2 pi i k_i) per supercell crossed
+    (k fractional in units of the supercell reciprocal vectors).
+    keep : optional boolean mask, (n1, n2) per cell or (n1, n2, nw) per WF; the removed
+    states (vacancies, terminations, a flake shape) drop out of the basis, which keeps
+    the order above.
+    """
+    nw = model['num_wann']
+    r12, inv = np.unique(model['rvecs'][:, :2], axis=0, return_inverse=True)
+    blocks = np.zeros((len(r12), nw, nw), dtype=complex)
+    np.add.at(blocks, inv.ravel(), model['ham'])
+    c1, c2 = (c.ravel() for c in np.meshgrid(np.arange(n1), np.arange(n2), indexing='ij'))
+    src = c1 * n2 + c2
+    size = n1 * n2 * nw
+    index = np.arange(size)
+    if keep is not None:
+        keep = np.broadcast_to(np.asarray(keep, dtype=bool).reshape(n1, n2, -1), (n1, n2, nw)).ravel()
+        index = np.where(keep, np.cumsum(keep) - 1, -1)
+        size = int(keep.sum())
+
+    rows, cols, vals = [], [], []
+    for (R1, R2), block in zip(r12, blocks):
+        m, n = np.nonzero(block)
+        if not len(m):
+            continue
+        t1, t2 = c1 + R1, c2 + R2
+        ok = np.ones(len(src), dtype=bool)
+        phase = np.ones(len(src), dtype=complex)
+        for t, extent, per, kk in ((t1, n1, periodic[0], k[0]), (t2, n2, periodic[1], k[1])):
+            if per:
+                phase *= np.exp(2j * np.pi * kk * (t // extent))
+            else:
+                ok &= (t >= 0) & (t < extent)
+        dst = (t1 % n1) * n2 + t2 % n2
+        r = index[(src[ok, None] * nw + m).ravel()]
+        c = index[(dst[ok, None] * nw + n).ravel()]
+        v = np.broadcast_to(phase[ok, None] * block[m, n], (ok.sum(), len(m))).ravel()
+        both = (r >= 0) & (c >= 0)
+        rows.append(r[both])
+        cols.append(c[both])
+        vals.append(v[both])
+    # duplicates (a hopping wrapping onto the same pair in a small periodic patch) are summed
+    return sparse.csr_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+                             shape=(size, size))
+
+
+# --- .wout PARSING ---
+
+def parse_wout(fname):
+    """
+    Reads the convergence table and final state of a wannier90 .wout file.
+    Returns a dict with 'iterations', 'spreads' (Ang^2 per iteration), 'centres' (nw, 3),
+    'wf_spreads' (nw,), 'omega_i', 'omega_d', 'omega_od', 'omega_total' and 'total_time'
+    (None where absent).
+    """
+    out = {'iterations': [], 'spreads': [], 'centres': [], 'wf_spreads': [],
+           'omega_i': None, 'omega_d': None, 'omega_od': None, 'omega_total': None,
+           'total_time': None}
+    final = False
+    with open(fname, 'r') as f:
+        for line in f:
+            if '<-- CONV' in line:
+                parts = line.split()
+                try:
+                    out['iterations'].append(int(parts[0]))
+                    out['spreads'].append(float(parts[3]))
+                except (ValueError, IndexError):
+                    pass
+            elif 'Final State' in line:
+                final = True
+                out['centres'] = []
+                out['wf_spreads'] = []
+            elif final and 'WF centre and spread' in line:
+                m = re.search(r'\(\s*([-\d\.]+),\s*([-\d\.]+),\s*([-\d\.]+)\s*\)\s+([-\d\.]+)', line)
+                if m:
+                    out['centres'].append([float(m.group(i)) for i in (1, 2, 3)])
+                    out['wf_spreads'].append(float(m.group(4)))
+            elif final and re.search(r'Omega (I|D|OD|Total)\s*=', line):
+                m = re.search(r'Omega (I|D|OD|Total)\s*=\s*([-\d\.]+)', line)
+                out['omega_' + m.group(1).lower()] = float(m.group(2))
+            elif 'Total Execution Time' in line:
+                out['total_time'] = float(re.findall(r'[\d\.]+', line)[0])
+
+    out['centres'] = np.array(out['centres'])
+    out['wf_spreads'] = np.array(out['wf_spreads'])
+    return out
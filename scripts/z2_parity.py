@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from fermi import NUM_ELECTRONS
+from wannier_tb import load_hr_dat, parse_win, hk, wannier_orbitals
+
+# Fu-Kane Z2 from parity eigenvalues at the four 2D TRIM, straight from the Wannier model
+# (no separate pw.x run at the TRIM). The inversion operator is built in the Wannier
+# basis from the .win: inversion about the centre c sends the WF of atom a (position
+# tau_a) to the WF of the same species at 2c - tau_a = tau_a' + L_a, times (-1)^l for
+# the orbital, spin untouched. In the hr.dat Bloch convention (phases exp(2 pi i k.R))
+#   P(k)_{a'a} = (-1)^l exp(2 pi i k . L_a)
+# and at a TRIM P(k) commutes with H(k). delta_i is the product of the parities of the
+# occupied Kramers pairs, (-1)^(n_odd / 2) from the eigenvalues of P in the occupied
+# subspace (so degenerate states need no gauge fixing); Z2 = 1 if prod_i delta_i = -1.
+# The choice of inversion centre changes delta_i but not their product. Relaxed
+# positions are rarely exactly centrosymmetric (inputs/wte2.win pairs within 1.6e-2 in
+# fractional y): the tolerance only has to pair each atom with its image, and the
+# symmetry actually left in the model is reported as |P H P^-1 - H| per TRIM.
+#
+# Usage:
+#   python z2_parity.py                          # wte2_hr.dat + wte2.win, NUM_ELECTRONS bands
+#   python z2_parity.py model_library/bhz        # <seed>_hr.dat, <seed>.win, half filling
+
+# --- CONFIGURATION ---
+SEEDNAME = 'wte2'
+TRIM = np.array([[0.0, 0.0, 0.0], [0.5, 0.0, 0.0], [0.0, 0.5, 0.0], [0.5, 0.5, 0.0]])
+TRIM_LABELS = ['G', 'X', 'Y', 'M']
+POS_TOL = 0.05   # fractional; only pairs the atoms, |PHP-H| measures the actual breaking
+SYM_TOL = 1e-3   # eV, ||P H P - H|| above this is reported
+
+
+def inversion_map(win, tol=POS_TOL):
+    """
+    Finds the inversion centre that best maps the atoms block onto itself. Returns
+    (partner, shift, mismatch): atom a is sent to atom partner[a] in the cell shifted
+    by shift[a] (integer (natoms, 3)); mismatch is the largest fractional deviation of
+    an inverted atom from its partner, about the least-squares centre of the pairs.
+    Raises ValueError when no centre maps the atoms within tol.
+    """
+    species = np.array(win['atoms'][0])
+    frac = np.asarray(win['atoms'][1])
+    idx = np.arange(len(frac))
+    best = None
+    # 2c = tau_0 + tau_j for some j of the same species as atom 0
+    for j in np.flatnonzero(species == species[0]):
+        d = (frac[0] + frac[j] - frac)[:, None, :] - frac[None, :, :] # image of a - atom b
+        dev = np.abs(d - np.round(d)).max(axis=2)
+        dev[species[:, None] != species[None, :]] = np.inf
+        partner = dev.argmin(axis=1)
+        if not np.isfinite(dev[idx, partner]).all():
+            continue
+        shift = np.round(d[idx, partner]).astype(int)
+        # least-squares centre of the pairs: 2c = tau_a + tau_partner(a) + shift_a
+        two_c = frac + frac[partner] + shift
+        mismatch = float(np.abs(two_c - two_c.mean(axis=0)).max())
+        if best is None or mismatch < best[2]:
+            best = (partner, shift, mismatch)
+    if best is None or best[2] > tol or len(set(best[0])) < len(frac):
+        found = 'no match' if best is None else f"best mismatch {best[2]:.2e}"
+        raise ValueError(f"no inversion centre within {tol} ({found})")
+    return best
+
+
+def inversion_operator(win, tol=POS_TOL):
+    """
+    Inversion in the Wannier basis: returns (target, sign, shift) per WF, with
+    P(k)[target[i], i] = sign[i] * exp(2 pi i k . shift[i]).
+    """
+    orb = wannier_orbitals(win)
+    partner, atom_shift, _ = inversion_map(win, tol)
+    key = {(a, g, l, m, s): i for i, (a, g, l, m, s) in
+           enumerate(zip(orb['atom'], orb['group'], orb['l'], orb['m'], orb['spin']))}
+    target = np.array([key[(partner[a], g, l, m, s)] for a, g, l, m, s in
+                       zip(orb['atom'], orb['group'], orb['l'], orb['m'], orb['spin'])])
+    return target, (-1.0) ** orb['l'], atom_shift[orb['atom']]
+
+
+def inversion_matrix(op, k):
+    target, sign, shift = op
+    P = np.zeros((len(target), len(target)), dtype=complex)
+    P[target, np.arange(len(target))] = sign * np.exp(2j * np.pi * (shift @ k))
+    return P
+
+
+def trim_parities(model, win, nocc, trim=TRIM, tol=POS_TOL):
+    """
+    Per TRIM: delta (product over occupied Kramers pairs), the number of odd occupied
+    states and the symmetry error max|P H P^-1 - H| (eV). Also checks the gap at the TRIM.
+    """
+    op = inversion_operator(win, tol)
+    h = hk(model, trim)
+    evals, U = np.linalg.eigh(h)
+    out = []
+    for k, hk_i, e, u in zip(trim, h, evals, U):
+        P = inversion_matrix(op, k)
+        occ = u[:, :nocc]
+        parity = np.linalg.eigvalsh(occ.conj().T @ P @ occ) # +-1 up to the symmetry error
+        n_odd = int(np.sum(parity < 0))
+        out.append({'delta': -1 if (n_odd // 2) % 2 else 1, 'n_odd': n_odd,
+                    'sym_error': float(np.abs(P @ hk_i @ P.conj().T - hk_i).max()),
+                    'gap': float(e[nocc] - e[nocc - 1]) if nocc < len(e) else np.inf})
+    return out
+
+
+def z2_parity(model, win, nocc, tol=POS_TOL):
+    """Fu-Kane Z2 (0 / 1) of the first nocc bands."""
+    return int(np.prod([t['delta'] for t in trim_parities(model, win, nocc, tol=tol)]) < 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fu-Kane Z2 from TRIM parities of the Wannier model.")
+    parser.add_argument('seed', nargs='?', default=SEEDNAME, help="reads <seed>_hr.dat and <seed>.win")
+    parser.add_argument('--nocc', type=int, default=None,
+                        help="occupied bands (default: half filling for model_library seeds, else NUM_ELECTRONS)")
+    parser.add_argument('--pos-tol', type=float, default=POS_TOL,
+                        help="fractional tolerance for pairing inverted atoms")
+    args = parser.parse_args()
+
+    for fname in (f"{args.seed}_hr.dat", f"{args.seed}.win"):
+        if not os.path.exists(fname):
+            print(f"Error: {fname} not found.")
+            return 1
+    ref_file = f"{args.seed}_reference.json"
+    ref = None
+    if os.path.exists(ref_file):
+        with open(ref_file, 'r') as f:
+            ref = json.load(f)
+
+    model = load_hr_dat(f"{args.seed}_hr.dat")
+    win = parse_win(f"{args.seed}.win")
+    nocc = args.nocc or (model['num_wann'] // 2 if ref is not None else NUM_ELECTRONS)
+    t0 = time.perf_counter()
+    try:
+        mismatch = inversion_map(win, args.pos_tol)[2]
+        res = trim_parities(model, win, nocc, tol=args.pos_tol)
+    except (KeyError, ValueError) as e:
+        print(f"Error: cannot build the inversion operator from {args.seed}.win ({e}).")
+        return 1
+    elapsed = time.perf_counter() - t0
+
+    print(f"{args.seed}: {model['num_wann']} WFs, {nocc} occupied bands ({elapsed * 1000:.1f} ms)")
+    print(f"Inversion pairs of the atoms matched within {mismatch:.2e} (fractional, --pos-tol {args.pos_tol})")
+    print(f"{'TRIM':>6s}{'delta':>7s}{'odd':>6s}{'gap (eV)':>10s}{'|PHP-H|':>10s}")
+    for label, k, r in zip(TRIM_LABELS, TRIM, res):
+        print(f"{label:>6s}{r['delta']:>+7d}{r['n_odd']:6d}{r['gap']:10.4f}{r['sym_error']:10.1e}")
+    z2 = int(np.prod([r['delta'] for r in res]) < 0)
+    print(f"Z2 = {z2}" + (f" (reference: {ref['z2']})" if ref is not None else ""))
+    if max(r['sym_error'] for r in res) > SYM_TOL:
+        print(f"Warning: the model breaks inversion by more than {SYM_TOL} eV; the parities are approximate.")
+    if min(r['gap'] for r in res) <= 0:
+        print("Warning: no gap at a TRIM at this filling; the parity product is not a Z2 index.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
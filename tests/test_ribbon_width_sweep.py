@@ -0,0 +1,20 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from model_library import t1prime
+from ribbon_width_sweep import converged_width, width_sweep
+
+
+def test_sweep_t1prime_warm_starts():
+    # warm-started Lanczos used to stall (ArpackNoConvergence) at width 8 on this model
+    results = list(width_sweep(t1prime()[0], range(4, 31, 2), 0.0))
+    assert [r['width'] for r in results] == list(range(4, 31, 2))
+    splitting = np.array([r['splitting'] for r in results])
+    assert np.all(np.isfinite(splitting))
+    # hybridisation gap shrinks with width and converges
+    assert splitting[-1] < 1e-4 < splitting[0]
+    assert converged_width(results, 1e-4) is not None